@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: analytics EAV vs metric_snapshots (series de tiempo)
+Llena la tabla analytics con el esquema viejo (una fila por métrica), la
+migra con dashboard/utils/migrate_analytics.py y compara las mismas
+consultas sobre ambos esquemas en la misma base:
+
+- serie de un post (todas las métricas) y su último día
+- último valor de una métrica de un post
+- top 10 posts por retweets (EAV, snapshots y metric_latest)
+- escritura de snapshots nuevos (con los triggers de rollups activos)
+
+Ejecutar con: python benchmarks/bench_analytics.py [--samples 10000000] [--posts 20000]
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Agregar parent directory al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+
+from dashboard.models.database import Base
+from dashboard.services.snapshots import record_snapshots
+from dashboard.utils.migrate_analytics import migrate_analytics_to_snapshots
+
+PLATFORMS = ('twitter', 'instagram')
+METRICS = ('likes', 'comments', 'retweets', 'views')
+START = datetime(2025, 1, 1)
+
+# Esquema del modelo Analytics original
+LEGACY_SCHEMA = """
+    CREATE TABLE analytics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_id INTEGER NOT NULL REFERENCES posts (id),
+        platform VARCHAR(20) NOT NULL,
+        metric_name VARCHAR(50) NOT NULL,
+        metric_value INTEGER,
+        collected_at DATETIME NOT NULL
+    )
+"""
+LEGACY_INDEXES = """
+    CREATE INDEX ix_analytics_post_id ON analytics (post_id);
+    CREATE INDEX ix_analytics_collected_at ON analytics (collected_at)
+"""
+
+QUERIES = {
+    'series': (
+        "SELECT collected_at, metric_name, metric_value FROM analytics_eav "
+        "WHERE post_id = ? AND platform = ? ORDER BY collected_at",
+        "SELECT * FROM metric_snapshots WHERE post_id = ? AND platform = ? ORDER BY collected_at",
+    ),
+    'series_last_day': (
+        "SELECT collected_at, metric_name, metric_value FROM analytics_eav "
+        "WHERE post_id = ? AND platform = ? AND collected_at >= ? ORDER BY collected_at",
+        "SELECT * FROM metric_snapshots WHERE post_id = ? AND platform = ? AND collected_at >= ? "
+        "ORDER BY collected_at",
+    ),
+    'latest_value': (
+        "SELECT metric_value FROM analytics_eav WHERE post_id = ? AND platform = ? "
+        "AND metric_name = 'retweets' ORDER BY collected_at DESC LIMIT 1",
+        "SELECT retweets FROM metric_snapshots WHERE post_id = ? AND platform = ? "
+        "ORDER BY collected_at DESC LIMIT 1",
+    ),
+}
+
+TOP_QUERIES = {
+    'eav': "SELECT post_id, MAX(metric_value) FROM analytics_eav WHERE metric_name = 'retweets' "
+           "GROUP BY post_id ORDER BY 2 DESC LIMIT 10",
+    'snapshots': "SELECT post_id, MAX(retweets) FROM metric_snapshots GROUP BY post_id ORDER BY 2 DESC LIMIT 10",
+    'latest': "SELECT post_id, retweets FROM metric_latest ORDER BY retweets DESC LIMIT 10",
+}
+
+
+def build_legacy(db_path, samples, posts):
+    """Crea posts y analytics (EAV) con `samples` filas; devuelve los snapshots por serie"""
+    per_series = max(1, samples // (posts * len(PLATFORMS) * len(METRICS)))
+
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(LEGACY_SCHEMA)
+    conn.executemany(
+        "INSERT INTO posts (id, shortcode, platform_source, platform_target, created_at, processed_at, status) "
+        "VALUES (?, ?, 'instagram', 'twitter', ?, ?, 'success')",
+        ((i, f"SC{i:09d}", START.isoformat(' '), START.isoformat(' ')) for i in range(1, posts + 1))
+    )
+
+    def rows():
+        for k in range(per_series):
+            collected_at = (START + timedelta(hours=k)).isoformat(' ') + '.000000'
+            for post_id in range(1, posts + 1):
+                for platform in PLATFORMS:
+                    for m, metric in enumerate(METRICS):
+                        yield post_id, platform, metric, (post_id * 7 + m * 13) % 97 + k * (m + 1), collected_at
+
+    conn.executemany(
+        "INSERT INTO analytics (post_id, platform, metric_name, metric_value, collected_at) VALUES (?, ?, ?, ?, ?)",
+        rows()
+    )
+    conn.executescript(LEGACY_INDEXES)
+    conn.commit()
+    conn.close()
+    return per_series
+
+
+def table_sizes(conn):
+    """Bytes por tabla + índices (None si SQLite no trae dbstat)"""
+    try:
+        rows = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+    except sqlite3.OperationalError:
+        return None
+    sizes = dict(rows)
+    owners = dict(conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')"))
+    totals = {}
+    for name, size in sizes.items():
+        owner = owners.get(name, name)
+        totals[owner] = totals.get(owner, 0) + size
+    return totals
+
+
+def time_query(conn, sql, params_list):
+    """ms promedio por consulta (leyendo todas las filas)"""
+    start = time.perf_counter()
+    for params in params_list:
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) * 1000 / len(params_list)
+
+
+def bench_queries(db_path, posts, per_series, queries):
+    conn = sqlite3.connect(str(db_path))
+    rng = random.Random(42)
+    targets = [(rng.randint(1, posts), rng.choice(PLATFORMS)) for _ in range(queries)]
+    last_day = START + timedelta(hours=max(0, per_series - 24))
+
+    results = {}
+    for name, (eav_sql, wide_sql) in QUERIES.items():
+        if name == 'series_last_day':
+            eav_params = [t + (last_day.isoformat(' '),) for t in targets]
+            wide_params = [t + (int((last_day - datetime(1970, 1, 1)).total_seconds()),) for t in targets]
+        else:
+            eav_params = wide_params = targets
+        # Una pasada previa para medir con la caché de páginas caliente en ambos
+        time_query(conn, eav_sql, eav_params[:10])
+        time_query(conn, wide_sql, wide_params[:10])
+        results[name] = {'eav_ms': time_query(conn, eav_sql, eav_params),
+                         'snapshots_ms': time_query(conn, wide_sql, wide_params)}
+
+    results['top10_retweets'] = {f'{layout}_ms': time_query(conn, sql, [()] * 3) for layout, sql in TOP_QUERIES.items()}
+    results['sizes'] = table_sizes(conn)
+    conn.close()
+    return results
+
+
+def bench_writes(db_path, engine, posts, per_series, count):
+    """µs por snapshot nuevo: EAV (una fila por métrica) vs record_snapshots con triggers"""
+    collected_at = START + timedelta(hours=per_series + 1)
+
+    conn = sqlite3.connect(str(db_path))
+    start = time.perf_counter()
+    with conn:
+        conn.executemany(
+            "INSERT INTO analytics_eav (post_id, platform, metric_name, metric_value, collected_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((1 + i % posts, 'twitter', metric, i, collected_at.isoformat(' ')) for i in range(count) for metric in METRICS)
+        )
+    eav_us = (time.perf_counter() - start) * 1e6 / count
+    conn.close()
+
+    snapshots = [
+        {'post_id': 1 + i % posts, 'platform': 'twitter', 'collected_at': collected_at + timedelta(seconds=i // posts),
+         **{metric: i for metric in METRICS}}
+        for i in range(count)
+    ]
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        record_snapshots(conn, snapshots)
+    snapshots_us = (time.perf_counter() - start) * 1e6 / count
+
+    return {'eav_us': eav_us, 'snapshots_us': snapshots_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de analytics EAV vs metric_snapshots')
+    parser.add_argument('--samples', type=int, default=10_000_000,
+                        help='Valores de métricas (filas del EAV) a generar')
+    parser.add_argument('--posts', type=int, default=20_000,
+                        help='Posts distintos')
+    parser.add_argument('--queries', type=int, default=500,
+                        help='Consultas por post a medir (con posts al azar)')
+    parser.add_argument('--writes', type=int, default=10_000,
+                        help='Snapshots nuevos a escribir al final')
+    parser.add_argument('--json', action='store_true',
+                        help='Imprimir resultados como JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / 'analytics.db'
+        engine = create_engine(f'sqlite:///{db_path}')
+        Base.metadata.create_all(engine)
+
+        start = time.perf_counter()
+        per_series = build_legacy(db_path, args.samples, args.posts)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            snapshots, _, errors = migrate_analytics_to_snapshots(engine)
+        migrate_s = time.perf_counter() - start
+        if errors:
+            sys.exit("[ERROR] Falló la migración")
+
+        results = {
+            'samples': args.samples,
+            'snapshots': snapshots,
+            'build_s': build_s,
+            'migrate_s': migrate_s,
+            **bench_queries(db_path, args.posts, per_series, args.queries),
+            'write': bench_writes(db_path, engine, args.posts, per_series, args.writes),
+        }
+        engine.dispose()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{results['samples']:,} valores -> {results['snapshots']:,} snapshots "
+          f"(carga EAV {build_s:.1f} s, migración + rollups {migrate_s:.1f} s)")
+    for name in QUERIES:
+        r = results[name]
+        print(f"{name:>16} | EAV {r['eav_ms']:9.3f} ms | snapshots {r['snapshots_ms']:9.3f} ms | "
+              f"x{r['eav_ms'] / r['snapshots_ms']:.1f}")
+    top = results['top10_retweets']
+    print(f"{'top10_retweets':>16} | EAV {top['eav_ms']:9.1f} ms | snapshots {top['snapshots_ms']:9.1f} ms | "
+          f"metric_latest {top['latest_ms']:7.2f} ms")
+    write = results['write']
+    print(f"{'write':>16} | EAV {write['eav_us']:7.1f} µs/snapshot | snapshots+rollups {write['snapshots_us']:7.1f} µs/snapshot")
+    if results['sizes']:
+        sizes = results['sizes']
+        eav_mb = sizes.get('analytics_eav', 0) / 1e6
+        wide_mb = sizes.get('metric_snapshots', 0) / 1e6
+        print(f"{'tamaño':>16} | EAV {eav_mb:9.1f} MB | snapshots {wide_mb:9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
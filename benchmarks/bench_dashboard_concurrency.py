@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: lecturas del dashboard mientras el bot escribe
+Un thread escribe snapshots de métricas sin pausa (con los triggers de
+rollups activos) mientras varios threads leen como las páginas de Streamlit
+(overview + serie de un post, sin caché). Se mide la latencia de lectura,
+los errores "database is locked" y los snapshots escritos por segundo en
+tres configuraciones:
+
+- default: el engine anterior (journal rollback, un engine para todo, un
+  commit por snapshot)
+- wal: engines de lectura y escritura separados con WAL y PRAGMAs, un
+  commit por snapshot
+- wal+batch: lo mismo escribiendo con BatchWriter (un commit por lote)
+
+Ejecutar con: python benchmarks/bench_dashboard_concurrency.py [--seconds 10] [--readers 4]
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Agregar parent directory al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from dashboard.models.database import Base, create_sqlite_engine
+from dashboard.services.batch_writer import BatchWriter
+from dashboard.services.snapshots import record_snapshots
+from dashboard.services.stats import DashboardStats
+
+START = datetime(2025, 1, 1)
+
+
+def seed(engine, posts, snapshots_per_post):
+    """Posts y una historia inicial de snapshots"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO posts (id, shortcode, platform_source, platform_target, created_at, processed_at, status) "
+            "VALUES (:id, :shortcode, 'instagram', 'twitter', :ts, :ts, 'success')"
+        ), [{'id': i, 'shortcode': f"SC{i:09d}", 'ts': START} for i in range(1, posts + 1)])
+        record_snapshots(conn, [
+            {'post_id': post_id, 'platform': 'twitter', 'collected_at': START + timedelta(hours=k),
+             'likes': k * 10 + post_id, 'retweets': k + post_id, 'views': k * 100}
+            for post_id in range(1, posts + 1) for k in range(snapshots_per_post)
+        ])
+
+
+def make_snapshot(i, posts, snapshots_per_post):
+    return {'post_id': 1 + i % posts, 'platform': 'twitter',
+            'collected_at': START + timedelta(hours=snapshots_per_post, seconds=i // posts),
+            'likes': i, 'retweets': i // 10, 'views': i * 3}
+
+
+def run_mode(mode, db_path, args):
+    if mode == 'default':
+        # Configuración anterior: un engine por defecto para leer y escribir
+        writer_engine = reader = create_engine(f'sqlite:///{db_path}', connect_args={'check_same_thread': False})
+    else:
+        writer_engine = create_sqlite_engine(db_path)
+        reader = create_sqlite_engine(db_path, readonly=True, pool_size=args.readers)
+
+    Base.metadata.create_all(writer_engine)
+    seed(writer_engine, args.posts, args.history)
+    stats = DashboardStats(engine=reader, write_engine=writer_engine)
+
+    stop = threading.Event()
+    latencies = []
+    read_errors = []
+    write_errors = []
+    written = [0]
+
+    def read_loop(seed_value):
+        rng = random.Random(seed_value)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                stats.invalidate()
+                stats.overview(days=7)
+                stats.post_timeseries(rng.randint(1, args.posts), 'twitter')
+                latencies.append((time.perf_counter() - start) * 1000)
+            except OperationalError as e:
+                read_errors.append(str(e.orig))
+
+    def write_loop():
+        i = 0
+        while not stop.is_set():
+            try:
+                with writer_engine.begin() as conn:
+                    record_snapshots(conn, [make_snapshot(i, args.posts, args.history)])
+                written[0] += 1
+            except OperationalError as e:
+                write_errors.append(str(e.orig))
+            i += 1
+
+    batch_writer = None
+
+    def batched_write_loop():
+        i = 0
+        while not stop.is_set():
+            # Contrapresión: no encolar más de lo que el writer alcanza a escribir
+            if batch_writer._queue.qsize() > 4 * batch_writer.max_batch:
+                time.sleep(0.001)
+                continue
+            batch_writer.add_snapshot(make_snapshot(i, args.posts, args.history))
+            i += 1
+
+    if mode == 'wal+batch':
+        batch_writer = BatchWriter(writer_engine, max_batch=args.batch, max_delay=0.1)
+        writer = threading.Thread(target=batched_write_loop)
+    else:
+        writer = threading.Thread(target=write_loop)
+    readers = [threading.Thread(target=read_loop, args=(n,)) for n in range(args.readers)]
+
+    writer.start()
+    for thread in readers:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    if batch_writer is not None:
+        written[0] = batch_writer.written
+    for thread in readers + [writer]:
+        thread.join()
+    if batch_writer is not None:
+        batch_writer.close()
+        write_errors.extend([str(batch_writer.last_error)] * bool(batch_writer.failed))
+
+    stats.close()
+    writer_engine.dispose()
+    reader.dispose()
+
+    ordered = sorted(latencies) or [0.0]
+    return {
+        'mode': mode,
+        'reads': len(latencies),
+        'read_p50_ms': statistics.median(ordered),
+        'read_p99_ms': ordered[int(len(ordered) * 0.99) - 1] if len(ordered) > 1 else ordered[0],
+        'read_max_ms': ordered[-1],
+        'read_errors': len(read_errors),
+        'writes_per_s': written[0] / args.seconds,
+        'write_errors': len(write_errors),
+        'error_sample': (read_errors + write_errors)[:1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia de lectura del dashboard con el bot escribiendo')
+    parser.add_argument('--seconds', type=float, default=10, help='Duración de cada configuración')
+    parser.add_argument('--readers', type=int, default=4, help='Threads leyendo')
+    parser.add_argument('--posts', type=int, default=2000, help='Posts en la base')
+    parser.add_argument('--history', type=int, default=48, help='Snapshots iniciales por post')
+    parser.add_argument('--batch', type=int, default=500, help='Filas por lote en wal+batch')
+    parser.add_argument('--modes', nargs='+', default=['default', 'wal', 'wal+batch'],
+                        choices=['default', 'wal', 'wal+batch'], help='Configuraciones a medir')
+    parser.add_argument('--json', action='store_true', help='Imprimir resultados como JSON')
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = run_mode(mode, Path(tmp) / 'analytics.db', args)
+        results.append(result)
+
+        if not args.json:
+            print(f"{mode:>9} | lecturas {result['reads']:6,} | p50 {result['read_p50_ms']:7.2f} ms | "
+                  f"p99 {result['read_p99_ms']:8.2f} ms | max {result['read_max_ms']:8.2f} ms | "
+                  f"errores {result['read_errors']:4} | escritura {result['writes_per_s']:8,.0f} snapshots/s "
+                  f"(errores {result['write_errors']})")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: historial JSON vs SQLite
+Mide arranque (carga), insert + guardado por post y lookup por shortcode
+
+Ejecutar con: python benchmarks/bench_historial.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Agregar parent directory al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from historial_store import JsonHistorialStore, SQLiteHistorialStore
+
+
+def make_record(i):
+    """Registro con la misma forma que guarda main.py"""
+    return {
+        'fecha_procesado': datetime(2024, 1, 1).isoformat(),
+        'instagram_url': f"https://www.instagram.com/p/SC{i:09d}/",
+        'tweet_id': str(2012432004734701900 + i),
+        'tweet_url': f"https://twitter.com/i/web/status/{2012432004734701900 + i}",
+        'caption': "Caption de prueba " * 5,
+        'tipo': 'imagen',
+        'archivos_descargados': [f"media/SC{i:09d}/foto.jpg"]
+    }
+
+
+def build_fixture(folder, size):
+    """Crea historial.json y su equivalente SQLite con `size` registros"""
+    json_path = folder / 'historial.json'
+    db_path = folder / 'historial.db'
+
+    historial = {f"SC{i:09d}": make_record(i) for i in range(size)}
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(historial, f, indent=2, ensure_ascii=False)
+
+    store = SQLiteHistorialStore(db_path)
+    store.import_json(json_path)
+    store.close()
+
+    return json_path, db_path
+
+
+def bench_backend(open_store, size, inserts, lookups):
+    """Mide carga, inserts con guardado y lookups sobre un backend"""
+    start = time.perf_counter()
+    store = open_store()
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(inserts):
+        shortcode = f"NEW{i:09d}"
+        store[shortcode] = make_record(size + i)
+        store.save()
+    insert_ms = (time.perf_counter() - start) * 1000 / inserts
+
+    start = time.perf_counter()
+    for i in range(lookups):
+        _ = f"SC{(i * 7919) % size:09d}" in store
+    lookup_us = (time.perf_counter() - start) * 1e6 / lookups
+
+    store.close()
+    return {'load_s': load_s, 'insert_ms': insert_ms, 'lookup_us': lookup_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del historial JSON vs SQLite')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='Tamaños del historial a medir')
+    parser.add_argument('--inserts', type=int, default=20,
+                        help='Posts nuevos a insertar (con guardado) por backend')
+    parser.add_argument('--lookups', type=int, default=10_000,
+                        help='Búsquedas por shortcode por backend')
+    parser.add_argument('--json', action='store_true',
+                        help='Imprimir resultados como JSON')
+    args = parser.parse_args()
+
+    results = []
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path, db_path = build_fixture(Path(tmp), size)
+
+            for backend, open_store in (
+                ('json', lambda: JsonHistorialStore(json_path)),
+                ('sqlite', lambda: SQLiteHistorialStore(db_path)),
+            ):
+                result = bench_backend(open_store, size, args.inserts, args.lookups)
+                result.update({'backend': backend, 'entries': size})
+                results.append(result)
+
+                if not args.json:
+                    print(f"{backend:>6} | {size:>9,} entradas | "
+                          f"carga {result['load_s']:8.3f} s | "
+                          f"insert+save {result['insert_ms']:9.2f} ms | "
+                          f"lookup {result['lookup_us']:7.2f} µs")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: preprocesamiento de imágenes antes de subir a Twitter
+Genera imágenes sintéticas (JPEG grandes con EXIF, PNG sin transparencia,
+PNG con transparencia, WEBP), las pasa por MediaPreprocessor y reporta
+bytes ahorrados, tiempo de CPU y tiempo de subida ahorrado (a un ancho de
+banda dado). Corre dos veces para medir también la caché por hash.
+
+Ejecutar con: python benchmarks/bench_preprocess.py [--images 12] [--upload-mbps 10] [--json]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Agregar parent directory al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PIL import Image
+
+from media_preprocess import MediaPreprocessor
+
+KINDS = ('jpeg_exif', 'png_rgb', 'png_alpha', 'webp')
+
+
+def make_image(folder, index, kind, size):
+    """Imagen tipo foto: degradado + ruido (comprime como una foto real)"""
+    width, height = size
+    gradient = Image.radial_gradient('L').resize(size)
+    noise = Image.effect_noise(size, 40)
+    image = Image.merge('RGB', (gradient, noise, Image.linear_gradient('L').resize(size)))
+
+    if kind == 'jpeg_exif':
+        path = folder / f"img_{index}.jpg"
+        exif = Image.Exif()
+        exif[0x010F] = "Camara de prueba"  # Make
+        exif[0x0112] = 6                   # Orientation: rotada 90°
+        image.save(path, 'JPEG', quality=98, exif=exif)
+    elif kind == 'png_rgb':
+        path = folder / f"img_{index}.png"
+        image.save(path, 'PNG')
+    elif kind == 'png_alpha':
+        path = folder / f"img_{index}.png"
+        image.putalpha(gradient)
+        image.save(path, 'PNG')
+    else:
+        path = folder / f"img_{index}.webp"
+        image.save(path, 'WEBP', quality=95)
+    return path
+
+
+def upload_seconds(size_bytes, mbps, latency_ms):
+    """Tiempo estimado de subir un archivo: transferencia + latencia del request"""
+    return size_bytes * 8 / (mbps * 1_000_000) + latency_ms / 1000
+
+
+def run(preprocessor, files, args):
+    start = time.perf_counter()
+    results = preprocessor.process(files)
+    wall_s = time.perf_counter() - start
+
+    input_bytes = sum(r['input_bytes'] for r in results)
+    output_bytes = sum(r['output_bytes'] for r in results)
+    upload_before = sum(upload_seconds(r['input_bytes'], args.upload_mbps, args.latency_ms) for r in results)
+    upload_after = sum(upload_seconds(r['output_bytes'], args.upload_mbps, args.latency_ms) for r in results)
+
+    return {
+        'images': len(results),
+        'wall_s': wall_s,
+        'cpu_s': sum(r['seconds'] for r in results),
+        'input_bytes': input_bytes,
+        'output_bytes': output_bytes,
+        'bytes_saved': input_bytes - output_bytes,
+        'saved_pct': 100 * (input_bytes - output_bytes) / input_bytes if input_bytes else 0.0,
+        'upload_s_before': upload_before,
+        'upload_s_after': upload_after,
+        'upload_s_saved': upload_before - upload_after,
+        'actions': {action: sum(1 for r in results if r['action'] == action)
+                    for action in sorted({r['action'] for r in results})},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del preprocesamiento de imágenes')
+    parser.add_argument('--images', type=int, default=12, help='Imágenes a generar')
+    parser.add_argument('--width', type=int, default=4032, help='Ancho de las imágenes')
+    parser.add_argument('--height', type=int, default=3024, help='Alto de las imágenes')
+    parser.add_argument('--workers', type=int, default=2, help='Procesos del pool')
+    parser.add_argument('--max-side', type=int, default=2048, help='Lado máximo')
+    parser.add_argument('--quality', type=int, default=85, help='Calidad JPEG')
+    parser.add_argument('--upload-mbps', type=float, default=10.0, help='Ancho de banda de subida')
+    parser.add_argument('--latency-ms', type=float, default=150.0, help='Latencia por request de subida')
+    parser.add_argument('--json', action='store_true', help='Imprimir resultados como JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        files = [make_image(folder, i, KINDS[i % len(KINDS)], (args.width, args.height))
+                 for i in range(args.images)]
+
+        preprocessor = MediaPreprocessor(folder / 'optimizadas', max_side=args.max_side,
+                                         quality=args.quality, workers=args.workers)
+        try:
+            results = {'cold': run(preprocessor, files, args), 'cached': run(preprocessor, files, args)}
+        finally:
+            preprocessor.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for phase, result in results.items():
+        print(f"{phase:>6} | {result['images']} imágenes | "
+              f"{result['input_bytes'] / 1e6:7.1f} MB → {result['output_bytes'] / 1e6:6.1f} MB "
+              f"(-{result['saved_pct']:.0f}%) | preprocesado {result['wall_s']:6.2f} s | "
+              f"subida {result['upload_s_before']:6.1f} s → {result['upload_s_after']:5.1f} s "
+              f"(ahorro {result['upload_s_saved']:.1f} s) | {result['actions']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+"""
+Fakes deterministas de instaloader y tweepy para benchmarks sin red
+Reemplazan instaloader.Profile/Post/NodeIterator/Instaloader y tweepy.Client/API por
+versiones en memoria con latencia y tasa de fallos configurables.
+Todo usa random.Random(seed): dos corridas con la misma semilla hacen
+exactamente las mismas llamadas con los mismos tiempos.
+
+Uso:
+    world = FakeWorld(posts=500, seed=1)
+    install(world)          # antes de importar main / instagram_scraper / twitter_poster
+    config = make_config(tmp_dir)
+"""
+import random
+import struct
+import sys
+import threading
+import time
+import types
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import requests
+
+# JPEG mínimo (cabecera + fin) para que los archivos parezcan imágenes
+FAKE_JPEG = b'\xff\xd8\xff\xe0' + b'\x00' * 1020 + b'\xff\xd9'
+
+
+def fake_media_bytes(name, size=1024):
+    """Contenido único por archivo (la caché de media_ids deduplica por hash)"""
+    body = (name.encode('utf-8') * (size // max(1, len(name)) + 1))[:size]
+    return FAKE_JPEG[:4] + body + FAKE_JPEG[-2:]
+
+
+def _box(box_type, body):
+    return struct.pack('>I4s', 8 + len(body), box_type) + body
+
+
+def _full_box(box_type, body):
+    return _box(box_type, b'\x00\x00\x00\x00' + body)
+
+
+def fake_mp4_bytes(name, size=1024 * 1024, duration_s=15, width=720, height=1280, fps=30):
+    """MP4 mínimo con moov válido (H.264 + AAC) y mdat de relleno único por archivo"""
+    timescale = 600
+    matrix = struct.pack('>9i', 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+
+    def trak(handler, codec, w, h, samples):
+        tkhd = _full_box(b'tkhd', b'\x00' * 36 + matrix + struct.pack('>II', w << 16, h << 16))
+        mdhd = _full_box(b'mdhd', struct.pack('>IIIIHH', 0, 0, timescale, duration_s * timescale, 0, 0))
+        hdlr = _full_box(b'hdlr', struct.pack('>I4s', 0, handler) + b'\x00' * 13)
+        entry = _box(codec, b'\x00' * 6 + struct.pack('>H', 1) + b'\x00' * 16
+                     + struct.pack('>HH', w, h) + b'\x00' * 50)
+        stsd = _full_box(b'stsd', struct.pack('>I', 1) + entry)
+        stts = _full_box(b'stts', struct.pack('>III', 1, samples, timescale // max(1, fps)))
+        stbl = _box(b'stbl', stsd + stts)
+        return _box(b'trak', tkhd + _box(b'mdia', mdhd + hdlr + _box(b'minf', stbl)))
+
+    mvhd = _full_box(b'mvhd', struct.pack('>IIII', 0, 0, 1000, duration_s * 1000) + b'\x00' * 80)
+    moov = _box(b'moov', mvhd + trak(b'vide', b'avc1', width, height, duration_s * fps)
+                + trak(b'soun', b'mp4a', 0, 0, duration_s * 43))
+    ftyp = _box(b'ftyp', b'isom\x00\x00\x02\x00isomavc1')
+
+    payload = (name.encode('utf-8') * (size // max(1, len(name)) + 1))[:max(0, size - len(ftyp) - len(moov) - 8)]
+    return ftyp + moov + _box(b'mdat', payload)
+
+
+class Latency:
+    """Latencia y fallos simulados de un endpoint"""
+
+    def __init__(self, mean_ms=0.0, jitter_ms=0.0, failure_rate=0.0):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+
+    def wait(self, rng, name):
+        """Duerme la latencia simulada y lanza un error según failure_rate"""
+        delay = max(0.0, self.mean_ms + rng.uniform(-self.jitter_ms, self.jitter_ms))
+        if delay:
+            time.sleep(delay / 1000)
+        if self.failure_rate and rng.random() < self.failure_rate:
+            raise ConnectionError(f"Fallo simulado en {name}")
+
+
+class FakeWorld:
+    """Estado compartido por los fakes: posts del perfil y latencias por endpoint"""
+
+    def __init__(self, posts=100, images_per_post=1, video_every=0, seed=1,
+                 image_bytes=64 * 1024, video_bytes=1024 * 1024, profile_latency=None, page_latency=None, post_latency=None,
+                 download_latency=None, upload_latency=None, tweet_latency=None):
+        """
+        Args:
+            posts: Cantidad de posts del perfil falso
+            images_per_post: Imágenes por post (>1 genera carruseles)
+            video_every: Cada cuántos posts uno es video (0 = nunca)
+            image_bytes: Tamaño de cada imagen descargada
+            video_bytes: Tamaño de cada video descargado
+            seed: Semilla de los generadores aleatorios
+            *_latency: Latency de cada endpoint (default: sin latencia ni fallos)
+        """
+        self.seed = seed
+        self.images_per_post = images_per_post
+        self.image_bytes = image_bytes
+        self.video_bytes = video_bytes
+        self.profile_latency = profile_latency or Latency()
+        self.page_latency = page_latency or Latency()
+        self.post_latency = post_latency or Latency()
+        self.download_latency = download_latency or Latency()
+        self.upload_latency = upload_latency or Latency()
+        self.tweet_latency = tweet_latency or Latency()
+        self.lookup_latency = Latency()
+
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+        # Contadores de llamadas para verificar cuánto trabajo hizo el bot
+        self.calls = {'profile': 0, 'page': 0, 'post': 0, 'download': 0, 'upload': 0, 'tweet': 0, 'lookup': 0}
+        self.uploaded_bytes = 0
+
+        base = datetime(2024, 1, 1)
+        self.posts = []
+        for i in range(posts):
+            is_video = bool(video_every) and i % video_every == 0
+            self.posts.append(FakePost(
+                shortcode=f"FAKE{i:07d}",
+                mediaid=1_000_000 + i,
+                caption=f"Post de prueba #{i} " + "lorem ipsum " * (i % 30),
+                date_utc=base + timedelta(hours=i),
+                is_video=is_video,
+            ))
+        self.by_shortcode = {post.shortcode: post for post in self.posts}
+
+    def wait(self, endpoint):
+        """Aplica la latencia del endpoint con un RNG derivado (thread-safe)"""
+        with self._lock:
+            self.calls[endpoint] += 1
+            rng = random.Random(self._rng.random())
+        getattr(self, f"{endpoint}_latency").wait(rng, endpoint)
+
+
+class FakePost:
+    """Sustituto de instaloader.Post"""
+
+    def __init__(self, shortcode, mediaid, caption, date_utc, is_video=False):
+        self.shortcode = shortcode
+        self.mediaid = mediaid
+        self.caption = caption
+        self.date_utc = date_utc
+        self.is_video = is_video
+        self.is_pinned = False
+        self.likes = 0
+        self.comments = 0
+        self.typename = 'GraphVideo' if is_video else 'GraphImage'
+
+    @classmethod
+    def from_shortcode(cls, context, shortcode):
+        context.world.wait('post')
+        return context.world.by_shortcode[shortcode]
+
+
+class FakeProfileNotExistsException(Exception):
+    """Sustituto de instaloader.ProfileNotExistsException"""
+    pass
+
+
+class FakeProfile:
+    """Sustituto de instaloader.Profile (pagina de a 12 posts, más nuevo primero)"""
+
+    PAGE_SIZE = 12
+    PROFILE_ID = 1234567890
+
+    def __init__(self, context, node):
+        self.context = context
+        self.username = node['username']
+        self.userid = int(node['id'])
+
+    @classmethod
+    def from_username(cls, context, username):
+        context.world.wait('profile')
+        return cls(context, {'id': cls.PROFILE_ID, 'username': username})
+
+    def get_posts(self):
+        world = self.context.world
+        if self.userid != self.PROFILE_ID:
+            raise FakeProfileNotExistsException(f"Profile {self.userid} does not exist.")
+
+        # Cada página (incluida la primera) es un request aparte
+        world.wait('page')
+        return self._iter_posts(world)
+
+    @classmethod
+    def _iter_posts(cls, world):
+        for index, post in enumerate(reversed(world.posts)):
+            if index and index % cls.PAGE_SIZE == 0:
+                world.wait('page')
+            yield post
+
+
+class FakeNodeIterator:
+    """
+    Sustituto de instaloader.NodeIterator para el listado por id
+
+    Pide la primera página al crearse, como el real. Los posts salen del
+    mundo falso (node_wrapper no se usa); edge_extractor solo ve la
+    respuesta de un id que no existe.
+    """
+
+    def __init__(self, context, query_hash, edge_extractor, node_wrapper, query_variables=None,
+                 query_referer=None, first_data=None, is_first=None, doc_id=None):
+        world = context.world
+        profile_id = (query_variables or {}).get('id')
+        if profile_id is not None and int(profile_id) != FakeProfile.PROFILE_ID:
+            edge_extractor({'data': {'user': None}})
+        world.wait('page')
+        self._posts = FakeProfile._iter_posts(world)
+
+    def __iter__(self):
+        return self._posts
+
+
+class FakeContext:
+    def __init__(self, world):
+        self.world = world
+        self.is_logged_in = False
+
+
+class FakeInstaloader:
+    """Sustituto de instaloader.Instaloader"""
+
+    def __init__(self, dirname_pattern='{target}', **kwargs):
+        self.dirname_pattern = dirname_pattern
+        self.context = FakeContext(_state['world'])
+
+    def download_post(self, post, target):
+        world = self.context.world
+        world.wait('download')
+
+        folder = Path(self.dirname_pattern.format(target=target))
+        folder.mkdir(parents=True, exist_ok=True)
+        stem = post.date_utc.strftime('%Y-%m-%d_%H-%M-%S_UTC')
+
+        if post.is_video:
+            (folder / f"{stem}.mp4").write_bytes(fake_mp4_bytes(post.shortcode, world.video_bytes))
+        elif world.images_per_post > 1:
+            for i in range(1, world.images_per_post + 1):
+                name = f"{post.shortcode}_{i}"
+                (folder / f"{stem}_{i}.jpg").write_bytes(fake_media_bytes(name, world.image_bytes))
+        else:
+            (folder / f"{stem}.jpg").write_bytes(fake_media_bytes(post.shortcode, world.image_bytes))
+        (folder / f"{stem}.txt").write_text(post.caption, encoding='utf-8')
+        return True
+
+    def load_session_from_file(self, username):
+        raise FileNotFoundError(username)
+
+
+class FakeMedia:
+    def __init__(self, media_id, expires_after_secs=86400):
+        self.media_id = media_id
+        self.expires_after_secs = expires_after_secs
+
+
+class FakeAPI:
+    """Sustituto de tweepy.API (v1.1, subida de media)"""
+
+    def __init__(self, auth=None, **kwargs):
+        self.world = _state['world']
+        self.session = requests.Session()
+        self._next_id = iter(range(5_000_000_000, 6_000_000_000))
+        self._lock = threading.Lock()
+
+    def _media_id(self):
+        with self._lock:
+            return next(self._next_id)
+
+    def media_upload(self, filename, **kwargs):
+        self.world.wait('upload')
+        size = Path(filename).stat().st_size
+        with self._lock:
+            self.world.uploaded_bytes += size
+        return FakeMedia(self._media_id())
+
+    def chunked_upload_init(self, total_bytes, media_type, **kwargs):
+        return FakeMedia(self._media_id())
+
+    def chunked_upload_append(self, media_id, media, segment_index, **kwargs):
+        self.world.wait('upload')
+        with self._lock:
+            self.world.uploaded_bytes += len(media[1])
+
+    def chunked_upload_finalize(self, media_id, **kwargs):
+        return FakeMedia(media_id)
+
+    def get_media_upload_status(self, media_id, **kwargs):
+        return FakeMedia(media_id)
+
+    def verify_credentials(self):
+        return types.SimpleNamespace(screen_name='fake_bot')
+
+
+class FakeTooManyRequests(Exception):
+    """Sustituto de tweepy.TooManyRequests"""
+    pass
+
+
+class FakeClient:
+    """Sustituto de tweepy.Client (v2, creación de tweets)"""
+
+    def __init__(self, **kwargs):
+        self.world = _state['world']
+        self.session = requests.Session()
+        self._next_id = iter(range(1_900_000_000_000_000_000, 2_000_000_000_000_000_000))
+        self._lock = threading.Lock()
+        self.tweets = []
+
+    def create_tweet(self, text=None, media_ids=None, **kwargs):
+        self.world.wait('tweet')
+        with self._lock:
+            tweet_id = str(next(self._next_id))
+            self.tweets.append({'id': tweet_id, 'text': text, 'media_ids': media_ids})
+        return types.SimpleNamespace(data={'id': tweet_id, 'text': text})
+
+    def get_me(self, **kwargs):
+        self.world.wait('lookup')
+        return types.SimpleNamespace(data=types.SimpleNamespace(id=42, username='fake_bot'))
+
+    def get_users_tweets(self, id, max_results=10, **kwargs):
+        self.world.wait('lookup')
+        with self._lock:
+            recent = self.tweets[-max_results:][::-1]
+        return types.SimpleNamespace(data=[types.SimpleNamespace(id=t['id'], text=t['text']) for t in recent])
+
+
+_state = {'world': None}
+
+
+def install(world):
+    """
+    Registra los módulos falsos `instaloader` y `tweepy` en sys.modules
+
+    Debe llamarse antes de importar los módulos del bot. Llamadas posteriores
+    solo cambian el FakeWorld que usan los objetos nuevos.
+    """
+    _state['world'] = world
+
+    fake_instaloader = types.ModuleType('instaloader')
+    fake_instaloader.Instaloader = FakeInstaloader
+    fake_instaloader.Profile = FakeProfile
+    fake_instaloader.Post = FakePost
+    fake_instaloader.NodeIterator = FakeNodeIterator
+    fake_instaloader.ProfileNotExistsException = FakeProfileNotExistsException
+    sys.modules['instaloader'] = fake_instaloader
+
+    fake_tweepy = types.ModuleType('tweepy')
+    fake_tweepy.Client = FakeClient
+    fake_tweepy.API = FakeAPI
+    fake_tweepy.OAuth1UserHandler = lambda *args, **kwargs: None
+    fake_tweepy.TooManyRequests = FakeTooManyRequests
+    sys.modules['tweepy'] = fake_tweepy
+
+
+def make_config(folder, **overrides):
+    """
+    Crea un módulo `config` con rutas dentro de `folder` y lo registra
+
+    Si ya hay un config falso registrado se actualiza en el mismo objeto,
+    porque main.py guarda la referencia al módulo al importarse.
+
+    Args:
+        folder: Carpeta temporal para media, historial y base de datos
+        **overrides: Valores de config.py a sobreescribir
+
+    Returns:
+        El módulo config registrado en sys.modules
+    """
+    folder = Path(folder)
+    config = sys.modules.get('config')
+    if not getattr(config, 'IS_FAKE', False):
+        config = types.ModuleType('config')
+        config.IS_FAKE = True
+
+    config.INSTAGRAM_USERNAME = 'perfil_falso'
+    config.INSTAGRAM_PASSWORD = ''
+    config.TWITTER_API_KEY = 'fake_key'
+    config.TWITTER_API_SECRET = 'fake_secret'
+    config.TWITTER_ACCESS_TOKEN = '42-fake_token'
+    config.TWITTER_ACCESS_SECRET = 'fake_access_secret'
+    config.TWITTER_BEARER_TOKEN = None
+    config.PROFILES = []
+    config.MEDIA_FOLDER = folder / 'media'
+    config.MEDIA_FOLDER.mkdir(parents=True, exist_ok=True)
+    config.HISTORIAL_FILE = folder / 'historial.json'
+    config.HISTORIAL_BACKEND = 'sqlite'
+    config.HISTORIAL_DB = folder / 'analytics.db'
+    config.CHECK_INTERVAL = 15
+    config.MAX_POSTS_TO_CHECK = 5
+    config.MAX_POSTS_BACKFILL = 50
+    config.TWEET_DELAY = 0
+    config.TWEET_PREFIX = ""
+    config.INCLUDE_INSTAGRAM_LINK = True
+    config.MAX_CAPTION_LENGTH = 250
+    config.METRICS_JSONL = folder / 'metrics.jsonl'
+    config.METRICS_PORT = None
+
+    for name, value in overrides.items():
+        setattr(config, name, value)
+
+    sys.modules['config'] = config
+    return config
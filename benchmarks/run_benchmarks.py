@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks offline de los caminos críticos del bot
+No usa red ni credenciales: instaloader y tweepy se reemplazan por los fakes
+de benchmarks/fakes.py (latencia y tasa de fallos configurables, deterministas
+por semilla). Mide format_caption, carga/guardado del historial,
+InstagramScraper.download_post e InstagramTwitterBot.process_new_posts.
+
+Cada benchmark reporta throughput, latencia p50/p99 y memoria pico
+(tracemalloc) en JSON, para comparar corridas entre commits.
+
+Ejecutar con: python benchmarks/run_benchmarks.py [--scale small] [--out resultados.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# Agregar parent directory al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import fakes
+
+# Los fakes deben estar registrados antes de importar los módulos del bot
+fakes.install(fakes.FakeWorld(posts=0))
+_bootstrap_dir = tempfile.TemporaryDirectory()
+config = fakes.make_config(_bootstrap_dir.name)
+
+from historial_store import open_historial
+from instagram_scraper import InstagramScraper
+from main import InstagramTwitterBot
+from media_cache import MediaCache
+from pipeline import PostPipeline
+from twitter_poster import TwitterPoster
+
+SCALES = {
+    'small': {'captions': 10_000, 'historial': 1_000, 'inserts': 50,
+              'downloads': 50, 'posts': 30, 'idle_polls': 20},
+    'realistic': {'captions': 100_000, 'historial': 100_000, 'inserts': 50,
+                  'downloads': 500, 'posts': 200, 'idle_polls': 100},
+}
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano (values ya ordenados)"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(name, latencies, total_s, peak_bytes, **params):
+    """Arma el resultado de un benchmark a partir de las latencias por operación"""
+    latencies = sorted(latencies)
+    return {
+        'name': name,
+        'ops': len(latencies),
+        'seconds': round(total_s, 6),
+        'throughput_per_s': round(len(latencies) / total_s, 3) if total_s else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 4),
+        'max_ms': round(latencies[-1] * 1000, 4) if latencies else 0.0,
+        'peak_mem_kb': round(peak_bytes / 1024, 1),
+        'params': params,
+    }
+
+
+@contextlib.contextmanager
+def measure():
+    """Mide tiempo total y memoria pico del bloque"""
+    result = {}
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - start
+        result['peak'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+
+def latency(args, mean_ms):
+    return fakes.Latency(mean_ms, args.jitter_ms, args.failure_rate)
+
+
+def make_world(args, posts, **kwargs):
+    world = fakes.FakeWorld(
+        posts=posts,
+        seed=args.seed,
+        images_per_post=args.images_per_post,
+        video_every=args.video_every,
+        profile_latency=latency(args, args.page_ms),
+        page_latency=latency(args, args.page_ms),
+        post_latency=latency(args, args.page_ms),
+        download_latency=latency(args, args.download_ms),
+        upload_latency=latency(args, args.upload_ms),
+        tweet_latency=latency(args, args.tweet_ms),
+        **kwargs
+    )
+    # Listar el perfil no debe fallar: los fallos se miden en descarga/subida/tweet
+    world.profile_latency.failure_rate = 0.0
+    world.page_latency.failure_rate = 0.0
+    fakes.install(world)
+    return world
+
+
+def make_poster(folder):
+    return TwitterPoster(
+        api_key=config.TWITTER_API_KEY,
+        api_secret=config.TWITTER_API_SECRET,
+        access_token=config.TWITTER_ACCESS_TOKEN,
+        access_secret=config.TWITTER_ACCESS_SECRET,
+        upload_state_folder=Path(folder) / 'uploads',
+        media_cache=MediaCache(config.HISTORIAL_DB)
+    )
+
+
+def make_record(i):
+    """Registro con la misma forma que guarda main.py"""
+    return {
+        'fecha_procesado': datetime(2024, 1, 1).isoformat(),
+        'instagram_url': f"https://www.instagram.com/p/SC{i:09d}/",
+        'tweet_id': str(2012432004734701900 + i),
+        'tweet_url': f"https://twitter.com/i/web/status/{2012432004734701900 + i}",
+        'caption': "Caption de prueba " * 5,
+        'tipo': 'imagen',
+        'archivos_descargados': [f"media/SC{i:09d}/foto.jpg"]
+    }
+
+
+def bench_format_caption(args, scale):
+    """format_caption sobre captions de largo variable (con y sin truncado)"""
+    rng = random.Random(args.seed)
+    captions = ["palabra " * rng.randint(0, 80) for _ in range(256)]
+    n = scale['captions']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fakes.make_config(tmp)
+        make_world(args, posts=0)
+        bot = InstagramTwitterBot(twitter=make_poster(tmp), pipeline=PostPipeline(tweet_delay=0))
+
+        latencies = []
+        with measure() as m:
+            for i in range(n):
+                start = time.perf_counter()
+                bot.format_caption(captions[i % len(captions)], "https://www.instagram.com/p/ABC123/")
+                latencies.append(time.perf_counter() - start)
+        bot.historial.close()
+
+    return [summarize('format_caption', latencies, m['seconds'], m['peak'], calls=n)]
+
+
+def bench_historial(args, scale):
+    """Carga del historial y insert + guardado por post, en ambos backends"""
+    size = scale['historial']
+    inserts = scale['inserts']
+    results = []
+
+    for backend in ('json', 'sqlite'):
+        with tempfile.TemporaryDirectory() as tmp:
+            config_ = fakes.make_config(tmp, HISTORIAL_BACKEND=backend)
+            historial = open_historial(backend, config_.HISTORIAL_FILE, config_.HISTORIAL_DB)
+            for i in range(size):
+                historial[f"SC{i:09d}"] = make_record(i)
+            historial.save()
+            historial.close()
+
+            with measure() as m:
+                start = time.perf_counter()
+                historial = open_historial(backend, config_.HISTORIAL_FILE, config_.HISTORIAL_DB)
+                load_s = time.perf_counter() - start
+            results.append(summarize(f'historial_load[{backend}]', [load_s], m['seconds'], m['peak'],
+                                     entries=size))
+
+            latencies = []
+            with measure() as m:
+                for i in range(inserts):
+                    start = time.perf_counter()
+                    historial[f"NEW{i:09d}"] = make_record(size + i)
+                    historial.save()
+                    latencies.append(time.perf_counter() - start)
+            historial.close()
+            results.append(summarize(f'historial_insert_save[{backend}]', latencies, m['seconds'],
+                                     m['peak'], entries=size, inserts=inserts))
+
+    return results
+
+
+def bench_download_post(args, scale):
+    """download_post en frío (fake de red) y en caliente (manifest ya escrito)"""
+    n = scale['downloads']
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_ = fakes.make_config(tmp)
+        world = make_world(args, posts=n)
+        scraper = InstagramScraper(username=config_.INSTAGRAM_USERNAME,
+                                   download_folder=str(config_.MEDIA_FOLDER))
+        shortcodes = [post.shortcode for post in world.posts]
+
+        for phase in ('cold', 'warm'):
+            latencies = []
+            failures = 0
+            with measure() as m:
+                for shortcode in shortcodes:
+                    start = time.perf_counter()
+                    if scraper.download_post(shortcode) is None:
+                        failures += 1
+                    latencies.append(time.perf_counter() - start)
+            results.append(summarize(f'download_post[{phase}]', latencies, m['seconds'], m['peak'],
+                                     posts=n, failures=failures, download_ms=args.download_ms))
+
+    return results
+
+
+def bench_process_new_posts(args, scale):
+    """
+    process_new_posts de punta a punta: un backlog de posts nuevos y luego
+    consultas sin novedades (el caso más común en producción)
+    """
+    n = scale['posts']
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Actualiza el mismo módulo config que importó main.py
+        fakes.make_config(tmp, MAX_POSTS_TO_CHECK=n, MAX_POSTS_BACKFILL=n)
+        world = make_world(args, posts=n)
+        pipeline = PostPipeline(
+            download_workers=args.download_workers,
+            upload_workers=args.upload_workers,
+            tweet_delay=0
+        )
+        bot = InstagramTwitterBot(twitter=make_poster(tmp), pipeline=pipeline)
+
+        # Latencia por post: desde el inicio de la corrida hasta su tweet
+        published_at = []
+        publish_post = bot.publish_post
+
+        def timed_publish(job):
+            publish_post(job)
+            published_at.append(time.perf_counter())
+
+        bot.publish_post = timed_publish
+
+        with measure() as m:
+            start = time.perf_counter()
+            bot.process_new_posts()
+        latencies = [t - start for t in published_at]
+        results.append(summarize('process_new_posts[backlog]', latencies, m['seconds'], m['peak'],
+                                 posts=n, published=len(bot.historial), calls=dict(world.calls),
+                                 max_posts_to_check=config.MAX_POSTS_TO_CHECK,
+                                 max_posts_backfill=config.MAX_POSTS_BACKFILL,
+                                 uploaded_bytes=world.uploaded_bytes,
+                                 download_workers=args.download_workers,
+                                 upload_workers=args.upload_workers))
+
+        # Sin posts nuevos: solo listar hasta la marca de agua
+        latencies = []
+        calls_before = dict(world.calls)
+        with measure() as m:
+            for _ in range(scale['idle_polls']):
+                start = time.perf_counter()
+                bot.process_new_posts()
+                latencies.append(time.perf_counter() - start)
+        # Requests a Instagram por revisión (perfil + páginas + posts sueltos)
+        instagram_calls = sum(world.calls[k] - calls_before[k] for k in ('profile', 'page', 'post'))
+        results.append(summarize('process_new_posts[idle]', latencies, m['seconds'], m['peak'],
+                                 posts=n, historial=len(bot.historial),
+                                 calls={k: world.calls[k] - calls_before[k] for k in world.calls},
+                                 instagram_requests_per_poll=round(instagram_calls / scale['idle_polls'], 3)))
+
+        pipeline.stop()
+        bot.historial.close()
+
+    return results
+
+
+BENCHMARKS = {
+    'format_caption': bench_format_caption,
+    'historial': bench_historial,
+    'download_post': bench_download_post,
+    'process_new_posts': bench_process_new_posts,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks offline del bot (sin red)')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='realistic',
+                        help='Tamaño de las cargas de trabajo')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS),
+                        help='Correr solo estos benchmarks')
+    parser.add_argument('--seed', type=int, default=1, help='Semilla de los fakes')
+    parser.add_argument('--page-ms', type=float, default=5.0, help='Latencia de perfil/página/post')
+    parser.add_argument('--download-ms', type=float, default=20.0, help='Latencia de descarga')
+    parser.add_argument('--upload-ms', type=float, default=30.0, help='Latencia de subida de media')
+    parser.add_argument('--tweet-ms', type=float, default=15.0, help='Latencia de crear un tweet')
+    parser.add_argument('--jitter-ms', type=float, default=2.0, help='Variación uniforme de latencia')
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help='Probabilidad de fallo de descarga/subida/tweet (0-1)')
+    parser.add_argument('--images-per-post', type=int, default=1, help='>1 genera carruseles')
+    parser.add_argument('--video-every', type=int, default=0, help='Cada cuántos posts uno es video')
+    parser.add_argument('--download-workers', type=int, default=1)
+    parser.add_argument('--upload-workers', type=int, default=2)
+    parser.add_argument('--out', help='Archivo donde guardar el JSON (default: stdout)')
+    args = parser.parse_args()
+
+    scale = SCALES[args.scale]
+    results = []
+    # Los prints del bot van a /dev/null: stdout queda solo para el JSON
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        for name in args.only or BENCHMARKS:
+            print(f"⏱️  {name}...", file=sys.stderr)
+            with contextlib.redirect_stdout(devnull):
+                results.extend(BENCHMARKS[name](args, scale))
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'args': vars(args),
+        'results': results,
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if args.out:
+        Path(args.out).write_text(output, encoding='utf-8')
+        print(f"✅ Resultados guardados en {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de navegadores Playwright de larga duración
+Lanzar Chromium cuesta segundos y cientos de MB; el pool mantiene un
+navegador + contexto vivo y entrega páginas nuevas sobre él. El navegador
+se recicla tras N páginas o si su memoria (RSS) supera un límite, y se
+reemplaza solo si se cae.
+
+La API sync de Playwright solo puede usarse desde el thread que la inició,
+así que cada thread tiene su propio navegador dentro del pool. Cada worker
+cierra el suyo con release() al terminar; los de threads que terminaron sin
+hacerlo se matan (driver y Chromium) en el próximo uso del pool o en close().
+
+Con state_dir el navegador arranca "tibio": cada thread usa un perfil de
+Chromium persistente (data/browser/profile-N, con su caché HTTP en disco) y
+las cookies y el localStorage se guardan en storage_state.json, que se
+carga en cada contexto nuevo. El diálogo de cookies y la descarga de los
+recursos de la primera página ocurren una vez por instalación.
+"""
+import json
+import os
+import signal
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from playwright.sync_api import sync_playwright
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+class _BrowserState:
+    """Navegador y contexto de un thread"""
+
+    def __init__(self, playwright, browser, context, slot=None):
+        self.playwright = playwright
+        # None con perfil persistente (el contexto es el navegador)
+        self.browser = browser
+        self.context = context
+        self.slot = slot
+        self.thread = threading.current_thread()
+        self.pages_served = 0
+        # Páginas entregadas y todavía abiertas: no se recicla mientras haya alguna
+        self.pages_in_use = 0
+        # Proceso del driver de Playwright de este thread (Chromium cuelga de él)
+        self.driver_pid = _driver_pid(playwright)
+
+
+def _driver_pid(playwright):
+    """PID del driver (node) que lanzó sync_playwright(); None si no se puede saber"""
+    try:
+        return playwright._impl_obj._connection._transport._proc.pid
+    except AttributeError:
+        return None
+
+
+class BrowserPool:
+    def __init__(self, headless=True, max_pages=50, max_rss_mb=1024, context_options=None, state_dir=None):
+        """
+        Inicializa el pool (el navegador se lanza en el primer uso)
+
+        Args:
+            headless: Si es True, el navegador se ejecuta sin interfaz
+            max_pages: Páginas servidas antes de reciclar el navegador
+            max_rss_mb: Memoria del navegador de cada thread (driver y Chromium)
+                antes de reciclarlo (requiere psutil; sin psutil solo se recicla por páginas)
+            context_options: Opciones extra para browser.new_context
+            state_dir: Carpeta de perfiles persistentes y storage_state.json
+                (None = cada navegador arranca de cero)
+        """
+        self.headless = headless
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.context_options = {
+            'user_agent': DEFAULT_USER_AGENT,
+            'viewport': {'width': 1920, 'height': 1080},
+        }
+        self.context_options.update(context_options or {})
+
+        self.state_dir = Path(state_dir) if state_dir else None
+        self.state_file = self.state_dir / 'storage_state.json' if self.state_dir else None
+        self._slots = set()
+        self._slots_lock = threading.Lock()
+
+        # Navegadores vivos de todos los threads (para cerrarlos desde close())
+        self._states = set()
+        self._states_lock = threading.Lock()
+
+        self._local = threading.local()
+
+    @contextmanager
+    def page(self):
+        """
+        Entrega una página nueva sobre el navegador del thread actual
+
+        Uso:
+            with pool.page() as page:
+                page.goto(url)
+        """
+        state = self._acquire()
+        page = state.context.new_page()
+        state.pages_in_use += 1
+
+        try:
+            yield page
+        finally:
+            state.pages_in_use -= 1
+            state.pages_served += 1
+            try:
+                page.close()
+            except Exception:
+                pass
+
+            # Si el navegador se cayó durante el uso, se reemplaza en el próximo
+            if not self._is_healthy(state):
+                self._discard(state)
+
+    @property
+    def context(self):
+        """Contexto del navegador del thread actual (cookies compartidas entre páginas)"""
+        return self._acquire().context
+
+    def release(self):
+        """Cierra el navegador del thread actual (llamar al terminar cada worker)"""
+        state = getattr(self._local, 'state', None)
+        if state:
+            self._discard(state)
+
+    def close(self):
+        """
+        Cierra todos los navegadores del pool
+
+        El del thread actual se cierra normalmente. Los de otros threads no se
+        pueden tocar desde acá (API sync de Playwright): se termina su driver y
+        sus procesos de Chromium.
+        """
+        self.release()
+        with self._states_lock:
+            others = list(self._states)
+        for state in others:
+            self._kill(state)
+
+    def _reap_orphans(self):
+        """Mata los navegadores de threads que terminaron sin release()"""
+        with self._states_lock:
+            orphans = [state for state in self._states if not state.thread.is_alive()]
+        for state in orphans:
+            print(f"🧹 Cerrando navegador de un thread terminado ({state.thread.name})")
+            self._kill(state)
+
+    def _kill(self, state):
+        """Termina el driver de Playwright de otro thread y su Chromium"""
+        with self._states_lock:
+            if state not in self._states:
+                return
+            self._states.discard(state)
+
+        if state.driver_pid is not None:
+            processes = []
+            if psutil is not None:
+                try:
+                    driver = psutil.Process(state.driver_pid)
+                    # El driver primero: al recibir SIGTERM cierra sus navegadores
+                    processes = [driver] + driver.children(recursive=True)
+                except psutil.Error:
+                    processes = []
+                for process in processes:
+                    try:
+                        process.terminate()
+                    except psutil.Error:
+                        pass
+                _, alive = psutil.wait_procs(processes, timeout=5)
+                for process in alive:
+                    try:
+                        process.kill()
+                    except psutil.Error:
+                        pass
+            else:
+                # El driver cierra sus navegadores al recibir SIGTERM
+                try:
+                    os.kill(state.driver_pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+        if state.slot is not None:
+            self._release_slot(state.slot)
+
+    def _acquire(self):
+        self._reap_orphans()
+        state = getattr(self._local, 'state', None)
+
+        if state and not self._is_healthy(state):
+            print("⚠️ Navegador caído, lanzando uno nuevo...")
+            self._discard(state)
+            state = None
+
+        # Con páginas abiertas (varias a la vez en el mismo contexto) se recicla
+        # cuando se cierren todas; cerrarlo ahora las rompería
+        if state and state.pages_in_use == 0 and self._needs_recycle(state):
+            print(f"♻️  Reciclando navegador ({state.pages_served} páginas)")
+            self._discard(state)
+            state = None
+
+        if state is None:
+            state = self._launch()
+            self._local.state = state
+            with self._states_lock:
+                self._states.add(state)
+
+        return state
+
+    def _launch(self):
+        print(f"🌐 Abriendo navegador...")
+        playwright = sync_playwright().start()
+        slot = None
+        try:
+            if self.state_dir is None:
+                browser = playwright.chromium.launch(headless=self.headless)
+                context = browser.new_context(**self.context_options)
+            else:
+                # Un perfil por navegador vivo: Chromium bloquea el directorio en uso
+                slot = self._take_slot()
+                browser = None
+                context = playwright.chromium.launch_persistent_context(
+                    str(self.state_dir / f"profile-{slot}"),
+                    headless=self.headless,
+                    **self.context_options
+                )
+                self._load_state(context)
+        except Exception:
+            if slot is not None:
+                self._release_slot(slot)
+            playwright.stop()
+            raise
+        return _BrowserState(playwright, browser, context, slot)
+
+    def _take_slot(self):
+        with self._slots_lock:
+            slot = 0
+            while slot in self._slots:
+                slot += 1
+            self._slots.add(slot)
+        return slot
+
+    def _release_slot(self, slot):
+        with self._slots_lock:
+            self._slots.discard(slot)
+
+    def _load_state(self, context):
+        """Carga cookies y localStorage guardados por cualquier navegador del pool"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if state.get('cookies'):
+            context.add_cookies(state['cookies'])
+
+        # localStorage por origen: se restaura antes de que corra el JS de la página
+        origins = {origin['origin']: origin['localStorage'] for origin in state.get('origins', [])}
+        if origins:
+            context.add_init_script(
+                "(() => { const saved = %s[location.origin];"
+                " if (saved) for (const item of saved)"
+                " if (localStorage.getItem(item.name) === null) localStorage.setItem(item.name, item.value); })()"
+                % json.dumps(origins)
+            )
+
+    def save_state(self):
+        """Guarda cookies y localStorage del navegador del thread actual"""
+        state = getattr(self._local, 'state', None)
+        if self.state_file is None or state is None:
+            return
+        self._save_state(state)
+
+    def _save_state(self, state):
+        tmp_path = self.state_file.with_name(f"{self.state_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            state.context.storage_state(path=str(tmp_path))
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"⚠️ No se pudo guardar el estado del navegador: {e}")
+
+    def _discard(self, state):
+        with self._states_lock:
+            self._states.discard(state)
+
+        if self.state_file is not None and self._is_healthy(state):
+            self._save_state(state)
+
+        closers = [state.context.close, state.playwright.stop]
+        if state.browser is not None:
+            closers.insert(1, state.browser.close)
+        for close in closers:
+            try:
+                close()
+            except Exception:
+                pass
+
+        if state.slot is not None:
+            self._release_slot(state.slot)
+
+        if getattr(self._local, 'state', None) is state:
+            self._local.state = None
+
+    def _is_healthy(self, state):
+        """El navegador sigue conectado y el contexto responde"""
+        try:
+            if state.browser is not None and not state.browser.is_connected():
+                return False
+            # Round trip barato al navegador
+            state.context.cookies()
+            return True
+        except Exception:
+            return False
+
+    def _needs_recycle(self, state):
+        if state.pages_served >= self.max_pages:
+            return True
+        return self._browser_rss_mb(state) > self.max_rss_mb
+
+    def _browser_rss_mb(self, state):
+        """Memoria RSS del driver y el Chromium de este thread, en MB"""
+        if psutil is None or state.driver_pid is None:
+            return 0
+
+        # Solo este árbol: los navegadores de otros threads y los workers de
+        # preprocesado también son hijos del proceso
+        try:
+            driver = psutil.Process(state.driver_pid)
+            processes = [driver] + driver.children(recursive=True)
+        except psutil.Error:
+            return 0
+
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
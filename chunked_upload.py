@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Subida de videos por partes (chunked upload) que se puede reanudar
+El estado de cada subida (media_id y segmentos ya confirmados) se guarda en
+disco después de cada APPEND. Si la subida falla o el proceso se reinicia,
+la siguiente llamada continúa desde el último segmento confirmado en lugar
+de reenviar el archivo completo.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+from pathlib import Path
+
+# Twitter acepta partes de hasta 5 MiB y máximo 1000 segmentos
+MAX_CHUNK_SIZE = 5 * 1024 * 1024
+MAX_SEGMENTS = 1000
+
+# Margen para no reanudar una sesión a punto de expirar
+EXPIRY_MARGIN_SECS = 300
+
+
+class VideoRejectedError(Exception):
+    """Twitter procesó el video y lo rechazó"""
+    pass
+
+
+class ResumableVideoUploader:
+    def __init__(self, api, state_folder, chunk_size=4 * 1024 * 1024, on_chunk=None):
+        """
+        Inicializa el uploader
+
+        Args:
+            api: tweepy.API (v1.1) con los endpoints de media/upload
+            state_folder: Carpeta donde se guarda el estado de las subidas en curso
+            chunk_size: Tamaño de cada parte en bytes (máximo 5 MiB)
+            on_chunk: Callback on_chunk(stats) tras cada parte confirmada
+        """
+        self.api = api
+        self.state_folder = Path(state_folder)
+        self.state_folder.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = min(chunk_size, MAX_CHUNK_SIZE)
+        self.on_chunk = on_chunk
+
+        # Métricas de la última subida de cada thread: una entrada por parte
+        self._local = threading.local()
+
+    @property
+    def last_stats(self):
+        return getattr(self._local, 'stats', [])
+
+    def upload(self, file_path, media_category='tweet_video'):
+        """
+        Sube un video, reanudando una subida previa si existe
+
+        Args:
+            file_path: Ruta al video
+            media_category: Categoría de media de Twitter
+
+        Returns:
+            Media de Twitter (media_id ya procesado y listo para tuitear)
+        """
+        file_path = Path(file_path)
+        file_size = file_path.stat().st_size
+        state_path = self._state_path(file_path)
+        self._local.stats = []
+
+        state = self._load_state(state_path)
+        if state:
+            print(f"⏯️  Reanudando subida de {file_path.name} "
+                  f"({state['segments_sent']}/{state['segments']} partes ya enviadas)")
+        else:
+            state = self._init_upload(file_path, file_size, media_category)
+            self._save_state(state_path, state)
+
+        try:
+            self._append_segments(file_path, state, state_path)
+            media = self.api.chunked_upload_finalize(state['media_id'])
+            media = self._wait_processing(media)
+        except Exception as e:
+            # Sesión expirada o rechazada: la próxima vez se empieza de cero
+            if isinstance(e, VideoRejectedError) or _is_invalid_session(e):
+                state_path.unlink(missing_ok=True)
+            raise
+
+        state_path.unlink(missing_ok=True)
+        return media
+
+    def summary(self):
+        """
+        Resume las métricas de la última subida
+
+        Returns:
+            Dict con bytes, segundos, MB/s y latencia media/máxima por parte
+        """
+        if not self.last_stats:
+            return {'chunks': 0, 'bytes': 0, 'seconds': 0.0, 'mb_per_s': 0.0,
+                    'avg_latency_s': 0.0, 'max_latency_s': 0.0}
+
+        total_bytes = sum(chunk['bytes'] for chunk in self.last_stats)
+        total_secs = sum(chunk['seconds'] for chunk in self.last_stats)
+        latencies = [chunk['seconds'] for chunk in self.last_stats]
+
+        return {
+            'chunks': len(self.last_stats),
+            'bytes': total_bytes,
+            'seconds': total_secs,
+            'mb_per_s': total_bytes / (1024 * 1024) / total_secs if total_secs else 0.0,
+            'avg_latency_s': total_secs / len(latencies),
+            'max_latency_s': max(latencies),
+        }
+
+    def _init_upload(self, file_path, file_size, media_category):
+        # Con archivos grandes la parte crece para no pasar de 1000 segmentos
+        chunk_size = max(self.chunk_size, -(-file_size // MAX_SEGMENTS))
+        media_type = mimetypes.guess_type(str(file_path))[0] or 'video/mp4'
+
+        media = self.api.chunked_upload_init(file_size, media_type, media_category=media_category)
+        expires_after = getattr(media, 'expires_after_secs', 86400)
+
+        return {
+            'media_id': media.media_id,
+            'file': str(file_path),
+            'size': file_size,
+            'mtime_ns': file_path.stat().st_mtime_ns,
+            'chunk_size': chunk_size,
+            'segments': -(-file_size // chunk_size),
+            'segments_sent': 0,
+            'expires_at': time.time() + expires_after,
+        }
+
+    def _append_segments(self, file_path, state, state_path):
+        chunk_size = state['chunk_size']
+
+        with open(file_path, 'rb') as f:
+            f.seek(state['segments_sent'] * chunk_size)
+
+            for segment_index in range(state['segments_sent'], state['segments']):
+                chunk = f.read(chunk_size)
+
+                start = time.perf_counter()
+                self.api.chunked_upload_append(state['media_id'], (file_path.name, chunk), segment_index)
+                seconds = time.perf_counter() - start
+
+                # Segmento confirmado: se persiste antes de enviar el siguiente
+                state['segments_sent'] = segment_index + 1
+                self._save_state(state_path, state)
+
+                stats = {
+                    'segment': segment_index,
+                    'segments': state['segments'],
+                    'bytes': len(chunk),
+                    'seconds': seconds,
+                    'mb_per_s': len(chunk) / (1024 * 1024) / seconds if seconds else 0.0,
+                }
+                self._local.stats.append(stats)
+
+                if self.on_chunk:
+                    self.on_chunk(stats)
+
+    def _wait_processing(self, media):
+        """Espera a que Twitter termine de procesar el video"""
+        info = getattr(media, 'processing_info', None)
+
+        while info and info.get('state') in ('pending', 'in_progress'):
+            time.sleep(info.get('check_after_secs', 1))
+            media = self.api.get_media_upload_status(media.media_id)
+            info = getattr(media, 'processing_info', None)
+
+        if info and info.get('state') == 'failed':
+            error = info.get('error', {}).get('message', 'procesamiento fallido')
+            raise VideoRejectedError(f"Twitter rechazó el video: {error}")
+
+        return media
+
+    def _state_path(self, file_path):
+        # Clave por ruta, tamaño y fecha de modificación: si el archivo cambia
+        # no se reanuda una subida con bytes viejos
+        stat = file_path.stat()
+        key = f"{file_path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+        return self.state_folder / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+    def _load_state(self, state_path):
+        if not state_path.exists():
+            return None
+
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state_path.unlink(missing_ok=True)
+            return None
+
+        # Las sesiones de subida de Twitter expiran (24 h para videos)
+        if time.time() > state['expires_at'] - EXPIRY_MARGIN_SECS:
+            state_path.unlink(missing_ok=True)
+            return None
+
+        return state
+
+    def _save_state(self, state_path, state):
+        tmp_path = state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+
+def _is_invalid_session(error):
+    """El media_id ya no es válido en Twitter (expiró o fue descartado)"""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    return status in (400, 404) and 'media' in str(error).lower()
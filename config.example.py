@@ -21,6 +21,60 @@ TWITTER_ACCESS_TOKEN = "tu_access_token"
 TWITTER_ACCESS_SECRET = "tu_access_secret"
 TWITTER_BEARER_TOKEN = "tu_bearer_token"  # Opcional para API v2
 
+# Archivos de un mismo tweet que se suben a la vez (carruseles de hasta 4)
+TWITTER_MAX_PARALLEL_UPLOADS = 4
+
+# Los videos se suben por partes de este tamaño (máximo 5 MB); si una subida
+# falla, el siguiente intento continúa desde la última parte confirmada
+TWITTER_VIDEO_CHUNK_MB = 4
+
+# Reutilizar el media_id de un archivo idéntico ya subido a la misma cuenta
+# (mientras Twitter lo mantenga vigente, 24 h) en lugar de volver a subirlo
+MEDIA_CACHE_ENABLED = True
+
+# Optimizar imágenes antes de subirlas: reduce resolución, recomprime, quita
+# metadatos (EXIF) y convierte PNG/WEBP a JPEG. Corre en procesos aparte y el
+# resultado se guarda en media/.optimizadas
+IMAGE_PREPROCESS_ENABLED = True
+# Lado máximo en píxeles
+IMAGE_MAX_SIDE = 2048
+# Calidad JPEG (1-95)
+IMAGE_JPEG_QUALITY = 85
+# Procesos dedicados a optimizar imágenes
+IMAGE_PREPROCESS_WORKERS = 2
+
+# Límites de la API: el bot lleva la cuenta de requests por tipo de endpoint
+# y cuenta (sincronizada con los headers de Twitter) en vez de dormir a ciegas.
+# Segundos que se espera a que se libere un límite; si falta más, el post se
+# reintenta en la próxima revisión
+TWITTER_MAX_RATE_LIMIT_WAIT = 60
+# Límites iniciales (requests, segundos por ventana) hasta recibir los reales;
+# None usa los valores por defecto
+TWITTER_RATE_LIMITS = None  # ej: {"tweet": (100, 900), "media": (400, 900)}
+
+# ====================
+# MODO MULTI-PERFIL (opcional)
+# ====================
+# Lista de perfiles de Instagram y la cuenta de Twitter donde se publica cada uno.
+# Si está vacía se usa INSTAGRAM_USERNAME con las credenciales de arriba.
+# Si un perfil no trae "twitter", usa las credenciales de arriba.
+PROFILES = [
+    # {
+    #     "instagram": "perfil_1",
+    #     "twitter": {
+    #         "api_key": "...",
+    #         "api_secret": "...",
+    #         "access_token": "...",
+    #         "access_secret": "...",
+    #         "bearer_token": "...",
+    #     },
+    # },
+    # {"instagram": "perfil_2"},
+]
+
+# Perfiles que se revisan a la vez (comparten los workers del pipeline)
+MULTI_PROFILE_WORKERS = 2
+
 # ====================
 # CONFIGURACIÓN GENERAL
 # ====================
@@ -31,12 +85,67 @@ MEDIA_FOLDER.mkdir(exist_ok=True)
 # Archivo para trackear qué posts ya se publicaron
 HISTORIAL_FILE = Path(__file__).parent / "historial.json"
 
+# Backend del historial: "sqlite" (recomendado) o "json" (legacy)
+# Con "sqlite" el historial.json se importa automáticamente la primera vez
+HISTORIAL_BACKEND = "sqlite"
+
+# Base de datos SQLite (la misma que usa el dashboard)
+HISTORIAL_DB = Path(__file__).parent / "data" / "analytics.db"
+
+# Copiar cada post publicado a la tabla posts del dashboard (en lotes)
+DASHBOARD_SYNC_ENABLED = True
+
 # Intervalo de verificación (en minutos)
 CHECK_INTERVAL = 15
 
+# Intervalo adaptativo: revisa más seguido en los horarios en que el perfil
+# suele publicar (aprendidos del historial) y menos en horas tranquilas.
+# CHECK_INTERVAL pasa a ser el intervalo promedio.
+ADAPTIVE_POLLING = True
+# Consultas por hora entre todos los perfiles (None = las mismas que con
+# intervalo fijo: 60 / CHECK_INTERVAL por perfil)
+POLL_BUDGET_PER_HOUR = None
+# Límites del intervalo de cada perfil (en minutos)
+MIN_POLL_MINUTES = 2
+MAX_POLL_MINUTES = 120
+
 # Número máximo de posts a revisar en cada ejecución
 MAX_POSTS_TO_CHECK = 5
 
+# Horas que se reutiliza el id numérico de cada perfil de Instagram (guardado
+# en data/analytics.db) para no pedir la página del perfil en cada revisión
+# (0 = resolverlo siempre)
+PROFILE_ID_CACHE_TTL_HOURS = 168
+
+# Una vez hay marca de agua (último post procesado), el bot solo pide posts
+# más nuevos que ella; tras una caída larga retrocede como máximo esta cantidad
+MAX_POSTS_BACKFILL = 50
+
+# Cola persistente de posts (data/analytics.db): cada etapa completada se
+# guarda y tras un crash el post continúa desde donde quedó
+# Intentos por post antes de descartarlo
+JOB_MAX_ATTEMPTS = 3
+# Segundos que un proceso retiene un post en curso; si muere, otro lo retoma
+JOB_LEASE_SECS = 600
+
+# Métricas: cada etapa (listado, descarga, preprocesado, subida, tweet) se
+# mide y se guarda como una línea JSON (None = no guardar)
+METRICS_JSONL = Path(__file__).parent / "data" / "metrics.jsonl"
+# Endpoint local con formato Prometheus en http://127.0.0.1:PUERTO/metrics
+# (None = desactivado)
+METRICS_PORT = 9108
+METRICS_HOST = "127.0.0.1"
+
+# Pipeline de procesamiento (descarga → subida → tweet)
+# Threads descargando de Instagram (comparten la sesión de Instaloader)
+PIPELINE_DOWNLOAD_WORKERS = 1
+# Threads subiendo media a Twitter
+PIPELINE_UPLOAD_WORKERS = 2
+# Posts en espera entre una etapa y la siguiente
+PIPELINE_QUEUE_SIZE = 4
+# Segundos mínimos entre tweets consecutivos
+TWEET_DELAY = 5
+
 # Prefijo para los tweets (opcional)
 TWEET_PREFIX = ""  # Ejemplo: "Nuevo en Instagram: "
 
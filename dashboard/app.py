@@ -7,11 +7,14 @@ Ejecutar con: streamlit run dashboard/app.py
 """
 import streamlit as st
 import sys
+from datetime import datetime
 from pathlib import Path
 
 # Agregar parent directory al path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from dashboard.services import get_stats_service, format_count, format_duration, time_ago
+
 # Configuración de la página
 st.set_page_config(
     page_title="Social Media Dashboard",
@@ -69,6 +72,26 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Stats desde los rollups (caché hasta que el bot escriba en la base)
+stats = get_stats_service()
+overview = stats.overview(days=7)
+total, week, previous_week = overview['total'], overview['period'], overview['previous']
+
+
+def percent(value):
+    return f"{value:.1f}%" if value is not None else "—"
+
+
+def percent_delta(current, previous):
+    if current is None or previous is None:
+        return None
+    return f"{current - previous:+.1f}%"
+
+
+def growth(current, previous):
+    return f"{(current - previous) / previous * 100:+.0f}%" if previous else None
+
+
 # Sidebar
 with st.sidebar:
     st.image("https://via.placeholder.com/300x100/4CAF50/FFFFFF?text=Social+Media+Bot", use_container_width=True)
@@ -77,12 +100,13 @@ with st.sidebar:
 
     st.markdown("## 📊 Quick Stats")
 
-    # Quick stats (dummy data por ahora)
+    # Quick stats
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("Posts", "156", delta="12")
+        st.metric("Posts", format_count(total['posts']), delta=week['posts'] or None)
     with col2:
-        st.metric("Success", "98%", delta="2%")
+        st.metric("Success", percent(total['success_rate']),
+                  delta=percent_delta(week['success_rate'], previous_week['success_rate']))
 
     st.markdown("---")
 
@@ -121,32 +145,36 @@ with tab1:
     with col1:
         st.metric(
             label="Total Posts",
-            value="156",
-            delta="+23 this week",
+            value=format_count(total['posts']),
+            delta=f"+{week['posts']} this week",
             delta_color="normal"
         )
 
     with col2:
+        avg_engagement = total['engagement'] / total['posts'] if total['posts'] else None
         st.metric(
             label="Avg. Engagement",
-            value="12.5K",
-            delta="+15%",
+            value=format_count(avg_engagement),
+            delta=growth(week['engagement'], previous_week['engagement']),
             delta_color="normal"
         )
 
     with col3:
         st.metric(
             label="Success Rate",
-            value="98.2%",
-            delta="+1.2%",
+            value=percent(total['success_rate']),
+            delta=percent_delta(week['success_rate'], previous_week['success_rate']),
             delta_color="normal"
         )
 
     with col4:
+        last_run = stats.last_run()
+        running = last_run is not None and last_run['status'] == 'running'
         st.metric(
             label="Bot Status",
-            value="Active",
-            delta="2h uptime",
+            value="Active" if running else "Stopped",
+            delta=f"{format_duration((datetime.utcnow() - last_run['started_at']).total_seconds())} uptime"
+            if running else None,
             delta_color="off"
         )
 
@@ -159,16 +187,14 @@ with tab1:
     # Actividad reciente
     st.subheader("🕒 Recent Activity")
 
-    activities = [
-        {"time": "2 min ago", "action": "Post published on Twitter", "status": "success"},
-        {"time": "15 min ago", "action": "New post downloaded from Instagram", "status": "success"},
-        {"time": "1 hour ago", "action": "Bot started automatically", "status": "info"},
-        {"time": "2 hours ago", "action": "Post published on Twitter", "status": "success"},
-    ]
+    recent = stats.recent_posts(limit=4)
+    if not recent:
+        st.info("No posts processed yet.")
 
-    for activity in activities:
-        icon = "✅" if activity["status"] == "success" else "ℹ️"
-        st.markdown(f"{icon} **{activity['time']}** - {activity['action']}")
+    for post in recent:
+        icon = "✅" if post["status"] == "success" else "⚠️" if post["status"] == "failed" else "ℹ️"
+        st.markdown(f"{icon} **{time_ago(post['processed_at'])}** - "
+                    f"Post {post['shortcode']} {post['status']} on {post['platform'].capitalize()}")
 
 with tab2:
     st.subheader("🚀 Quick Actions")
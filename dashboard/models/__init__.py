@@ -1,4 +1,8 @@
 """Models package for dashboard database"""
-from .database import Base, engine, Session, Post, Analytics, BotRun
+from .database import (
+    Base, engine, reader_engine, Session, ReadSession, create_sqlite_engine,
+    Post, MetricSnapshot, MetricName, MetricExtra, BotRun, METRIC_COLUMNS
+)
 
-__all__ = ['Base', 'engine', 'Session', 'Post', 'Analytics', 'BotRun']
+__all__ = ['Base', 'engine', 'reader_engine', 'Session', 'ReadSession', 'create_sqlite_engine',
+           'Post', 'MetricSnapshot', 'MetricName', 'MetricExtra', 'BotRun', 'METRIC_COLUMNS']
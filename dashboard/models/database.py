@@ -1,13 +1,15 @@
 # -*- coding: utf-8 -*-
 """
 SQLite Database Models for Social Media Dashboard
-Schema for posts, analytics, and bot runs
+Schema for posts, metric snapshots, and bot runs
 """
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, ForeignKey, Index
+from sqlalchemy import create_engine, event, Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import QueuePool
 from datetime import datetime
 import os
+import time
 from pathlib import Path
 
 # Base para modelos
@@ -17,15 +19,85 @@ Base = declarative_base()
 DB_PATH = Path(__file__).parent.parent.parent / 'data' / 'analytics.db'
 DB_PATH.parent.mkdir(exist_ok=True)
 
-# Engine de SQLite
-engine = create_engine(
-    f'sqlite:///{DB_PATH}',
-    echo=False,  # Cambiar a True para debugging
-    connect_args={'check_same_thread': False}  # Necesario para Streamlit
-)
-
-# Session factory
+# PRAGMAs de cada conexión
+# - WAL: los lectores (Streamlit) no bloquean al escritor (bot) ni al revés
+# - synchronous=NORMAL: con WAL un corte de luz puede perder el último commit,
+#   nunca corromper la base
+# - busy_timeout: esperar el lock en lugar de fallar con "database is locked"
+# - cache_size negativo es en KiB; mmap_size en bytes
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 30000,
+    'cache_size': -16384,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def create_sqlite_engine(db_path=DB_PATH, readonly=False, pool_size=1, echo=False):
+    """
+    Engine de SQLite con los PRAGMAs del dashboard
+
+    Args:
+        db_path: Ruta al archivo .db
+        readonly: Conexiones de solo lectura (PRAGMA query_only)
+        pool_size: Conexiones del pool. El escritor usa una sola: las escrituras
+            del proceso se turnan en el pool en vez de competir por el lock
+        echo: Loguear el SQL (debugging)
+
+    Returns:
+        Engine de SQLAlchemy
+    """
+    new_engine = create_engine(
+        f'sqlite:///{db_path}',
+        echo=echo,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=pool_size if readonly else 0,
+        pool_timeout=SQLITE_PRAGMAS['busy_timeout'] / 1000,
+        connect_args={
+            'check_same_thread': False,  # Necesario para Streamlit
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+        }
+    )
+
+    @event.listens_for(new_engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        # Las transacciones las abre el evento 'begin' (pysqlite las demora
+        # hasta el primer INSERT y no deja elegir el tipo de BEGIN)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if readonly:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(new_engine, 'begin')
+    def _on_begin(conn):
+        # IMMEDIATE: el escritor toma el lock al empezar la transacción; si
+        # lo pidiera recién al escribir, con WAL fallaría sin esperar cuando
+        # otro escribió desde su primera lectura. Los lectores leen un
+        # snapshot consistente sin bloquear a nadie.
+        conn.exec_driver_sql("BEGIN" if readonly else "BEGIN IMMEDIATE")
+
+    return new_engine
+
+
+# Engine de escritura (bot, migraciones, rollups)
+engine = create_sqlite_engine(DB_PATH)
+
+# Engine de lectura (páginas del dashboard), con su propio pool
+reader_engine = create_sqlite_engine(DB_PATH, readonly=True, pool_size=4)
+
+# Session factories
 Session = sessionmaker(bind=engine)
+ReadSession = sessionmaker(bind=reader_engine)
+
+# Métricas con columna propia en metric_snapshots; las demás van a
+# metric_extras con un id entero de metric_names
+METRIC_COLUMNS = ('likes', 'comments', 'retweets', 'replies', 'quotes', 'shares', 'saves', 'views')
 
 
 class Post(Base):
@@ -44,29 +116,72 @@ class Post(Base):
     processed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     status = Column(String(20), default='success')  # 'success', 'failed', 'pending'
 
-    # Relación con analytics
-    analytics = relationship('Analytics', back_populates='post', cascade='all, delete-orphan')
+    # Relación con las métricas
+    snapshots = relationship('MetricSnapshot', back_populates='post', cascade='all, delete-orphan')
+    extras = relationship('MetricExtra', back_populates='post', cascade='all, delete-orphan')
 
     def __repr__(self):
         return f"<Post(shortcode='{self.shortcode}', platform='{self.platform_target}', status='{self.status}')>"
 
 
-class Analytics(Base):
-    """Modelo de Métricas de Engagement"""
-    __tablename__ = 'analytics'
+class MetricSnapshot(Base):
+    """
+    Modelo de Métricas de Engagement: una fila ancha por snapshot
+
+    La clave (post_id, platform, collected_at) es la clave primaria de una
+    tabla WITHOUT ROWID, así que las filas quedan ordenadas por ella en disco:
+    la serie de un post es un rango contiguo. collected_at son segundos Unix UTC.
+    Una columna en NULL es una métrica que la plataforma no informa.
+    """
+    __tablename__ = 'metric_snapshots'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    post_id = Column(Integer, ForeignKey('posts.id'), primary_key=True)
+    platform = Column(String(20), primary_key=True)  # 'instagram', 'twitter', 'facebook'
+    collected_at = Column(Integer, primary_key=True, default=lambda: int(time.time()))
+    likes = Column(Integer)
+    comments = Column(Integer)
+    retweets = Column(Integer)
+    replies = Column(Integer)
+    quotes = Column(Integer)
+    shares = Column(Integer)
+    saves = Column(Integer)
+    views = Column(Integer)
+
+    # Relación con post
+    post = relationship('Post', back_populates='snapshots')
+
+    def __repr__(self):
+        return f"<MetricSnapshot(post_id={self.post_id}, platform='{self.platform}', collected_at={self.collected_at})>"
+
+
+class MetricName(Base):
+    """Catálogo de métricas sin columna propia (id entero por nombre)"""
+    __tablename__ = 'metric_names'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    post_id = Column(Integer, ForeignKey('posts.id'), nullable=False, index=True)
-    platform = Column(String(20), nullable=False)  # 'instagram', 'twitter', 'facebook'
-    metric_name = Column(String(50), nullable=False)  # 'likes', 'retweets', 'views', 'comments'
-    metric_value = Column(Integer)
-    collected_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    name = Column(String(50), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f"<MetricName(id={self.id}, name='{self.name}')>"
+
+
+class MetricExtra(Base):
+    """Valores de métricas sin columna propia, con la misma clave que el snapshot"""
+    __tablename__ = 'metric_extras'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    post_id = Column(Integer, ForeignKey('posts.id'), primary_key=True)
+    platform = Column(String(20), primary_key=True)
+    collected_at = Column(Integer, primary_key=True)
+    metric_id = Column(Integer, ForeignKey('metric_names.id'), primary_key=True)
+    value = Column(Integer)
 
     # Relación con post
-    post = relationship('Post', back_populates='analytics')
+    post = relationship('Post', back_populates='extras')
 
     def __repr__(self):
-        return f"<Analytics(post_id={self.post_id}, metric='{self.metric_name}', value={self.metric_value})>"
+        return f"<MetricExtra(post_id={self.post_id}, metric_id={self.metric_id}, value={self.value})>"
 
 
 class BotRun(Base):
@@ -119,12 +234,12 @@ if __name__ == "__main__":
     # Contar registros
     session = get_session()
     post_count = session.query(Post).count()
-    analytics_count = session.query(Analytics).count()
+    snapshots_count = session.query(MetricSnapshot).count()
     bot_runs_count = session.query(BotRun).count()
     session.close()
 
     print(f"\nRegistros actuales:")
     print(f"  Posts: {post_count}")
-    print(f"  Analytics: {analytics_count}")
+    print(f"  Metric snapshots: {snapshots_count}")
     print(f"  Bot Runs: {bot_runs_count}")
     print("\n" + "=" * 60)
@@ -12,24 +12,37 @@ import json
 # Agregar parent directory al path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from dashboard.services import get_stats_service, format_count, format_duration, time_ago
+
 st.set_page_config(page_title="Home - Dashboard", page_icon="🏠", layout="wide")
 
 st.title("🏠 Dashboard Home")
 st.markdown("### Overview of your social media bot")
 
+# Stats desde los rollups (caché hasta que el bot escriba en la base)
+stats = get_stats_service()
+today = stats.overview(days=1)
+total, yesterday = today['total'], today['previous']
+last_run = stats.last_run()
+running = last_run is not None and last_run['status'] == 'running'
+uptime = (datetime.utcnow() - last_run['started_at']).total_seconds() if running else None
+recent = stats.recent_posts(limit=7)
+
 # Sidebar con info adicional
 with st.sidebar:
     st.header("Quick Info")
 
     st.markdown("**Bot Status**")
-    # TODO: Obtener status real del bot
-    st.success("🟢 Active")
+    if running:
+        st.success("🟢 Active")
+    else:
+        st.warning("🔴 Stopped")
 
     st.markdown("**Last Sync**")
-    st.info("2 minutes ago")
+    st.info(time_ago(recent[0]['processed_at']) if recent else "never")
 
     st.markdown("**Uptime**")
-    st.metric("", "2h 34m")
+    st.metric("", format_duration(uptime))
 
 st.markdown("---")
 
@@ -39,29 +52,37 @@ col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.metric(
         label="📊 Total Posts",
-        value="156",
-        delta="+12 today"
+        value=format_count(total['posts']),
+        delta=f"+{today['period']['posts']} today"
     )
 
 with col2:
+    # Engagement ganado hoy sobre el acumulado hasta ayer
+    gained = today['period']['engagement']
+    before = total['engagement'] - gained
     st.metric(
         label="💚 Engagement",
-        value="24.5K",
-        delta="+18%"
+        value=format_count(total['engagement']),
+        delta=f"{gained / before * 100:+.0f}%" if before else None
     )
 
 with col3:
     st.metric(
         label="✅ Success Rate",
-        value="98.7%",
-        delta="+2.3%"
+        value=f"{total['success_rate']:.1f}%" if total['success_rate'] is not None else "—",
+        delta=f"{today['period']['success_rate'] - yesterday['success_rate']:+.1f}%"
+        if today['period']['success_rate'] is not None and yesterday['success_rate'] is not None else None
     )
 
 with col4:
+    avg_today = today['period']['avg_processing_secs']
+    avg_yesterday = yesterday['avg_processing_secs']
     st.metric(
         label="⏱️ Avg Time",
-        value="2.3 min",
-        delta="-0.5 min"
+        value=format_duration(total['avg_processing_secs']),
+        delta=f"{(avg_today - avg_yesterday) / 60:+.1f} min"
+        if avg_today is not None and avg_yesterday is not None else None,
+        delta_color="inverse"
     )
 
 st.markdown("---")
@@ -78,34 +99,52 @@ with tab1:
     # Stats rápidas
     col1, col2, col3 = st.columns(3)
 
+    platform_icons = {'twitter': "🐦", 'instagram': "📷", 'facebook': "📘"}
+
     with col1:
         st.markdown("**This Week**")
-        st.markdown("🐦 Twitter: 23 posts")
-        st.markdown("📷 Instagram: 25 posts")
+        by_platform = stats.posts_by_platform(days=7)
+        for platform, posts in by_platform.items():
+            st.markdown(f"{platform_icons.get(platform, '🌐')} {platform.capitalize()}: {posts} posts")
+        if not by_platform:
+            st.markdown("No posts this week")
 
     with col2:
         st.markdown("**Best Day**")
-        st.markdown("📅 Monday - 8 posts")
-        st.markdown("⏰ Best hour: 3 PM")
+        best_day = stats.best_day(days=28)
+        best_hour = stats.best_hour(days=28)
+        if best_day:
+            day = datetime.fromisoformat(best_day['day'])
+            st.markdown(f"📅 {day:%A %d %b} - {best_day['posts']} posts")
+        if best_hour:
+            st.markdown(f"⏰ Best hour: {best_hour['hour']:02d}:00 UTC")
+        if not best_day:
+            st.markdown("Not enough data yet")
 
     with col3:
         st.markdown("**Top Post**")
-        st.markdown("💚 52K likes")
-        st.markdown("🔄 1.2K retweets")
+        top = stats.top_post(metric='likes')
+        if top:
+            st.markdown(f"💚 {format_count(top['metrics'].get('likes', 0))} likes ({top['shortcode']})")
+            if 'retweets' in top['metrics']:
+                st.markdown(f"🔄 {format_count(top['metrics']['retweets'])} retweets")
+        else:
+            st.markdown("No engagement collected yet")
 
 with tab2:
     st.subheader("Recent Activity")
 
-    # Activity log (dummy data)
+    # Activity log: últimos posts procesados
     activities = [
-        {"time": "2 min ago", "type": "success", "message": "Post published on Twitter (ID: xyz123)"},
-        {"time": "15 min ago", "type": "info", "message": "New post detected on Instagram"},
-        {"time": "15 min ago", "type": "success", "message": "Image downloaded successfully"},
-        {"time": "30 min ago", "type": "success", "message": "Post published on Twitter (ID: abc456)"},
-        {"time": "45 min ago", "type": "info", "message": "Bot check completed - 0 new posts"},
-        {"time": "1 hour ago", "type": "info", "message": "Bot started"},
-        {"time": "2 hours ago", "type": "success", "message": "Post published on Twitter (ID: def789)"},
+        {
+            "time": time_ago(post['processed_at']),
+            "type": "success" if post['status'] == 'success' else "warning" if post['status'] == 'failed' else "info",
+            "message": f"Post {post['shortcode']} {post['status']} on {post['platform'].capitalize()}",
+        }
+        for post in recent
     ]
+    if not activities:
+        st.info("No activity yet")
 
     for activity in activities:
         icon = "✅" if activity["type"] == "success" else "ℹ️" if activity["type"] == "info" else "⚠️"
@@ -121,9 +160,14 @@ col1, col2, col3 = st.columns(3)
 with col1:
     with st.container():
         st.markdown("### 🤖 Bot Status")
-        st.success("Running")
-        st.caption("PID: 12345")
-        st.caption("Uptime: 2h 34m")
+        if running:
+            st.success("Running")
+            st.caption(f"Run #{last_run['id']} - {last_run['posts_processed']} posts, {last_run['errors_count']} errors")
+            st.caption(f"Uptime: {format_duration(uptime)}")
+        else:
+            st.warning("Stopped")
+            if last_run:
+                st.caption(f"Last run: {time_ago(last_run['ended_at'] or last_run['started_at'])}")
 
         if st.button("⏸️ Pause Bot", key="pause"):
             st.warning("Bot paused")
@@ -0,0 +1,8 @@
+"""Services package for dashboard queries"""
+from .batch_writer import BatchWriter
+from .rollups import ensure_rollups, drop_rollups
+from .snapshots import record_snapshots
+from .stats import DashboardStats, get_stats_service, format_count, format_duration, time_ago
+
+__all__ = ['BatchWriter', 'ensure_rollups', 'drop_rollups', 'record_snapshots', 'DashboardStats', 'get_stats_service',
+           'format_count', 'format_duration', 'time_ago']
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Escrituras agrupadas en transacciones
+Cada commit en SQLite cuesta un fsync y un turno del lock de escritura (más
+los triggers de rollups). BatchWriter junta los inserts chicos que llegan de
+cualquier thread y los escribe desde un solo thread en una transacción por
+lote: cada max_batch filas o cada max_delay segundos, lo que pase primero.
+
+Uso:
+    writer = BatchWriter()
+    writer.add_post({'shortcode': 'C1a2b3', 'post_url': 'https://www.instagram.com/p/C1a2b3/'})
+    writer.add_snapshot({'post_id': 1, 'platform': 'twitter', 'likes': 120})
+    writer.add("INSERT INTO bot_runs (started_at, status) VALUES (:started_at, :status)",
+               {'started_at': datetime.utcnow(), 'status': 'running'})
+    writer.flush()    # espera a que todo lo encolado esté en la base
+    writer.close()
+"""
+import queue
+import threading
+import time
+
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import OperationalError
+
+from dashboard.models.database import Post, engine as default_engine
+from .snapshots import record_snapshots
+
+# Un post que ya está (p. ej. importado con migrate_historial) no se pisa
+_INSERT_POST = insert(Post).on_conflict_do_nothing(index_elements=['shortcode'])
+
+_SNAPSHOT = object()
+_FLUSH = object()
+_STOP = object()
+
+
+class BatchWriter:
+    def __init__(self, engine=None, max_batch=500, max_delay=0.25, retries=3):
+        """
+        Inicializa el writer y arranca su thread
+
+        Args:
+            engine: Engine de escritura (usa el de dashboard.models si no se especifica)
+            max_batch: Filas por transacción como máximo
+            max_delay: Segundos que una fila puede esperar a que se llene el lote
+            retries: Reintentos de un lote si la base sigue bloqueada tras el busy_timeout
+        """
+        self.engine = engine or default_engine
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.retries = retries
+
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.last_error = None
+
+        self._queue = queue.Queue()
+        self._statements = {}
+        # Protege _closed junto con el put: nada entra a la cola después de _STOP
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="dashboard-batch-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, statement, params):
+        """
+        Encola un INSERT/UPDATE con sus parámetros
+
+        Args:
+            statement: SQL (str), text() o construcción de SQLAlchemy (insert(Post)...)
+            params: Dict de parámetros de una fila
+        """
+        if isinstance(statement, str):
+            statement = self._statements.setdefault(statement, text(statement))
+        self._put((statement, params))
+
+    def add_post(self, post):
+        """
+        Encola un post procesado (se ignora si su shortcode ya está en posts)
+
+        Args:
+            post: Dict con shortcode y opcionalmente el resto de las columnas de
+                Post; created_at/processed_at en UTC (default: ahora)
+        """
+        now = datetime.utcnow()
+        self._put((_INSERT_POST, {
+            'shortcode': post['shortcode'],
+            'platform_source': post.get('platform_source', 'instagram'),
+            'platform_target': post.get('platform_target', 'twitter'),
+            'post_url': post.get('post_url'),
+            'caption': post.get('caption'),
+            'post_type': post.get('post_type'),
+            'media_urls': post.get('media_urls'),
+            'created_at': post.get('created_at') or now,
+            'processed_at': post.get('processed_at') or now,
+            'status': post.get('status', 'success'),
+        }))
+
+    def add_snapshot(self, snapshot):
+        """Encola un snapshot de métricas (ver snapshots.record_snapshots)"""
+        self._put((_SNAPSHOT, snapshot))
+
+    def _put(self, item):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchWriter cerrado")
+            self._queue.put(item)
+
+    def flush(self, timeout=None):
+        """
+        Espera a que se escriba todo lo encolado hasta ahora
+
+        Returns:
+            True si terminó antes del timeout
+        """
+        done = threading.Event()
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._queue.put((_FLUSH, done))
+
+        if closed:
+            # Tras close() la cola no recibe más: basta con que termine el thread,
+            # que escribe lo pendiente antes de salir
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return done.wait(timeout)
+
+    def _collect(self):
+        """Arma un lote: bloquea por el primer ítem y junta hasta max_batch o max_delay"""
+        batch, waiters = [], []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.max_delay
+
+        while True:
+            kind, payload = item
+            if kind is _STOP:
+                return batch, waiters, True
+            if kind is _FLUSH:
+                # Lo anterior al flush va en este lote; no tiene sentido esperar más
+                waiters.append(payload)
+                return batch, waiters, False
+            batch.append(item)
+            if len(batch) >= self.max_batch:
+                return batch, waiters, False
+
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return batch, waiters, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, waiters, stop = self._collect()
+            if batch:
+                self._write(batch)
+            for done in waiters:
+                done.set()
+
+    def _write(self, batch):
+        for attempt in range(self.retries + 1):
+            try:
+                with self.engine.begin() as conn:
+                    for statement, rows in self._runs(batch):
+                        if statement is _SNAPSHOT:
+                            record_snapshots(conn, rows)
+                        else:
+                            conn.execute(statement, rows)
+                self.written += len(batch)
+                self.batches += 1
+                return
+            except OperationalError as e:
+                if 'locked' not in str(e) or attempt == self.retries:
+                    self._fail(batch, e)
+                    return
+                wait = 2 ** attempt
+                print(f"⚠️ Base bloqueada, reintentando lote de {len(batch)} en {wait} s...")
+                time.sleep(wait)
+            except Exception as e:
+                self._fail(batch, e)
+                return
+
+    def _fail(self, batch, error):
+        self.failed += len(batch)
+        self.last_error = error
+        print(f"❌ No se pudo escribir un lote de {len(batch)} filas: {error}")
+
+    @staticmethod
+    def _runs(batch):
+        """Tramos consecutivos con la misma sentencia (executemany), respetando el orden"""
+        runs = []
+        for statement, params in batch:
+            if runs and runs[-1][0] is statement:
+                runs[-1][1].append(params)
+            else:
+                runs.append((statement, [params]))
+        return runs
+
+    def close(self, timeout=None):
+        """Escribe lo pendiente y detiene el thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put((_STOP, None))
+        self._thread.join(timeout)
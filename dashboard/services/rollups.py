@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+Rollups por hora y por día de posts y engagement
+Tablas agregadas que el dashboard lee en lugar de recorrer posts y
+metric_snapshots:
+
+- posts_rollup_hourly / posts_rollup_daily: por bucket y plataforma destino,
+  posts, exitosos, fallidos y segundos de procesamiento (processed_at - created_at)
+- engagement_rollup_hourly / engagement_rollup_daily: por bucket y
+  plataforma, el engagement ganado en ese bucket (una columna por métrica)
+- metric_latest: el último snapshot de cada post/plataforma (top posts sin
+  recorrer la serie completa)
+
+Las mantienen triggers de SQLite, así se actualizan en la misma transacción
+que cualquier escritura (bot, migraciones, dashboard) sin que el código que
+escribe tenga que saber de ellas.
+
+Los snapshots son valores acumulados (likes a cierta hora), así que cada
+snapshot suma al rollup su diferencia con el snapshot anterior del mismo
+post/plataforma. La suma de todos los buckets es el último valor de cada
+serie y la de un rango es lo ganado en ese rango.
+
+Una métrica en NULL no se recolectó en ese snapshot (no vale 0): cada
+columna se compara con el último valor no NULL de su serie, y metric_latest
+guarda el último valor no NULL de cada métrica.
+
+Los buckets están en UTC, igual que created_at/processed_at/collected_at.
+"""
+import threading
+
+from dashboard.models.database import METRIC_COLUMNS
+
+# Subir al cambiar tablas o triggers: se reconstruyen al abrir el dashboard
+ROLLUP_VERSION = 3
+
+# Expresión SQL del bucket para cada granularidad
+BUCKETS = {
+    'hourly': "strftime('%Y-%m-%d %H:00', {ts})",
+    'daily': "date({ts})",
+}
+
+# collected_at de los snapshots son segundos Unix
+_EPOCH = "{}, 'unixepoch'"
+
+_COLUMNS = ', '.join(METRIC_COLUMNS)
+
+_POSTS_UPSERT = """
+    INSERT INTO posts_rollup_{grain} (bucket, platform, posts, success, failed, processing_secs)
+    VALUES (
+        {bucket}, {row}.platform_target, {sign},
+        {sign} * (IFNULL({row}.status, '') = 'success'),
+        {sign} * (IFNULL({row}.status, '') = 'failed'),
+        {sign} * max(0, IFNULL((julianday({row}.processed_at) - julianday({row}.created_at)) * 86400, 0))
+    )
+    ON CONFLICT (bucket, platform) DO UPDATE SET
+        posts = posts + excluded.posts,
+        success = success + excluded.success,
+        failed = failed + excluded.failed,
+        processing_secs = processing_secs + excluded.processing_secs
+"""
+
+# Snapshot anterior / siguiente de la misma serie con la métrica no NULL. En
+# un UPDATE la tabla ya tiene la fila nueva, que se excluye al calcular los
+# vecinos de la vieja
+_NEIGHBOR = """
+    (SELECT {select} FROM metric_snapshots
+     WHERE post_id = {row}.post_id AND platform = {row}.platform
+       AND collected_at {op} {row}.collected_at AND {column} IS NOT NULL{exclude}
+     ORDER BY collected_at {order} LIMIT 1)
+"""
+
+_ENGAGEMENT_UPSERT = """
+    INSERT INTO engagement_rollup_{grain} (bucket, platform, {columns})
+    SELECT {bucket}, {row}.platform, {deltas}
+    WHERE true
+    ON CONFLICT (bucket, platform) DO UPDATE SET {increments}
+"""
+
+# Una fila por métrica cuyo siguiente snapshot cae en otro bucket
+_FOLLOWING_UPSERT = """
+    INSERT INTO engagement_rollup_{grain} (bucket, platform, {columns})
+    SELECT * FROM ({rows})
+    WHERE true
+    ON CONFLICT (bucket, platform) DO UPDATE SET {increments}
+"""
+
+_LATEST_REFRESH = """
+    DELETE FROM metric_latest WHERE post_id = {row}.post_id AND platform = {row}.platform;
+    INSERT INTO metric_latest (post_id, platform, collected_at, {columns})
+    SELECT post_id, platform, MAX(collected_at), {latest} FROM metric_snapshots
+    WHERE post_id = {row}.post_id AND platform = {row}.platform
+    GROUP BY post_id, platform
+"""
+
+# Último valor no NULL de una métrica en la serie
+_LATEST_VALUE = """
+    (SELECT {column} FROM metric_snapshots
+     WHERE post_id = {series}.post_id AND platform = {series}.platform AND {column} IS NOT NULL
+     ORDER BY collected_at DESC LIMIT 1)
+"""
+
+_TABLES = """
+    CREATE TABLE IF NOT EXISTS posts_rollup_{grain} (
+        bucket TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        posts INTEGER NOT NULL DEFAULT 0,
+        success INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        processing_secs REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, platform)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS engagement_rollup_{grain} (
+        bucket TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        {metric_columns},
+        PRIMARY KEY (bucket, platform)
+    ) WITHOUT ROWID
+"""
+
+_LATEST_TABLE = """
+    CREATE TABLE IF NOT EXISTS metric_latest (
+        post_id INTEGER NOT NULL,
+        platform TEXT NOT NULL,
+        collected_at INTEGER NOT NULL,
+        {metric_columns},
+        PRIMARY KEY (post_id, platform)
+    ) WITHOUT ROWID
+"""
+
+_BACKFILL = """
+    INSERT INTO posts_rollup_{grain} (bucket, platform, posts, success, failed, processing_secs)
+    SELECT {post_bucket}, platform_target, COUNT(*),
+           SUM(IFNULL(status, '') = 'success'),
+           SUM(IFNULL(status, '') = 'failed'),
+           SUM(max(0, IFNULL((julianday(processed_at) - julianday(created_at)) * 86400, 0)))
+    FROM posts
+    GROUP BY 1, 2;
+
+    INSERT INTO engagement_rollup_{grain} (bucket, platform, {columns})
+    SELECT bucket, platform, {sums}
+    FROM (
+        SELECT {snapshot_bucket} AS bucket, platform, {lag_deltas}
+        FROM metric_snapshots
+    )
+    GROUP BY 1, 2
+"""
+
+# LAG no salta NULLs: separar la serie por "{column} IS NULL" deja en la
+# misma partición solo los valores no NULL de esa métrica
+_LAG_DELTA = """
+    IFNULL({column} - IFNULL(LAG({column}) OVER (
+        PARTITION BY post_id, platform, {column} IS NULL ORDER BY collected_at), 0), 0) AS {column}
+"""
+
+_LATEST_BACKFILL = """
+    INSERT INTO metric_latest (post_id, platform, collected_at, {columns})
+    SELECT post_id, platform, MAX(collected_at), {latest} FROM metric_snapshots AS series
+    GROUP BY post_id, platform
+"""
+
+# Tablas e índices de versiones anteriores de los rollups
+_OBSOLETE = """
+    DROP INDEX IF EXISTS ix_analytics_series;
+    DROP INDEX IF EXISTS ix_analytics_metric_value
+"""
+
+
+def _statements(script):
+    return [statement.strip() for statement in script.split(';') if statement.strip()]
+
+
+def _metric_columns_ddl():
+    return ',\n        '.join(f'{column} INTEGER NOT NULL DEFAULT 0' for column in METRIC_COLUMNS)
+
+
+def _posts_changes(row, sign):
+    return [
+        _POSTS_UPSERT.format(grain=grain, row=row, sign=sign, bucket=bucket.format(ts=f'{row}.processed_at'))
+        for grain, bucket in BUCKETS.items()
+    ]
+
+
+def _neighbor(row, column, op, exclude, select=None):
+    order = 'DESC' if op == '<' else 'ASC'
+    exclude_sql = ''
+    if exclude:
+        exclude_sql = (f" AND NOT (post_id = {exclude}.post_id AND platform = {exclude}.platform"
+                       f" AND collected_at = {exclude}.collected_at)")
+    return _NEIGHBOR.format(select=select or column, column=column, row=row, op=op, order=order,
+                            exclude=exclude_sql)
+
+
+def _engagement_changes(row, sign, exclude=None):
+    """
+    Un snapshot aporta (valor - anterior) a su bucket y le quita lo mismo al
+    siguiente de la serie (que hasta ahora se medía contra el anterior).
+    Métrica por métrica: las que están en NULL no aportan nada
+    """
+    increments = ', '.join(f'{column} = {column} + excluded.{column}' for column in METRIC_COLUMNS)
+    gains = {c: f"({row}.{c} - IFNULL({_neighbor(row, c, '<', exclude)}, 0))" for c in METRIC_COLUMNS}
+
+    changes = []
+    for grain, bucket in BUCKETS.items():
+        changes.append(_ENGAGEMENT_UPSERT.format(
+            grain=grain, row=row, columns=_COLUMNS, increments=increments,
+            bucket=bucket.format(ts=_EPOCH.format(f'{row}.collected_at')),
+            deltas=', '.join(f'{sign} * IFNULL({gains[c]}, 0)' for c in METRIC_COLUMNS),
+        ))
+
+        rows = []
+        for column in METRIC_COLUMNS:
+            following = _neighbor(row, column, '>', exclude, select='collected_at')
+            values = ', '.join(f'{-sign} * {gains[c]}' if c == column else '0' for c in METRIC_COLUMNS)
+            rows.append(
+                f"SELECT {bucket.format(ts=_EPOCH.format('following.collected_at'))}, {row}.platform, {values}"
+                f" FROM {following.strip()} AS following WHERE {row}.{column} IS NOT NULL"
+            )
+        changes.append(_FOLLOWING_UPSERT.format(
+            grain=grain, columns=_COLUMNS, increments=increments, rows='\n        UNION ALL '.join(rows),
+        ))
+    return changes
+
+
+def _latest_columns(series):
+    return ', '.join(_LATEST_VALUE.format(column=c, series=series).strip() for c in METRIC_COLUMNS)
+
+
+def _latest_changes(row):
+    return _statements(_LATEST_REFRESH.format(row=row, columns=_COLUMNS, latest=_latest_columns(row)))
+
+
+def _trigger(name, event, table, changes):
+    body = ';\n'.join(change.strip() for change in changes)
+    return f"CREATE TRIGGER rollup_{name} AFTER {event} ON {table} BEGIN\n{body};\nEND"
+
+
+def trigger_statements():
+    """CREATE TRIGGER de todos los rollups"""
+    return [
+        _trigger('posts_insert', 'INSERT', 'posts', _posts_changes('NEW', 1)),
+        _trigger('posts_delete', 'DELETE', 'posts', _posts_changes('OLD', -1)),
+        _trigger('posts_update', 'UPDATE OF platform_target, status, created_at, processed_at', 'posts',
+                 _posts_changes('OLD', -1) + _posts_changes('NEW', 1)),
+        _trigger('snapshots_insert', 'INSERT', 'metric_snapshots',
+                 _engagement_changes('NEW', 1) + _latest_changes('NEW')),
+        _trigger('snapshots_delete', 'DELETE', 'metric_snapshots',
+                 _engagement_changes('OLD', -1) + _latest_changes('OLD')),
+        _trigger('snapshots_update', 'UPDATE', 'metric_snapshots',
+                 _engagement_changes('OLD', -1, exclude='NEW') + _engagement_changes('NEW', 1)
+                 + _latest_changes('OLD') + _latest_changes('NEW')),
+    ]
+
+
+def _installed_version(cursor):
+    cursor.execute("CREATE TABLE IF NOT EXISTS dashboard_rollups (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    row = cursor.execute("SELECT version FROM dashboard_rollups WHERE name = 'rollups'").fetchone()
+    return row[0] if row else None
+
+
+def _drop(cursor):
+    """Borra triggers y tablas de los rollups (de cualquier versión)"""
+    triggers = cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'rollup\\_%' ESCAPE '\\'"
+    ).fetchall()
+    for (name,) in triggers:
+        cursor.execute(f"DROP TRIGGER {name}")
+    for grain in BUCKETS:
+        cursor.execute(f"DROP TABLE IF EXISTS posts_rollup_{grain}")
+        cursor.execute(f"DROP TABLE IF EXISTS engagement_rollup_{grain}")
+    cursor.execute("DROP TABLE IF EXISTS metric_latest")
+    for statement in _statements(_OBSOLETE):
+        cursor.execute(statement)
+    cursor.execute("CREATE TABLE IF NOT EXISTS dashboard_rollups (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    cursor.execute("DELETE FROM dashboard_rollups WHERE name = 'rollups'")
+
+
+def _rebuild(cursor):
+    """Recrea tablas y triggers y recalcula los rollups desde cero"""
+    _drop(cursor)
+
+    for grain, bucket in BUCKETS.items():
+        for statement in _statements(_TABLES.format(grain=grain, metric_columns=_metric_columns_ddl())):
+            cursor.execute(statement)
+        for statement in _statements(_BACKFILL.format(
+                grain=grain,
+                columns=_COLUMNS,
+                post_bucket=bucket.format(ts='processed_at'),
+                snapshot_bucket=bucket.format(ts=_EPOCH.format('collected_at')),
+                sums=', '.join(f'SUM({c})' for c in METRIC_COLUMNS),
+                lag_deltas=', '.join(_LAG_DELTA.format(column=c).strip() for c in METRIC_COLUMNS))):
+            cursor.execute(statement)
+
+    cursor.execute(_LATEST_TABLE.format(metric_columns=_metric_columns_ddl().replace(' NOT NULL DEFAULT 0', '')))
+    cursor.execute(_LATEST_BACKFILL.format(columns=_COLUMNS, latest=_latest_columns('series')))
+
+    for statement in trigger_statements():
+        cursor.execute(statement)
+
+    cursor.execute(
+        "INSERT OR REPLACE INTO dashboard_rollups (name, version) VALUES ('rollups', ?)", (ROLLUP_VERSION,)
+    )
+
+
+_ensured = set()
+_ensured_lock = threading.Lock()
+
+
+def _in_transaction(engine, action):
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.driver_connection.cursor()
+        # IMMEDIATE: otro proceso no puede escribir entre la revisión y el cambio
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            result = action(cursor)
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+        return result
+    finally:
+        raw.close()
+
+
+def ensure_rollups(engine, rebuild=False):
+    """
+    Crea los rollups si faltan (o si cambió ROLLUP_VERSION) y los llena con
+    los datos existentes; a partir de ahí los triggers los mantienen
+
+    Args:
+        engine: Engine de SQLAlchemy de la base del dashboard
+        rebuild: Recalcular aunque ya estén al día
+
+    Returns:
+        True si se (re)construyeron
+    """
+    key = str(engine.url)
+    with _ensured_lock:
+        if key in _ensured and not rebuild:
+            return False
+
+        def action(cursor):
+            if rebuild or _installed_version(cursor) != ROLLUP_VERSION:
+                _rebuild(cursor)
+                return True
+            return False
+
+        rebuilt = _in_transaction(engine, action)
+        _ensured.add(key)
+        return rebuilt
+
+
+def drop_rollups(engine):
+    """
+    Quita triggers y rollups (p. ej. antes de una carga masiva); el próximo
+    ensure_rollups() los reconstruye desde los datos
+    """
+    with _ensured_lock:
+        _in_transaction(engine, _drop)
+        _ensured.discard(str(engine.url))
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Escritura de snapshots de métricas
+Un snapshot es el estado de todas las métricas de un post en una plataforma
+en un momento dado. Las métricas con columna propia (METRIC_COLUMNS) van a la
+fila ancha de metric_snapshots; el resto a metric_extras con el id entero de
+su nombre en metric_names.
+
+Uso:
+    with engine.begin() as conn:
+        record_snapshots(conn, [
+            {'post_id': 1, 'platform': 'twitter', 'collected_at': datetime.utcnow(),
+             'likes': 120, 'retweets': 14, 'bookmarks': 3},
+        ])
+"""
+import calendar
+from datetime import datetime
+
+from sqlalchemy import text
+
+from dashboard.models.database import METRIC_COLUMNS
+
+_KEY = ('post_id', 'platform', 'collected_at')
+
+# Si el snapshot ya existe, una métrica en NULL conserva el valor guardado
+_UPSERT_SNAPSHOT = text(f"""
+    INSERT INTO metric_snapshots (post_id, platform, collected_at, {', '.join(METRIC_COLUMNS)})
+    VALUES (:post_id, :platform, :collected_at, {', '.join(':' + c for c in METRIC_COLUMNS)})
+    ON CONFLICT (post_id, platform, collected_at) DO UPDATE SET
+        {', '.join(f'{c} = IFNULL(excluded.{c}, {c})' for c in METRIC_COLUMNS)}
+""")
+
+_UPSERT_EXTRA = text("""
+    INSERT INTO metric_extras (post_id, platform, collected_at, metric_id, value)
+    VALUES (:post_id, :platform, :collected_at, :metric_id, :value)
+    ON CONFLICT (post_id, platform, collected_at, metric_id) DO UPDATE SET value = excluded.value
+""")
+
+
+def to_epoch(value):
+    """datetime (naive = UTC), texto ISO o número a segundos Unix enteros"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return int(value)
+
+
+def metric_ids(conn, names):
+    """{nombre: id} de metric_names, registrando los nombres nuevos"""
+    names = sorted(set(names))
+    if not names:
+        return {}
+    conn.execute(text("INSERT OR IGNORE INTO metric_names (name) VALUES (:name)"), [{'name': n} for n in names])
+    rows = conn.execute(text("SELECT name, id FROM metric_names")).fetchall()
+    return {name: metric_id for name, metric_id in rows if name in names}
+
+
+def record_snapshots(conn, snapshots):
+    """
+    Guarda snapshots (un INSERT por lote, no por métrica)
+
+    Args:
+        conn: Conexión de SQLAlchemy dentro de una transacción
+        snapshots: Dicts con post_id, platform, collected_at (opcional, ahora)
+            y una clave por métrica
+
+    Returns:
+        Cantidad de snapshots guardados
+    """
+    rows = []
+    extras = []
+    now = datetime.utcnow()
+
+    for snapshot in snapshots:
+        row = {
+            'post_id': snapshot['post_id'],
+            'platform': snapshot['platform'],
+            'collected_at': to_epoch(snapshot.get('collected_at') or now),
+        }
+        for name, value in snapshot.items():
+            if name in _KEY:
+                continue
+            if name not in METRIC_COLUMNS:
+                extras.append({**row, 'name': name, 'value': value})
+        row.update({column: snapshot.get(column) for column in METRIC_COLUMNS})
+        rows.append(row)
+
+    if rows:
+        conn.execute(_UPSERT_SNAPSHOT, rows)
+    if extras:
+        ids = metric_ids(conn, (extra['name'] for extra in extras))
+        for extra in extras:
+            extra['metric_id'] = ids[extra.pop('name')]
+        conn.execute(_UPSERT_EXTRA, extras)
+    return len(rows)
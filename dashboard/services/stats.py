@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+Consultas del dashboard sobre los rollups
+Las páginas de Streamlit se re-ejecutan en cada interacción; en lugar de
+recorrer posts y analytics cada vez, leen los rollups por hora/día
+(ver rollups.py) y guardan los resultados en memoria.
+
+El caché se invalida solo cuando cambia PRAGMA data_version, que SQLite
+incrementa cuando otra conexión (el bot, una migración) hace commit. Mientras
+nadie escriba, un rerun no toca la base más allá de ese PRAGMA.
+
+Uso:
+    stats = get_stats_service()
+    overview = stats.overview(days=7)
+    overview['period']['posts'], overview['total']['success_rate']
+"""
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from dashboard.models.database import METRIC_COLUMNS, engine as writer_engine, reader_engine
+from .rollups import ensure_rollups
+
+# Métricas que cuentan como engagement (views no)
+ENGAGEMENT_METRICS = ('likes', 'comments', 'retweets', 'replies', 'quotes', 'shares', 'saves')
+
+# Resultados guardados como máximo (cada ventana de tiempo es una entrada)
+MAX_CACHE_ENTRIES = 256
+
+
+def _parse_datetime(value):
+    """Los DateTime de SQLAlchemy se guardan como texto ISO en SQLite"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _rate(success, failed):
+    """Porcentaje de éxito sobre los posts terminados (None si no hay)"""
+    done = success + failed
+    return success / done * 100 if done else None
+
+
+class DashboardStats:
+    def __init__(self, engine=None, engagement_metrics=ENGAGEMENT_METRICS, write_engine=None):
+        """
+        Args:
+            engine: Engine de SQLAlchemy para las consultas (usa el de lectura
+                de dashboard.models si no se especifica)
+            engagement_metrics: Nombres de métricas que suman al engagement
+            write_engine: Engine que crea los rollups (por defecto el de
+                escritura de dashboard.models, o `engine` si se pasó uno)
+        """
+        unknown = set(engagement_metrics) - set(METRIC_COLUMNS)
+        if unknown:
+            raise ValueError(f"Métricas sin columna en metric_snapshots: {', '.join(sorted(unknown))}")
+
+        if engine is None:
+            engine, write_engine = reader_engine, write_engine or writer_engine
+        self.engine = engine
+        self.engagement_metrics = tuple(engagement_metrics)
+        ensure_rollups(write_engine or engine)
+
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._version = None
+        # data_version es por conexión y solo cambia con commits de otras
+        # conexiones: esta se reserva para leerlo y nunca escribe
+        self._version_conn = engine.raw_connection()
+
+    def _data_version(self):
+        cursor = self._version_conn.driver_connection.execute("PRAGMA data_version")
+        return cursor.fetchone()[0]
+
+    def _cached(self, key, compute):
+        with self._lock:
+            version = self._data_version()
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            if key in self._cache:
+                return self._cache[key]
+
+        value = compute()
+
+        with self._lock:
+            # Si la base cambió durante el cálculo, el próximo acceso lo descarta
+            if self._version == version:
+                if len(self._cache) >= MAX_CACHE_ENTRIES:
+                    self._cache.clear()
+                self._cache[key] = value
+        return value
+
+    def invalidate(self):
+        """Vacía el caché (las escrituras propias no cambian data_version)"""
+        with self._lock:
+            self._cache.clear()
+
+    def _query(self, sql, **params):
+        with self.engine.connect() as conn:
+            return conn.execute(text(sql), params).fetchall()
+
+    @staticmethod
+    def _metric_column(metric):
+        """Nombre de columna validado (se interpola en el SQL)"""
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"Métrica desconocida: {metric}")
+        return metric
+
+    @staticmethod
+    def _day_range(days, now=None):
+        """(inicio, fin) como fechas 'YYYY-MM-DD': los últimos `days` días con hoy incluido"""
+        today = (now or datetime.utcnow()).date()
+        start = today - timedelta(days=days - 1)
+        return start.isoformat(), (today + timedelta(days=1)).isoformat()
+
+    def _posts_summary(self, start=None, end=None):
+        row = self._query("""
+            SELECT IFNULL(SUM(posts), 0), IFNULL(SUM(success), 0),
+                   IFNULL(SUM(failed), 0), IFNULL(SUM(processing_secs), 0)
+            FROM posts_rollup_daily
+            WHERE bucket >= :start AND bucket < :end
+        """, start=start or '', end=end or '9999')[0]
+        posts, success, failed, processing_secs = row
+        return {
+            'posts': posts,
+            'success': success,
+            'failed': failed,
+            'success_rate': _rate(success, failed),
+            'avg_processing_secs': processing_secs / posts if posts else None,
+        }
+
+    def _engagement_sum(self, start=None, end=None):
+        engagement = ' + '.join(self.engagement_metrics) or '0'
+        row = self._query(f"""
+            SELECT IFNULL(SUM({engagement}), 0) FROM engagement_rollup_daily
+            WHERE bucket >= :start AND bucket < :end
+        """, start=start or '', end=end or '9999')[0]
+        return row[0]
+
+    def _summary(self, start=None, end=None):
+        summary = self._posts_summary(start, end)
+        summary['engagement'] = self._engagement_sum(start, end)
+        return summary
+
+    def overview(self, days=7):
+        """
+        Totales históricos y de los últimos `days` días contra los `days` anteriores
+
+        Returns:
+            {'total', 'period', 'previous'}, cada uno con posts, success,
+            failed, success_rate (%), avg_processing_secs y engagement
+        """
+        start, end = self._day_range(days)
+
+        def compute():
+            previous_start = (datetime.fromisoformat(start) - timedelta(days=days)).date().isoformat()
+            return {
+                'total': self._summary(),
+                'period': self._summary(start, end),
+                'previous': self._summary(previous_start, start),
+            }
+
+        return self._cached(('overview', days, start), compute)
+
+    def posts_by_platform(self, days=7):
+        """{plataforma: posts} de los últimos `days` días"""
+        start, end = self._day_range(days)
+
+        def compute():
+            rows = self._query("""
+                SELECT platform, SUM(posts) FROM posts_rollup_daily
+                WHERE bucket >= :start AND bucket < :end
+                GROUP BY platform HAVING SUM(posts) > 0 ORDER BY 2 DESC
+            """, start=start, end=end)
+            return {platform: posts for platform, posts in rows}
+
+        return self._cached(('posts_by_platform', days, start), compute)
+
+    def daily_posts(self, days=7):
+        """Serie diaria de los últimos `days` días: [{'day', 'posts', 'success', 'failed'}], sin huecos"""
+        start, end = self._day_range(days)
+
+        def compute():
+            rows = self._query("""
+                SELECT bucket, SUM(posts), SUM(success), SUM(failed) FROM posts_rollup_daily
+                WHERE bucket >= :start AND bucket < :end
+                GROUP BY bucket
+            """, start=start, end=end)
+            by_day = {bucket: (posts, success, failed) for bucket, posts, success, failed in rows}
+
+            series = []
+            first = datetime.fromisoformat(start).date()
+            for offset in range(days):
+                day = (first + timedelta(days=offset)).isoformat()
+                posts, success, failed = by_day.get(day, (0, 0, 0))
+                series.append({'day': day, 'posts': posts, 'success': success, 'failed': failed})
+            return series
+
+        return self._cached(('daily_posts', days, start), compute)
+
+    def best_day(self, days=28):
+        """Día con más posts de los últimos `days` días: {'day', 'posts'} o None"""
+        start, end = self._day_range(days)
+
+        def compute():
+            rows = self._query("""
+                SELECT bucket, SUM(posts) FROM posts_rollup_daily
+                WHERE bucket >= :start AND bucket < :end
+                GROUP BY bucket HAVING SUM(posts) > 0 ORDER BY 2 DESC, 1 DESC LIMIT 1
+            """, start=start, end=end)
+            return {'day': rows[0][0], 'posts': rows[0][1]} if rows else None
+
+        return self._cached(('best_day', days, start), compute)
+
+    def best_hour(self, days=28):
+        """Hora del día (UTC) con más posts en los últimos `days` días: {'hour', 'posts'} o None"""
+        start, end = self._day_range(days)
+
+        def compute():
+            rows = self._query("""
+                SELECT CAST(substr(bucket, 12, 2) AS INTEGER), SUM(posts) FROM posts_rollup_hourly
+                WHERE bucket >= :start AND bucket < :end
+                GROUP BY 1 HAVING SUM(posts) > 0 ORDER BY 2 DESC, 1 LIMIT 1
+            """, start=start, end=end)
+            return {'hour': rows[0][0], 'posts': rows[0][1]} if rows else None
+
+        return self._cached(('best_hour', days, start), compute)
+
+    def top_posts(self, metric='likes', limit=10):
+        """
+        Posts con el mayor valor actual (último snapshot) de una métrica
+
+        Returns:
+            [{'post_id', 'shortcode', 'platform', 'collected_at', 'metrics': {nombre: valor}}]
+        """
+        column = self._metric_column(metric)
+
+        def compute():
+            rows = self._query(f"""
+                SELECT l.post_id, p.shortcode, l.platform, l.collected_at, {', '.join('l.' + c for c in METRIC_COLUMNS)}
+                FROM metric_latest l JOIN posts p ON p.id = l.post_id
+                WHERE l.{column} IS NOT NULL
+                ORDER BY l.{column} DESC LIMIT :limit
+            """, limit=limit)
+            return [
+                {'post_id': post_id, 'shortcode': shortcode, 'platform': platform,
+                 'collected_at': datetime.utcfromtimestamp(collected_at),
+                 'metrics': {name: value for name, value in zip(METRIC_COLUMNS, values) if value is not None}}
+                for post_id, shortcode, platform, collected_at, *values in rows
+            ]
+
+        return self._cached(('top_posts', metric, limit), compute)
+
+    def top_post(self, metric='likes'):
+        """Post con el mayor valor de una métrica (ver top_posts) o None"""
+        posts = self.top_posts(metric, limit=1)
+        return posts[0] if posts else None
+
+    def post_timeseries(self, post_id, platform=None, since=None):
+        """
+        Serie de snapshots de un post (un rango de la clave primaria)
+
+        Args:
+            post_id: Id del post
+            platform: Solo esa plataforma (todas si es None)
+            since: datetime UTC desde el que se quieren snapshots
+
+        Returns:
+            [{'platform', 'collected_at', nombre de métrica: valor...}] por fecha
+        """
+        since_ts = int((since - datetime(1970, 1, 1)).total_seconds()) if since else 0
+
+        # Con plataforma, (post_id, platform, collected_at >= since) es un rango de la clave
+        platform_filter = "AND platform = :platform" if platform else ""
+
+        def compute():
+            rows = self._query(f"""
+                SELECT platform, collected_at, {', '.join(METRIC_COLUMNS)} FROM metric_snapshots
+                WHERE post_id = :post_id {platform_filter} AND collected_at >= :since
+                ORDER BY collected_at, platform
+            """, post_id=post_id, platform=platform, since=since_ts)
+            return [
+                {'platform': row_platform, 'collected_at': datetime.utcfromtimestamp(collected_at),
+                 **{name: value for name, value in zip(METRIC_COLUMNS, values) if value is not None}}
+                for row_platform, collected_at, *values in rows
+            ]
+
+        return self._cached(('post_timeseries', post_id, platform, since_ts), compute)
+
+    def recent_posts(self, limit=10):
+        """Últimos posts procesados: [{'shortcode', 'platform', 'status', 'processed_at'}]"""
+        def compute():
+            rows = self._query("""
+                SELECT shortcode, platform_target, status, processed_at FROM posts
+                ORDER BY id DESC LIMIT :limit
+            """, limit=limit)
+            return [
+                {'shortcode': shortcode, 'platform': platform, 'status': status,
+                 'processed_at': _parse_datetime(processed_at)}
+                for shortcode, platform, status, processed_at in rows
+            ]
+
+        return self._cached(('recent_posts', limit), compute)
+
+    def last_run(self):
+        """Última ejecución del bot (dict con las columnas de bot_runs) o None"""
+        def compute():
+            rows = self._query("""
+                SELECT id, started_at, ended_at, status, posts_processed, errors_count
+                FROM bot_runs ORDER BY id DESC LIMIT 1
+            """)
+            if not rows:
+                return None
+            run_id, started_at, ended_at, status, posts_processed, errors_count = rows[0]
+            return {
+                'id': run_id,
+                'started_at': _parse_datetime(started_at),
+                'ended_at': _parse_datetime(ended_at),
+                'status': status,
+                'posts_processed': posts_processed or 0,
+                'errors_count': errors_count or 0,
+            }
+
+        return self._cached(('last_run',), compute)
+
+    def close(self):
+        with self._lock:
+            self._version_conn.close()
+            self._cache.clear()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_stats_service():
+    """Servicio compartido por todas las páginas (y sesiones) del dashboard"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = DashboardStats()
+        return _shared
+
+
+def format_count(value):
+    """1234 -> '1.2K', 2500000 -> '2.5M'"""
+    if value is None:
+        return "—"
+    for threshold, suffix in ((1_000_000_000, 'B'), (1_000_000, 'M'), (1_000, 'K')):
+        if abs(value) >= threshold:
+            return f"{value / threshold:.1f}".rstrip('0').rstrip('.') + suffix
+    return str(int(value))
+
+
+def format_duration(seconds):
+    """Segundos a '45 s', '2.3 min', '1h 05m', '3d 4h'"""
+    if seconds is None:
+        return "—"
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} min"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)}h {int(seconds % 3600 // 60):02d}m"
+    return f"{int(seconds // 86400)}d {int(seconds % 86400 // 3600)}h"
+
+
+def time_ago(moment, now=None):
+    """'5 min ago' desde un datetime UTC"""
+    if moment is None:
+        return "never"
+    seconds = max(0, ((now or datetime.utcnow()) - moment).total_seconds())
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    return f"{format_duration(seconds)} ago"
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Migration Script: analytics (EAV) -> metric_snapshots
+Convierte la tabla analytics (una fila por post/plataforma/métrica/fecha) al
+esquema de series de tiempo: una fila ancha por snapshot en metric_snapshots
+y las métricas sin columna propia en metric_extras con id entero.
+
+La conversión es un INSERT ... SELECT agrupado, sin pasar las filas por
+Python. La tabla vieja queda renombrada como analytics_eav (o se borra con
+--drop) y los rollups se recalculan al final.
+"""
+import sys
+from pathlib import Path
+
+# Agregar parent directory al path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import text
+
+from dashboard.models.database import METRIC_COLUMNS, Base, engine as default_engine
+from dashboard.services.rollups import drop_rollups, ensure_rollups
+
+LEGACY_TABLE = 'analytics'
+BACKUP_TABLE = 'analytics_eav'
+
+# collected_at del EAV es texto ISO; los snapshots guardan segundos Unix
+_EPOCH = "CAST(strftime('%s', collected_at) AS INTEGER)"
+_COLUMN_LIST = ', '.join(f"'{c}'" for c in METRIC_COLUMNS)
+
+
+def _table_exists(conn, name):
+    row = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': name}
+    ).fetchone()
+    return row is not None
+
+
+def migrate_analytics_to_snapshots(engine=None, dry_run=False, drop_legacy=False):
+    """
+    Migra analytics (EAV) a metric_snapshots / metric_extras
+
+    Args:
+        engine: Engine de SQLAlchemy (usa el del dashboard si no se especifica)
+        dry_run: Si es True, no hace cambios, solo muestra qué haría
+        drop_legacy: Borrar la tabla vieja en lugar de renombrarla
+
+    Returns:
+        Tupla (snapshots_migrated, extras_migrated, errors)
+    """
+    engine = engine or default_engine
+
+    with engine.connect() as conn:
+        if not _table_exists(conn, LEGACY_TABLE):
+            print(f"[SKIP]  No existe la tabla {LEGACY_TABLE}, nada que migrar")
+            return 0, 0, 0
+        if not drop_legacy and _table_exists(conn, BACKUP_TABLE):
+            print(f"[ERROR] Ya existe {BACKUP_TABLE}; bórrala o usa --drop")
+            return 0, 0, 1
+
+        samples = conn.execute(text(f"SELECT COUNT(*) FROM {LEGACY_TABLE}")).scalar()
+        print(f"[OK] Encontradas {samples:,} filas en {LEGACY_TABLE}")
+
+        if dry_run:
+            snapshots = conn.execute(text(f"""
+                SELECT COUNT(*) FROM (
+                    SELECT 1 FROM {LEGACY_TABLE} GROUP BY post_id, platform, {_EPOCH}
+                )
+            """)).scalar()
+            names = [row[0] for row in conn.execute(text(
+                f"SELECT DISTINCT metric_name FROM {LEGACY_TABLE} WHERE metric_name NOT IN ({_COLUMN_LIST})"
+            ))]
+            print("🔍 Modo DRY RUN - No se harán cambios\n")
+            print(f"+ {snapshots:,} snapshots serían creados")
+            print(f"+ Métricas sin columna (a metric_extras): {', '.join(names) or 'ninguna'}")
+            return snapshots, 0, 0
+
+    # Crear las tablas nuevas y quitar los triggers durante la carga masiva
+    Base.metadata.create_all(engine)
+    drop_rollups(engine)
+
+    pivot = ', '.join(f"MAX(CASE WHEN metric_name = '{c}' THEN metric_value END)" for c in METRIC_COLUMNS)
+    merge = ', '.join(f'{c} = IFNULL(excluded.{c}, {c})' for c in METRIC_COLUMNS)
+
+    try:
+        with engine.begin() as conn:
+            # Varias filas del mismo segundo se funden en un snapshot (valores acumulados: MAX)
+            snapshots = conn.execute(text(f"""
+                INSERT INTO metric_snapshots (post_id, platform, collected_at, {', '.join(METRIC_COLUMNS)})
+                SELECT post_id, platform, {_EPOCH} AS ts, {pivot}
+                FROM {LEGACY_TABLE}
+                WHERE metric_name IN ({_COLUMN_LIST})
+                GROUP BY post_id, platform, ts
+                ON CONFLICT (post_id, platform, collected_at) DO UPDATE SET {merge}
+            """)).rowcount
+            print(f"[OK] {snapshots:,} snapshots migrados")
+
+            conn.execute(text(f"""
+                INSERT OR IGNORE INTO metric_names (name)
+                SELECT DISTINCT metric_name FROM {LEGACY_TABLE} WHERE metric_name NOT IN ({_COLUMN_LIST})
+            """))
+            extras = conn.execute(text(f"""
+                INSERT INTO metric_extras (post_id, platform, collected_at, metric_id, value)
+                SELECT a.post_id, a.platform, {_EPOCH.replace('collected_at', 'a.collected_at')} AS ts,
+                       n.id, MAX(a.metric_value)
+                FROM {LEGACY_TABLE} a JOIN metric_names n ON n.name = a.metric_name
+                WHERE true
+                GROUP BY a.post_id, a.platform, ts, n.id
+                ON CONFLICT (post_id, platform, collected_at, metric_id) DO UPDATE SET value = excluded.value
+            """)).rowcount
+            print(f"[OK] {extras:,} valores de métricas sin columna migrados")
+
+            if drop_legacy:
+                conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+                print(f"[OK] Tabla {LEGACY_TABLE} borrada")
+            else:
+                conn.execute(text(f"ALTER TABLE {LEGACY_TABLE} RENAME TO {BACKUP_TABLE}"))
+                print(f"[OK] Tabla {LEGACY_TABLE} renombrada a {BACKUP_TABLE}")
+
+            print(f"\n[SAVE] Cambios guardados en la base de datos")
+
+    except Exception as e:
+        print(f"\n[ERROR] Error general: {e}")
+        ensure_rollups(engine, rebuild=True)
+        return 0, 0, 1
+
+    # Rollups y triggers recalculados desde los snapshots migrados
+    ensure_rollups(engine, rebuild=True)
+    print("[OK] Rollups recalculados")
+
+    return snapshots, extras, 0
+
+
+def main():
+    """Función principal para ejecutar la migración"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Migrar analytics (EAV) a metric_snapshots')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='Modo dry-run: muestra qué haría sin hacer cambios')
+    parser.add_argument('--drop', action='store_true',
+                       help=f'Borrar la tabla vieja en lugar de renombrarla a {BACKUP_TABLE}')
+
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("MIGRACIÓN: analytics (EAV) -> metric_snapshots")
+    print("=" * 70)
+    print()
+
+    snapshots, extras, errors = migrate_analytics_to_snapshots(
+        dry_run=args.dry_run,
+        drop_legacy=args.drop
+    )
+
+    print("\n" + "=" * 70)
+    print("RESUMEN DE MIGRACIÓN")
+    print("=" * 70)
+    print(f"[OK] Snapshots:        {snapshots}")
+    print(f"[OK] Métricas extra:   {extras}")
+    print(f"[ERROR] Errores:       {errors}")
+    print("=" * 70)
+
+    if args.dry_run:
+        print("\n[TIP] Para ejecutar la migracion real, ejecuta sin --dry-run")
+
+    return 0 if errors == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
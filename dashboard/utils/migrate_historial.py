@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 """
-Migration Script: historial.json -> SQLite
-Migra el historial existente del bot a la base de datos SQLite
+Migration Script: historial del bot -> posts del dashboard
+Copia el historial del bot a la tabla posts del dashboard. Lee la tabla
+historial de data/analytics.db (backend por defecto del bot) o, si está
+vacía o se pide con --source json, el historial.json.
 """
 import json
 import sys
@@ -11,32 +13,80 @@ from datetime import datetime
 # Agregar parent directory al path para imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+import storage
 from dashboard.models.database import Session, Post, init_db
 
 
-def migrate_historial_to_db(historial_path='historial.json', dry_run=False):
+def load_sqlite_historial(db_path=None):
     """
-    Migra historial.json a SQLite
+    Historial guardado por SQLiteHistorialStore (todos los perfiles)
+
+    Returns:
+        Dict shortcode -> datos, en orden de inserción ({} si no hay tabla)
+    """
+    conn = storage.connect(db_path)
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'historial'"
+        ).fetchone()
+        if not exists:
+            return {}
+        rows = conn.execute("SELECT shortcode, data FROM historial ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+    historial = {}
+    for shortcode, data in rows:
+        # Un mismo post en dos perfiles: posts.shortcode es único
+        historial.setdefault(shortcode, json.loads(data))
+    return historial
+
+
+def load_historial(source='auto', historial_path='historial.json', db_path=None):
+    """
+    Carga el historial del bot
+
+    Args:
+        source: 'sqlite', 'json' o 'auto' (SQLite si tiene registros, si no el JSON)
+        historial_path: Ruta al archivo historial.json (relativa a la raíz del proyecto)
+        db_path: Base de datos del historial SQLite (default: data/analytics.db)
+
+    Returns:
+        Tupla (historial, descripción del origen), o (None, mensaje) si no existe
+    """
+    if source in ('auto', 'sqlite'):
+        historial = load_sqlite_historial(db_path)
+        if historial or source == 'sqlite':
+            return historial, f"tabla historial de {db_path or storage.DEFAULT_DB_PATH}"
+
+    historial_file = Path(__file__).parent.parent.parent / historial_path
+    if not historial_file.exists():
+        return None, f"No se encontró {historial_file}"
+
+    with open(historial_file, 'r', encoding='utf-8') as f:
+        return json.load(f), str(historial_file)
+
+
+def migrate_historial_to_db(historial_path='historial.json', dry_run=False, source='auto', db_path=None):
+    """
+    Migra el historial del bot a la tabla posts
 
     Args:
         historial_path: Ruta al archivo historial.json
         dry_run: Si es True, no hace cambios, solo muestra qué haría
+        source: 'sqlite', 'json' o 'auto' (ver load_historial)
+        db_path: Base de datos del historial SQLite
 
     Returns:
         Tupla (posts_migrated, posts_skipped, errors)
     """
-    historial_file = Path(__file__).parent.parent.parent / historial_path
+    historial, origin = load_historial(source, historial_path, db_path)
 
-    if not historial_file.exists():
-        print(f"[ERROR] No se encontró {historial_file}")
+    if historial is None:
+        print(f"[ERROR] {origin}")
         return 0, 0, 1
 
-    # Cargar historial
-    print(f"[FILE] Leyendo {historial_file}...")
-    with open(historial_file, 'r', encoding='utf-8') as f:
-        historial = json.load(f)
-
-    print(f"[OK] Encontrados {len(historial)} posts en historial.json\n")
+    print(f"[OK] Encontrados {len(historial)} posts en {origin}\n")
 
     if dry_run:
         print("🔍 Modo DRY RUN - No se harán cambios\n")
@@ -117,22 +167,28 @@ def main():
     """Función principal para ejecutar la migración"""
     import argparse
 
-    parser = argparse.ArgumentParser(description='Migrar historial.json a SQLite')
+    parser = argparse.ArgumentParser(description='Migrar el historial del bot a los posts del dashboard')
     parser.add_argument('--dry-run', action='store_true',
                        help='Modo dry-run: muestra qué haría sin hacer cambios')
     parser.add_argument('--file', type=str, default='historial.json',
                        help='Ruta al archivo historial.json')
+    parser.add_argument('--source', choices=['auto', 'sqlite', 'json'], default='auto',
+                       help='Origen: tabla historial de SQLite, historial.json o auto (SQLite si tiene datos)')
+    parser.add_argument('--db', type=str, default=None,
+                       help='Base de datos del historial SQLite (default: data/analytics.db)')
 
     args = parser.parse_args()
 
     print("=" * 70)
-    print("MIGRACIÓN: historial.json -> SQLite")
+    print("MIGRACIÓN: historial del bot -> posts del dashboard")
     print("=" * 70)
     print()
 
     migrated, skipped, errors = migrate_historial_to_db(
         historial_path=args.file,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        source=args.source,
+        db_path=args.db
     )
 
     print("\n" + "=" * 70)
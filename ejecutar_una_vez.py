@@ -11,33 +11,41 @@ except:
 
 from main import InstagramTwitterBot
 
-print("\n" + "=" * 60)
-print("BOT INSTAGRAM → TWITTER - EJECUCIÓN DE PRUEBA")
-print("=" * 60)
 
-try:
-    bot = InstagramTwitterBot()
+def main():
+    print("\n" + "=" * 60)
+    print("BOT INSTAGRAM → TWITTER - EJECUCIÓN DE PRUEBA")
+    print("=" * 60)
 
-    # Verificar Twitter
-    if not bot.twitter.verify_credentials():
-        print("\n❌ ERROR: Credenciales de Twitter inválidas")
-        sys.exit(1)
+    try:
+        bot = InstagramTwitterBot()
 
-    print("\n✅ Todo configurado correctamente!")
-    print("\n🔍 Buscando posts nuevos en Instagram...")
-    print("=" * 60)
+        # Verificar Twitter
+        if not bot.twitter.verify_credentials():
+            print("\n❌ ERROR: Credenciales de Twitter inválidas")
+            sys.exit(1)
 
-    # Ejecutar UNA vez
-    bot.run_once()
+        print("\n✅ Todo configurado correctamente!")
+        print("\n🔍 Buscando posts nuevos en Instagram...")
+        print("=" * 60)
 
-    print("\n" + "=" * 60)
-    print("✅ PRUEBA COMPLETADA")
-    print("=" * 60)
+        # Ejecutar UNA vez
+        bot.run_once()
+
+        print("\n" + "=" * 60)
+        print("✅ PRUEBA COMPLETADA")
+        print("=" * 60)
+
+        # Mostrar estadísticas
+        bot.show_stats()
+
+    except Exception as e:
+        print(f"\n❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
 
-    # Mostrar estadísticas
-    bot.show_stats()
 
-except Exception as e:
-    print(f"\n❌ ERROR: {e}")
-    import traceback
-    traceback.print_exc()
+# Los workers del preprocesado (spawn/forkserver) importan este módulo: sin
+# el guard cada uno volvería a ejecutar el bot
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+Almacenamiento del historial de posts ya publicados
+Dos backends con la misma interfaz de diccionario:
+  - JsonHistorialStore: el historial.json de siempre (reescritura completa)
+  - SQLiteHistorialStore: tabla indexada en data/analytics.db (inserts O(1))
+"""
+import json
+import os
+import sys
+import threading
+from collections.abc import MutableMapping
+from pathlib import Path
+
+import storage
+
+
+def _write_json_atomic(path, data, indent=None):
+    """Escribe JSON en un temporal y lo renombra (nunca queda a medias)"""
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JsonHistorialStore(MutableMapping):
+    """Historial en un archivo JSON (se carga y se reescribe entero)"""
+
+    def __init__(self, json_path):
+        """
+        Args:
+            json_path: Ruta al archivo historial.json
+        """
+        self.json_path = Path(json_path)
+        self.marca_path = self.json_path.with_name(f"{self.json_path.stem}_marca.json")
+        self._data = {}
+
+        if self.json_path.exists():
+            with open(self.json_path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+
+    def __getitem__(self, shortcode):
+        return self._data[shortcode]
+
+    def __setitem__(self, shortcode, record):
+        self._data[shortcode] = record
+
+    def __delitem__(self, shortcode):
+        del self._data[shortcode]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def ultimos(self, n=5):
+        """Retorna los últimos n registros como lista de (shortcode, datos)"""
+        return list(self._data.items())[-n:]
+
+    def get_marca(self):
+        """Retorna la marca de agua (shortcode, fecha ISO) o (None, None)"""
+        if not self.marca_path.exists():
+            return None, None
+        with open(self.marca_path, 'r', encoding='utf-8') as f:
+            marca = json.load(f)
+        return marca['shortcode'], marca['fecha']
+
+    def set_marca(self, shortcode, fecha):
+        """Guarda el último post hasta el cual todo está procesado"""
+        _write_json_atomic(self.marca_path, {'shortcode': shortcode, 'fecha': fecha})
+
+    def save(self):
+        """Reescribe el archivo completo de forma atómica (temp + rename)"""
+        _write_json_atomic(self.json_path, self._data, indent=2)
+
+    def close(self):
+        pass
+
+
+class SQLiteHistorialStore(MutableMapping):
+    """Historial en SQLite: cada insert es una transacción, lookups por índice"""
+
+    def __init__(self, db_path=None, namespace=''):
+        """
+        Args:
+            db_path: Ruta a la base de datos (usa data/analytics.db si no se especifica)
+            namespace: Perfil dueño de los registros ('' en modo de un solo perfil)
+        """
+        self.conn = storage.connect(db_path)
+        self.namespace = namespace
+        self._lock = threading.Lock()
+
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS historial (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                perfil TEXT NOT NULL DEFAULT '',
+                shortcode TEXT NOT NULL,
+                fecha_procesado TEXT,
+                data TEXT NOT NULL,
+                UNIQUE (perfil, shortcode)
+            )
+        """)
+        self._migrate_namespace()
+
+        # Marca de agua por perfil: último post hasta el cual todo está procesado
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS historial_marca (
+                perfil TEXT PRIMARY KEY,
+                shortcode TEXT NOT NULL,
+                fecha TEXT NOT NULL
+            )
+        """)
+
+    def _migrate_namespace(self):
+        """Reconstruye tablas creadas antes de existir la columna perfil"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(historial)")]
+        if 'perfil' in columns:
+            return
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("ALTER TABLE historial RENAME TO historial_old")
+            self.conn.execute("""
+                CREATE TABLE historial (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    perfil TEXT NOT NULL DEFAULT '',
+                    shortcode TEXT NOT NULL,
+                    fecha_procesado TEXT,
+                    data TEXT NOT NULL,
+                    UNIQUE (perfil, shortcode)
+                )
+            """)
+            self.conn.execute("""
+                INSERT INTO historial (id, perfil, shortcode, fecha_procesado, data)
+                SELECT id, '', shortcode, fecha_procesado, data FROM historial_old
+            """)
+            self.conn.execute("DROP TABLE historial_old")
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def __getitem__(self, shortcode):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT data FROM historial WHERE perfil = ? AND shortcode = ?",
+                (self.namespace, shortcode)
+            ).fetchone()
+        if row is None:
+            raise KeyError(shortcode)
+        return json.loads(row[0])
+
+    def __setitem__(self, shortcode, record):
+        data = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            # Upsert que conserva el id (orden de inserción) si ya existía
+            self.conn.execute(
+                """
+                INSERT INTO historial (perfil, shortcode, fecha_procesado, data)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(perfil, shortcode) DO UPDATE SET
+                    fecha_procesado = excluded.fecha_procesado,
+                    data = excluded.data
+                """,
+                (self.namespace, shortcode, record.get('fecha_procesado'), data)
+            )
+
+    def __delitem__(self, shortcode):
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM historial WHERE perfil = ? AND shortcode = ?",
+                (self.namespace, shortcode)
+            )
+        if cursor.rowcount == 0:
+            raise KeyError(shortcode)
+
+    def __contains__(self, shortcode):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM historial WHERE perfil = ? AND shortcode = ?",
+                (self.namespace, shortcode)
+            ).fetchone()
+        return row is not None
+
+    def __iter__(self):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT shortcode FROM historial WHERE perfil = ? ORDER BY id", (self.namespace,)
+            ).fetchall()
+        return iter(row[0] for row in rows)
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM historial WHERE perfil = ?", (self.namespace,)
+            ).fetchone()[0]
+
+    def items(self):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT shortcode, data FROM historial WHERE perfil = ? ORDER BY id", (self.namespace,)
+            ).fetchall()
+        return [(shortcode, json.loads(data)) for shortcode, data in rows]
+
+    def ultimos(self, n=5):
+        """Retorna los últimos n registros como lista de (shortcode, datos)"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT shortcode, data FROM historial WHERE perfil = ? ORDER BY id DESC LIMIT ?",
+                (self.namespace, n)
+            ).fetchall()
+        return [(shortcode, json.loads(data)) for shortcode, data in reversed(rows)]
+
+    def get_marca(self):
+        """Retorna la marca de agua (shortcode, fecha ISO) o (None, None)"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT shortcode, fecha FROM historial_marca WHERE perfil = ?", (self.namespace,)
+            ).fetchone()
+        return tuple(row) if row else (None, None)
+
+    def set_marca(self, shortcode, fecha):
+        """Guarda el último post hasta el cual todo está procesado"""
+        with self._lock:
+            self.conn.execute(
+                """
+                INSERT INTO historial_marca (perfil, shortcode, fecha) VALUES (?, ?, ?)
+                ON CONFLICT(perfil) DO UPDATE SET
+                    shortcode = excluded.shortcode,
+                    fecha = excluded.fecha
+                """,
+                (self.namespace, shortcode, fecha)
+            )
+
+    def save(self):
+        """No hace nada: cada escritura ya quedó confirmada en la base"""
+        pass
+
+    def import_json(self, json_path):
+        """
+        Importa un historial.json existente (los shortcodes repetidos se ignoran)
+
+        Args:
+            json_path: Ruta al historial.json
+
+        Returns:
+            Número de registros nuevos importados
+        """
+        with open(json_path, 'r', encoding='utf-8') as f:
+            historial = json.load(f)
+
+        rows = [
+            (self.namespace, shortcode, record.get('fecha_procesado'), json.dumps(record, ensure_ascii=False))
+            for shortcode, record in historial.items()
+        ]
+
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO historial (perfil, shortcode, fecha_procesado, data) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return self.conn.total_changes - before
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def open_historial(backend='sqlite', json_path=None, db_path=None, namespace=''):
+    """
+    Abre el historial con el backend indicado
+
+    Con 'sqlite', si la tabla está vacía y existe el historial.json,
+    se importa automáticamente la primera vez.
+
+    Args:
+        backend: 'sqlite' o 'json'
+        json_path: Ruta al historial.json
+        db_path: Ruta a la base de datos SQLite
+        namespace: Perfil dueño del historial ('' en modo de un solo perfil).
+            Con 'json' cada perfil usa su propio archivo historial_<perfil>.json
+
+    Returns:
+        Store con interfaz de diccionario (shortcode -> datos)
+    """
+    if namespace and json_path:
+        json_path = Path(json_path)
+        json_path = json_path.with_name(f"{json_path.stem}_{namespace}{json_path.suffix}")
+
+    if backend == 'json':
+        return JsonHistorialStore(json_path)
+
+    if backend != 'sqlite':
+        raise ValueError(f"Backend de historial desconocido: {backend}")
+
+    store = SQLiteHistorialStore(db_path, namespace=namespace)
+
+    if json_path and Path(json_path).exists() and len(store) == 0:
+        imported = store.import_json(json_path)
+        print(f"📦 Importados {imported} posts desde {Path(json_path).name}")
+
+    return store
+
+
+def main():
+    """Importa un historial.json a SQLite desde la línea de comandos"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Importar historial.json al historial SQLite')
+    parser.add_argument('json_path', help='Ruta al archivo historial.json')
+    parser.add_argument('--db', type=str, default=None,
+                        help='Ruta a la base de datos (default: data/analytics.db)')
+    parser.add_argument('--perfil', type=str, default='',
+                        help='Perfil de Instagram dueño del historial (modo multi-perfil)')
+
+    args = parser.parse_args()
+
+    if not Path(args.json_path).exists():
+        print(f"[ERROR] No se encontró {args.json_path}")
+        return 1
+
+    store = SQLiteHistorialStore(args.db, namespace=args.perfil)
+    imported = store.import_json(args.json_path)
+    total = len(store)
+    store.close()
+
+    print(f"[OK] Importados {imported} posts nuevos ({total} en total)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
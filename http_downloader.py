@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Descargas HTTP reanudables sobre una sesión keep-alive compartida
+- Una sola sesión con pool de conexiones y límite de conexiones por host
+- Si la descarga se corta, continúa desde los bytes ya escritos (Range);
+  con If-Range el servidor manda el archivo completo si cambió
+- Calcula el SHA-256 mientras descarga (sin releer el archivo)
+- Escribe en un .part y lo renombra al terminar: nunca queda un archivo
+  final a medias
+- Verifica que la cantidad de bytes coincida con la informada por el servidor
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from browser_pool import DEFAULT_USER_AGENT
+
+_CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+# Errores de red que justifican reintentar desde donde se cortó
+RETRYABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class IncompleteDownloadError(Exception):
+    """El servidor cerró la conexión antes de enviar todos los bytes"""
+    pass
+
+
+class StreamingDownloader:
+    def __init__(self, max_per_host=4, max_hosts=10, chunk_size=256 * 1024, retries=3,
+                 timeout=(10, 60), headers=None):
+        """
+        Inicializa el downloader
+
+        Args:
+            max_per_host: Conexiones simultáneas por host (las demás esperan)
+            max_hosts: Hosts distintos con conexiones keep-alive abiertas
+            chunk_size: Bytes por lectura del stream
+            retries: Reintentos (reanudando) si la conexión se corta
+            timeout: (conexión, lectura) en segundos
+            headers: Headers extra para cada request
+        """
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = DEFAULT_USER_AGENT
+        self.session.headers.update(headers or {})
+
+        # pool_block: con max_per_host conexiones ocupadas, la siguiente espera
+        # en lugar de abrir una conexión extra
+        adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=max_per_host, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def download(self, url, dest_path):
+        """
+        Descarga url en dest_path, reanudando un .part previo si existe
+
+        Args:
+            url: URL del archivo
+            dest_path: Ruta final
+
+        Returns:
+            Dict {'path', 'bytes', 'sha256', 'resumed_from', 'seconds'}
+
+        Raises:
+            requests.HTTPError, IncompleteDownloadError o errores de red si se
+            agotan los reintentos (el .part queda para el próximo intento)
+        """
+        dest_path = Path(dest_path)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = dest_path.with_name(dest_path.name + '.part')
+        meta_path = dest_path.with_name(dest_path.name + '.part.json')
+
+        start = time.perf_counter()
+        resumed_from = part_path.stat().st_size if part_path.exists() else 0
+
+        for attempt in range(self.retries + 1):
+            try:
+                size, digest = self._fetch(url, part_path, meta_path)
+                break
+            except (IncompleteDownloadError, *RETRYABLE_ERRORS) as e:
+                if attempt == self.retries:
+                    raise
+                wait = 2 ** attempt
+                print(f"⚠️ Descarga cortada ({e}); reanudando en {wait} s...")
+                time.sleep(wait)
+
+        os.replace(part_path, dest_path)
+        meta_path.unlink(missing_ok=True)
+
+        return {
+            'path': str(dest_path),
+            'bytes': size,
+            'sha256': digest,
+            'resumed_from': resumed_from,
+            'seconds': time.perf_counter() - start,
+        }
+
+    def _fetch(self, url, part_path, meta_path):
+        """Un intento: pide lo que falta del .part y lo completa"""
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        meta = self._read_meta(meta_path)
+
+        headers = {}
+        if offset and meta.get('validator') and meta.get('url') == url.split('?')[0]:
+            headers['Range'] = f"bytes={offset}-"
+            # Si el archivo cambió en el servidor, manda el completo (200)
+            headers['If-Range'] = meta['validator']
+        else:
+            offset = 0
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 416 and offset:
+                # Lo pedido empieza después del final: el .part ya estaba completo
+                total = self._content_range_total(response.headers.get('Content-Range', ''))
+                if total == offset:
+                    return offset, self._hash_file(part_path)
+                part_path.unlink(missing_ok=True)
+                raise IncompleteDownloadError("El .part no coincide con el archivo del servidor")
+
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                match = _CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+                if not match or int(match.group(1)) != offset:
+                    raise IncompleteDownloadError("Content-Range inesperado")
+                total = None if match.group(3) == '*' else int(match.group(3))
+            else:
+                # 200: el servidor ignoró el Range (o el archivo cambió)
+                offset = 0
+                length = response.headers.get('Content-Length')
+                total = int(length) if length and 'Content-Encoding' not in response.headers else None
+
+            # Validador para poder reanudar este mismo contenido más adelante
+            validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+            self._write_meta(meta_path, {'url': url.split('?')[0], 'validator': validator})
+
+            # El hash de lo ya descargado se calcula una vez; el resto en el stream
+            digest = self._hash_file(part_path, as_hasher=True) if offset else hashlib.sha256()
+            written = offset
+
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    written += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+        if total is not None and written != total:
+            raise IncompleteDownloadError(f"{written} de {total} bytes")
+
+        return written, digest.hexdigest()
+
+    @staticmethod
+    def _content_range_total(value):
+        match = re.search(r'/(\d+)$', value)
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def _hash_file(path, as_hasher=False):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest if as_hasher else digest.hexdigest()
+
+    @staticmethod
+    def _read_meta(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_meta(meta_path, meta):
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    def close(self):
+        self.session.close()
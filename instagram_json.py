@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Extracción de posts desde las respuestas JSON de Instagram
+La página de un perfil trae sus posts como JSON (embebido en el HTML y en
+las respuestas de /graphql/query y /api/v1/). Este módulo recorre esos
+payloads y arma los mismos dicts de post que el resto del bot, sin depender
+del DOM.
+
+Reconoce los dos formatos que usa Instagram:
+- GraphQL clásico: nodos con shortcode, display_url, edge_media_to_caption,
+  edge_sidecar_to_children, taken_at_timestamp
+- API v1 / xdt_api: nodos con code, media_type (1 imagen, 2 video,
+  8 carrusel), image_versions2, video_versions, carousel_media, taken_at
+"""
+import json
+from datetime import datetime, timezone
+
+# media_type de la API v1
+_MEDIA_IMAGE = 1
+_MEDIA_VIDEO = 2
+_MEDIA_CAROUSEL = 8
+
+
+def _is_media_node(node):
+    if node.get('shortcode') and ('display_url' in node or '__typename' in node):
+        return True
+    return bool(node.get('code')) and ('media_type' in node or 'image_versions2' in node)
+
+
+def _iter_media_nodes(payload):
+    """Nodos de media en cualquier nivel del payload (sin entrar en los carruseles)"""
+    stack = [payload]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            if _is_media_node(value):
+                yield value
+                continue
+            stack.extend(reversed(list(value.values())))
+        elif isinstance(value, list):
+            stack.extend(reversed(value))
+
+
+def _best_url(candidates):
+    """URL de la versión de mayor resolución"""
+    candidates = [c for c in candidates or [] if c.get('url')]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda c: (c.get('width') or 0) * (c.get('height') or 0))['url']
+
+
+def _media_item(node):
+    """{'url', 'is_video'} de un nodo simple (no carrusel)"""
+    if 'media_type' in node or 'image_versions2' in node:
+        if node.get('media_type') == _MEDIA_VIDEO or node.get('video_versions'):
+            return {'url': _best_url(node.get('video_versions')), 'is_video': True}
+        return {'url': _best_url((node.get('image_versions2') or {}).get('candidates')), 'is_video': False}
+
+    if node.get('is_video'):
+        return {'url': node.get('video_url'), 'is_video': True}
+    return {'url': node.get('display_url'), 'is_video': False}
+
+
+def _caption(node):
+    caption = node.get('caption')
+    if isinstance(caption, dict):
+        return caption.get('text') or ""
+    if isinstance(caption, str):
+        return caption
+
+    edges = (node.get('edge_media_to_caption') or {}).get('edges') or []
+    return edges[0]['node'].get('text', "") if edges else ""
+
+
+def _count(node, *keys):
+    for key in keys:
+        value = node.get(key)
+        if isinstance(value, dict):
+            value = value.get('count')
+        if value is not None:
+            return value
+    return 0
+
+
+def parse_media_node(node):
+    """
+    Convierte un nodo de media de Instagram en un dict de post
+
+    Returns:
+        Dict con shortcode, url, caption, date (UTC ISO), is_video, media
+        (lista de {'url', 'is_video'}, un elemento por foto/video del
+        carrusel), media_url, likes, comments, typename, is_pinned;
+        o None si el nodo no trae fecha
+    """
+    shortcode = node.get('shortcode') or node.get('code')
+    timestamp = node.get('taken_at_timestamp') or node.get('taken_at')
+    if not shortcode or not timestamp:
+        return None
+
+    if node.get('carousel_media'):
+        children = node['carousel_media']
+        typename = 'GraphSidecar'
+    elif (node.get('edge_sidecar_to_children') or {}).get('edges'):
+        children = [edge['node'] for edge in node['edge_sidecar_to_children']['edges']]
+        typename = 'GraphSidecar'
+    else:
+        children = [node]
+        typename = None
+
+    media = [item for item in (_media_item(child) for child in children) if item['url']]
+    is_video = any(item['is_video'] for item in media) if typename else bool(media and media[0]['is_video'])
+    if typename is None:
+        typename = 'GraphVideo' if is_video else 'GraphImage'
+
+    # Fecha UTC sin zona, igual que post.date_utc de instaloader
+    date = datetime.fromtimestamp(int(timestamp), timezone.utc).replace(tzinfo=None)
+
+    return {
+        'shortcode': shortcode,
+        'post_id': node.get('pk') or node.get('id'),
+        'url': f"https://www.instagram.com/p/{shortcode}/",
+        'caption': _caption(node),
+        'date': date.isoformat(),
+        'is_video': is_video,
+        'media': media,
+        'media_url': media[0]['url'] if media else None,
+        'likes': _count(node, 'like_count', 'edge_liked_by', 'edge_media_preview_like'),
+        'comments': _count(node, 'comment_count', 'edge_media_to_comment'),
+        'typename': typename,
+        'is_pinned': bool(node.get('timeline_pinned_user_ids') or node.get('pinned_for_users')),
+    }
+
+
+def extract_posts(payload):
+    """
+    Posts contenidos en un payload JSON (dict/list ya decodificado o texto)
+
+    Returns:
+        Lista de dicts de post en el orden en que aparecen, sin repetidos
+    """
+    if isinstance(payload, (str, bytes)):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            return []
+
+    posts = []
+    seen = set()
+    for node in _iter_media_nodes(payload):
+        post = parse_media_node(node)
+        if post and post['shortcode'] not in seen:
+            seen.add(post['shortcode'])
+            posts.append(post)
+    return posts
@@ -3,12 +3,46 @@ Módulo para descargar contenido de Instagram
 Usa Instaloader - no requiere API oficial
 """
 import instaloader
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
+import threading
 import time
 
+from media_manifest import read_manifest, write_manifest, scan_post_folder, manifest_to_downloaded
+from metrics import get_metrics
+
+# Consultas de Profile.get_posts (instaloader 4.15.4, fijado en
+# requirements.txt): anónima por id del perfil, con sesión por username
+_POSTS_DOC_ID = "7950326061742207"
+_POSTS_DOC_ID_LOGGED_IN = "28975909992013618"
+
+
+class _PostCache:
+    """Posts del último listado por shortcode (acotado y con vencimiento)"""
+
+    def __init__(self, max_items=200, ttl_secs=3600):
+        self.max_items = max_items
+        self.ttl_secs = ttl_secs
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, shortcode, post):
+        with self._lock:
+            self._items.pop(shortcode, None)
+            self._items[shortcode] = (time.monotonic() + self.ttl_secs, post)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def pop(self, shortcode):
+        """El post guardado (y lo quita), o None si no está o venció"""
+        with self._lock:
+            expires_at, post = self._items.pop(shortcode, (0, None))
+        return post if expires_at > time.monotonic() else None
+
+
 class InstagramScraper:
-    def __init__(self, username, password=None, download_folder="media"):
+    def __init__(self, username, password=None, download_folder="media", loader=None, profile_cache=None):
         """
         Inicializa el scraper de Instagram
 
@@ -16,22 +50,21 @@ class InstagramScraper:
             username: Usuario de Instagram a monitorear
             password: Contraseña (solo si quieres hacer login, opcional)
             download_folder: Carpeta donde guardar las descargas
+            loader: Instaloader compartido con otros scrapers (opcional)
+            profile_cache: ProfileIdCache para no resolver el id del perfil en cada revisión
         """
         self.username = username
+        self.profile_cache = profile_cache
+
+        # Los Post del listado traen la metadata que necesita la descarga:
+        # download_post los reutiliza en lugar de pedir Post.from_shortcode
+        # (vencen antes que las URLs firmadas del CDN)
+        self._posts = _PostCache(max_items=200, ttl_secs=3600)
         self.download_folder = Path(download_folder)
         self.download_folder.mkdir(exist_ok=True)
 
-        # Configurar Instaloader
-        self.L = instaloader.Instaloader(
-            download_pictures=True,
-            download_videos=True,
-            download_video_thumbnails=False,
-            download_geotags=False,
-            download_comments=False,
-            save_metadata=False,
-            compress_json=False,
-            dirname_pattern=str(self.download_folder)
-        )
+        # Configurar Instaloader (o reutilizar el compartido y su sesión HTTP)
+        self.L = loader or self.create_loader(self.download_folder)
 
         # Login opcional (permite acceder a más contenido)
         if password:
@@ -44,24 +77,73 @@ class InstagramScraper:
                 self.L.save_session_to_file()
                 print("✅ Sesión guardada")
 
-    def get_recent_posts(self, max_posts=5):
+    @staticmethod
+    def create_loader(download_folder):
+        """
+        Crea un Instaloader configurado para el bot
+
+        Args:
+            download_folder: Carpeta donde guardar las descargas
+
+        Returns:
+            instaloader.Instaloader
+        """
+        return instaloader.Instaloader(
+            download_pictures=True,
+            download_videos=True,
+            download_video_thumbnails=False,
+            download_geotags=False,
+            download_comments=False,
+            save_metadata=False,
+            compress_json=False,
+            # Una carpeta por post: download_post(post, target=shortcode)
+            dirname_pattern=str(Path(download_folder) / '{target}')
+        )
+
+    def get_recent_posts(self, max_posts=5, since_shortcode=None, since_date=None, max_lookback=None):
         """
         Obtiene los posts más recientes del perfil
 
+        Si se indica el último post ya visto (since_shortcode / since_date),
+        deja de paginar en cuanto lo alcanza: sin posts nuevos basta con la
+        primera página, y tras una caída larga puede retroceder hasta
+        max_lookback posts.
+
         Args:
-            max_posts: Número máximo de posts a obtener
+            max_posts: Número máximo de posts a obtener (sin marca de agua)
+            since_shortcode: Shortcode del último post ya procesado
+            since_date: Fecha UTC (datetime) del último post ya procesado
+            max_lookback: Máximo de posts a obtener cuando hay marca de agua
 
         Returns:
-            Lista de diccionarios con información de los posts
+            Lista de diccionarios con información de los posts (más nuevo primero)
         """
+        incremental = since_shortcode is not None or since_date is not None
+        limit = (max_lookback or max_posts) if incremental else max_posts
+
+        with get_metrics().span('instagram_listing', profile=self.username) as span:
+            return self._get_recent_posts(span, limit, since_shortcode, since_date)
+
+    def _get_recent_posts(self, span, limit, since_shortcode, since_date):
         posts_data = []
 
         try:
             print(f"🔍 Obteniendo posts de @{self.username}...")
-            profile = instaloader.Profile.from_username(self.L.context, self.username)
 
-            for index, post in enumerate(profile.get_posts()):
-                if index >= max_posts:
+            for post in self._get_posts(span):
+                if len(posts_data) >= limit:
+                    break
+
+                # Los posts fijados aparecen primero aunque sean viejos:
+                # se saltan en lugar de cortar la paginación
+                pinned = getattr(post, 'is_pinned', False)
+                reached = (
+                    post.shortcode == since_shortcode
+                    or (since_date is not None and post.date_utc <= since_date)
+                )
+                if reached:
+                    if pinned:
+                        continue
                     break
 
                 post_info = {
@@ -74,56 +156,182 @@ class InstagramScraper:
                     'likes': post.likes,
                     'comments': post.comments,
                     'typename': post.typename,  # GraphImage, GraphVideo, GraphSidecar
+                    'is_pinned': pinned,
                 }
 
                 posts_data.append(post_info)
+                self._posts.put(post.shortcode, post)
 
             print(f"✅ Encontrados {len(posts_data)} posts")
+            span.set(posts=len(posts_data))
             return posts_data
 
         except Exception as e:
             print(f"❌ Error obteniendo posts: {e}")
+            span.fail(e)
             return []
 
+    def _get_profile(self, refresh=False):
+        """
+        Profile del usuario monitoreado
+
+        Con el id en caché se arma el Profile sin pedir la página del perfil;
+        si no está (o refresh) se resuelve con Profile.from_username y se guarda.
+
+        Returns:
+            (Profile, True si salió de la caché)
+        """
+        if self.profile_cache is not None and not refresh:
+            profile_id = self.profile_cache.get(self.username)
+            if profile_id:
+                node = {'id': profile_id, 'username': self.username}
+                return instaloader.Profile(self.L.context, node), True
+
+        profile = instaloader.Profile.from_username(self.L.context, self.username)
+        if self.profile_cache is not None:
+            self.profile_cache.put(self.username, profile.userid)
+        return profile, False
+
+    def _get_posts(self, span):
+        """Iterador de posts del perfil (reintenta sin caché si el id guardado ya no sirve)"""
+        profile, cached = self._get_profile()
+        span.set(profile_cached=cached)
+
+        try:
+            # Profile.get_posts pide la metadata completa del perfil aunque
+            # solo use el id: con el id en caché se lista directamente
+            return self._list_posts(profile) if cached else profile.get_posts()
+        except instaloader.ProfileNotExistsException:
+            if not cached:
+                raise
+            print(f"🔄 El id guardado de @{self.username} ya no es válido, resolviendo de nuevo...")
+            self.profile_cache.invalidate(self.username)
+            profile, _ = self._get_profile(refresh=True)
+            span.set(profile_cached=False)
+            return profile.get_posts()
+
+    def _list_posts(self, profile):
+        """
+        Posts del perfil sin pasar por Profile._obtain_metadata
+
+        Una sola consulta por revisión: la primera página del listado. Repite
+        la consulta que hace Profile.get_posts en instaloader 4.15.4.
+
+        Raises:
+            ProfileNotExistsException: Si el id ya no existe o pertenece a
+                otro usuario (cambio de nombre)
+        """
+        context = self.L.context
+        referer = f"https://www.instagram.com/{profile.username}/"
+        is_first = lambda post, first: first is None or post.date_local > first.date_local
+
+        if context.is_logged_in:
+            # Con sesión la consulta va por username: no depende del id guardado
+            return instaloader.NodeIterator(
+                context=context,
+                query_hash=None,
+                edge_extractor=lambda d: d["data"]["xdt_api__v1__feed__user_timeline_graphql_connection"],
+                node_wrapper=lambda n: instaloader.Post.from_iphone_struct(context, n),
+                query_variables={
+                    "data": {
+                        "count": 12,
+                        "include_reel_media_seen_timestamp": True,
+                        "include_relationship_info": True,
+                        "latest_besties_reel_media": True,
+                        "latest_reel_media": True,
+                    },
+                    "first": 12,
+                    "include_multi_captions": True,
+                    "username": profile.username,
+                    "__relay_internal__pv__PolarisMultiCaptionCarouselEnabledrelayprovider": True,
+                    "__relay_internal__pv__PolarisShortDramaEnabledrelayprovider": False,
+                    "__relay_internal__pv__PolarisReelsRecoDebugOverlayEnabledrelayprovider": False,
+                },
+                query_referer=referer,
+                is_first=is_first,
+                doc_id=_POSTS_DOC_ID_LOGGED_IN,
+            )
+
+        def timeline(data):
+            user = data["data"]["user"]
+            if not user:
+                raise instaloader.ProfileNotExistsException(f"El id guardado de @{self.username} no existe")
+            media = user["edge_owner_to_timeline_media"]
+            for edge in media["edges"]:
+                owner = edge["node"].get("owner", {}).get("username")
+                if owner and owner.lower() != self.username.lower():
+                    raise instaloader.ProfileNotExistsException(f"El id ya no corresponde a @{self.username}")
+            return media
+
+        # NodeIterator pide la primera página al crearse: un id inválido falla acá
+        return instaloader.NodeIterator(
+            context=context,
+            query_hash=None,
+            edge_extractor=timeline,
+            node_wrapper=lambda n: instaloader.Post(context, n, profile),
+            query_variables={
+                "data": {
+                    "count": 12,
+                    "include_relationship_info": True,
+                    "latest_besties_reel_media": True,
+                    "latest_reel_media": True,
+                },
+                "id": profile.userid,
+            },
+            query_referer=referer,
+            is_first=is_first,
+            doc_id=_POSTS_DOC_ID,
+        )
+
     def download_post(self, shortcode):
         """
         Descarga un post específico (imagen o video)
 
+        Los archivos quedan en download_folder/<shortcode>/ con un manifest.json;
+        si el post ya estaba descargado se retorna desde el manifest sin red.
+
         Args:
             shortcode: Código del post de Instagram
 
         Returns:
             Dict con rutas de archivos descargados
         """
+        with get_metrics().span('instagram_download', profile=self.username, shortcode=shortcode) as span:
+            return self._download_post(span, shortcode)
+
+    def _download_post(self, span, shortcode):
         try:
+            post_folder = self.download_folder / shortcode
+
+            manifest = read_manifest(post_folder)
+            if manifest:
+                print(f"♻️  Post {shortcode} ya descargado")
+                span.set(cached=True)
+                return manifest_to_downloaded(manifest)
+
             print(f"📥 Descargando post {shortcode}...")
 
-            # Obtener el post
-            post = instaloader.Post.from_shortcode(self.L.context, shortcode)
-
-            # Descargar directamente en download_folder
-            # Instaloader usa el patrón de fecha: YYYY-MM-DD_HH-MM-SS_UTC
-            self.L.download_post(post, target=str(self.download_folder))
-
-            # Encontrar los archivos descargados
-            downloaded_files = {
-                'images': [],
-                'videos': [],
-                'caption': post.caption if post.caption else "",
-                'url': f"https://www.instagram.com/p/{shortcode}/"
-            }
-
-            # Instaloader nombra archivos como: YYYY-MM-DD_HH-MM-SS_UTC.jpg
-            # Convertir la fecha del post a ese formato
-            date_str = post.date_utc.strftime('%Y-%m-%d_%H-%M-%S_UTC')
-
-            # Buscar archivos que coincidan con esta fecha
-            for file in self.download_folder.iterdir():
-                if file.is_file() and file.stem == date_str:
-                    if file.suffix.lower() in ['.jpg', '.jpeg', '.png']:
-                        downloaded_files['images'].append(str(file))
-                    elif file.suffix.lower() in ['.mp4']:
-                        downloaded_files['videos'].append(str(file))
+            # Obtener el post (del último listado si sigue vigente)
+            post = self._posts.pop(shortcode)
+            span.set(post_cached=post is not None)
+            if post is None:
+                post = instaloader.Post.from_shortcode(self.L.context, shortcode)
+
+            # Descargar en download_folder/<shortcode> (dirname_pattern usa {target})
+            self.L.download_post(post, target=shortcode)
+
+            # Solo se revisa la carpeta del post, no todo download_folder
+            caption = post.caption if post.caption else ""
+            url = f"https://www.instagram.com/p/{shortcode}/"
+            write_manifest(post_folder, shortcode, caption, url, scan_post_folder(post_folder))
+
+            manifest = read_manifest(post_folder)
+            downloaded_files = manifest_to_downloaded(manifest)
+            span.set(
+                media_type='video' if downloaded_files['videos'] else 'image',
+                files=len(manifest['files']),
+                bytes=sum(file['size'] for file in manifest['files'])
+            )
 
             print(f"✅ Descargado: {len(downloaded_files['images'])} imágenes, {len(downloaded_files['videos'])} videos")
 
@@ -131,6 +339,7 @@ class InstagramScraper:
 
         except Exception as e:
             print(f"❌ Error descargando post: {e}")
+            span.fail(e)
             return None
 
     def get_latest_post(self):
@@ -2,16 +2,37 @@
 Módulo para descargar contenido de Instagram usando Playwright
 Más robusto y simula un navegador real
 """
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+from playwright.sync_api import TimeoutError as PlaywrightTimeout
 from pathlib import Path
 import time
 import re
 import json
-import requests
+from collections import OrderedDict
+from contextlib import ExitStack
 from datetime import datetime
 
+from browser_pool import BrowserPool
+from http_downloader import StreamingDownloader
+from instagram_json import extract_posts
+from media_manifest import read_manifest, write_manifest, scan_post_folder, manifest_to_downloaded
+
+# Respuestas de la API que traen posts del perfil
+_API_URL = re.compile(r'/graphql/query|/api/v1/')
+
+# Recursos que no hacen falta para leer el HTML ni el JSON (se leen los
+# atributos src, no las imágenes)
+BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font', 'stylesheet')
+_TRACKING_URL = re.compile(r'google-analytics\.com|doubleclick\.net|facebook\.com/tr|/logging_client_events|/ajax/bz')
+
+# Posts listados que se recuerdan para descargarlos sin abrir su página
+_LISTED_MAX_ITEMS = 200
+_LISTED_TTL_SECS = 3600
+
+
 class InstagramScraperPlaywright:
-    def __init__(self, username, download_folder="media", headless=True):
+    def __init__(self, username, download_folder="media", headless=True, pool=None,
+                 max_pages_per_browser=50, max_browser_rss_mb=1024, downloader=None,
+                 extraction='network', detail_pages=4, block_resources=True, state_dir=None):
         """
         Inicializa el scraper de Instagram con Playwright
 
@@ -19,6 +40,19 @@ class InstagramScraperPlaywright:
             username: Usuario de Instagram a monitorear
             download_folder: Carpeta donde guardar las descargas
             headless: Si es True, el navegador se ejecuta sin interfaz
+            pool: BrowserPool compartido (opcional, se crea uno si no se pasa)
+            max_pages_per_browser: Páginas antes de reciclar el navegador
+            max_browser_rss_mb: Memoria máxima del navegador antes de reciclarlo
+            downloader: StreamingDownloader compartido (opcional, se crea uno si no se pasa)
+            extraction: 'network' lee los posts de las respuestas JSON que carga el
+                perfil (una sola página); 'dom' abre cada post y lee el HTML
+            detail_pages: Posts que se abren a la vez en modo 'dom'
+            block_resources: No descargar imágenes, videos, fuentes, CSS ni trackers
+                al navegar (la media se descarga aparte)
+            state_dir: Perfil persistente del navegador (cookies, localStorage y caché
+                HTTP en disco) para no repetir el diálogo de cookies en cada ejecución
+                (default: data/browser). Playwright no usa la caché HTTP en páginas con
+                recursos bloqueados, así que con block_resources solo se reutiliza la sesión
         """
         self.username = username
         self.download_folder = Path(download_folder)
@@ -26,119 +60,307 @@ class InstagramScraperPlaywright:
         self.headless = headless
         self.profile_url = f"https://www.instagram.com/{username}/"
 
-    def get_recent_posts(self, max_posts=5):
+        # Navegador persistente compartido por get_recent_posts y download_post
+        self.pool = pool or BrowserPool(
+            headless=headless,
+            max_pages=max_pages_per_browser,
+            max_rss_mb=max_browser_rss_mb,
+            state_dir=state_dir or Path(__file__).parent / 'data' / 'browser'
+        )
+
+        # Sesión keep-alive para los archivos del CDN (reanuda descargas cortadas)
+        self.downloader = downloader or StreamingDownloader()
+
+        self.extraction = extraction
+        self.detail_pages = max(1, detail_pages)
+        self.block_resources = block_resources
+        # shortcode → (momento del listado, post) con las URLs de su media
+        self._listed = OrderedDict()
+
+    def get_recent_posts(self, max_posts=5, since_shortcode=None, since_date=None, max_lookback=None):
         """
         Obtiene los posts más recientes del perfil
 
         Args:
             max_posts: Número máximo de posts a obtener
+            since_shortcode: Shortcode del último post ya procesado (corta ahí)
+            since_date: Fecha UTC del último post ya procesado (solo en modo 'network';
+                en el HTML del perfil no hay fechas)
+            max_lookback: Máximo de posts a revisar cuando hay since_shortcode
 
         Returns:
             Lista de diccionarios con información de los posts
         """
-        posts_data = []
+        incremental = since_shortcode is not None or since_date is not None
+        limit = (max_lookback or max_posts) if incremental else max_posts
 
-        with sync_playwright() as p:
-            print(f"🌐 Abriendo navegador...")
-            browser = p.chromium.launch(headless=self.headless)
+        if self.extraction == 'network':
+            posts = self._get_recent_posts_network(limit, since_shortcode, since_date)
+            if posts is not None:
+                return posts
+            print("⚠️ No se encontraron posts en las respuestas JSON, leyendo el HTML")
 
-            # Usar user agent real
-            context = browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080}
-            )
+        return self._get_recent_posts_dom(limit, since_shortcode)
 
-            page = context.new_page()
+    def _get_recent_posts_network(self, limit, since_shortcode=None, since_date=None, max_scrolls=5):
+        """
+        Lista los posts desde el JSON que carga la página del perfil
+
+        Lee el JSON embebido en el HTML y las respuestas XHR de la API; si
+        faltan posts hace scroll para que la página pida la siguiente tanda.
 
+        Returns:
+            Lista de posts (más nuevo primero), o None si no se encontró ninguno
+        """
+        responses = []
+
+        def on_response(response):
+            if response.request.resource_type in ('xhr', 'fetch') and _API_URL.search(response.url):
+                responses.append(response)
+
+        found = OrderedDict()
+
+        def absorb(payloads):
+            for payload in payloads:
+                for post in extract_posts(payload):
+                    found.setdefault(post['shortcode'], post)
+
+        def enough():
+            if len(found) >= limit:
+                return True
+            for post in found.values():
+                if not post['is_pinned'] and self._reached(post, since_shortcode, since_date):
+                    return True
+            return False
+
+        stats = self._new_stats()
+        with self.pool.page() as page:
+            self._prepare_page(page, stats)
+            page.on('response', on_response)
             try:
                 print(f"🔍 Navegando a {self.profile_url}...")
-                page.goto(self.profile_url, wait_until='networkidle', timeout=30000)
-
-                # Esperar a que carguen los posts
-                time.sleep(3)
-
-                # Rechazar cookies si aparece el diálogo
+                page.goto(self.profile_url, wait_until='domcontentloaded', timeout=30000)
                 try:
-                    reject_button = page.locator('button:has-text("Decline optional cookies")').first
-                    if reject_button.is_visible(timeout=2000):
-                        reject_button.click()
-                        time.sleep(1)
-                except:
+                    page.wait_for_selector('a[href*="/p/"]', timeout=15000)
+                except PlaywrightTimeout:
                     pass
 
-                # Obtener posts desde el HTML
-                # Instagram carga posts iniciales en el HTML
-                posts = page.locator('article a[href*="/p/"]').all()[:max_posts]
+                # Posts renderizados en el servidor: JSON dentro del HTML
+                absorb(page.locator('script[type="application/json"]').all_text_contents())
 
-                print(f"✅ Encontrados {len(posts)} posts")
+                processed = 0
+                for _ in range(max_scrolls + 1):
+                    pending, processed = responses[processed:], len(responses)
+                    absorb(self._response_text(response) for response in pending)
+                    if enough():
+                        break
 
-                for index, post_link in enumerate(posts):
+                    # Scroll: la página pide la siguiente tanda a la API
                     try:
-                        href = post_link.get_attribute('href')
-
-                        # Extraer shortcode del href
-                        match = re.search(r'/p/([^/]+)/', href)
-                        if not match:
-                            continue
-
-                        shortcode = match.group(1)
-                        post_url = f"https://www.instagram.com/p/{shortcode}/"
-
-                        # Navegar al post para obtener más detalles
-                        print(f"📸 Obteniendo detalles del post {index+1}/{len(posts)}...")
-                        page.goto(post_url, wait_until='networkidle', timeout=15000)
-                        time.sleep(2)
-
-                        # Obtener caption
-                        caption = ""
-                        try:
-                            caption_elem = page.locator('h1').first
-                            if caption_elem.is_visible(timeout=2000):
-                                caption = caption_elem.inner_text()
-                        except:
-                            pass
-
-                        # Detectar si es video
-                        is_video = page.locator('video').count() > 0
-
-                        # Obtener URL de la imagen o video
-                        media_url = None
-                        if is_video:
-                            video_elem = page.locator('video').first
-                            media_url = video_elem.get_attribute('src')
-                        else:
-                            img_elem = page.locator('article img[src*="instagram"]').first
-                            media_url = img_elem.get_attribute('src')
-
-                        post_info = {
-                            'shortcode': shortcode,
-                            'url': post_url,
-                            'caption': caption,
-                            'date': datetime.now().isoformat(),
-                            'is_video': is_video,
-                            'media_url': media_url,
-                            'typename': 'video' if is_video else 'image'
-                        }
-
-                        posts_data.append(post_info)
-
-                        # Volver al perfil
-                        page.goto(self.profile_url, wait_until='networkidle')
-                        time.sleep(2)
+                        with page.expect_response(
+                            lambda r: _API_URL.search(r.url) is not None, timeout=10000
+                        ):
+                            page.mouse.wheel(0, 5000)
+                    except PlaywrightTimeout:
+                        break
 
-                    except Exception as e:
-                        print(f"⚠️ Error procesando post: {e}")
+            except Exception as e:
+                print(f"❌ Error general: {e}")
+
+        if not found:
+            return None
+
+        posts_data = []
+        for post in sorted(found.values(), key=lambda post: post['date'], reverse=True):
+            if len(posts_data) >= limit:
+                break
+            if self._reached(post, since_shortcode, since_date):
+                if post['is_pinned']:
+                    continue
+                break
+            posts_data.append(post)
+            self._remember(post)
+
+        print(f"✅ Encontrados {len(posts_data)} posts ({len(responses)} respuestas de la API, 1 página)")
+        self._report_stats(stats)
+        return posts_data
+
+    @staticmethod
+    def _reached(post, since_shortcode, since_date):
+        """El post es el último ya procesado o uno anterior"""
+        if post['shortcode'] == since_shortcode:
+            return True
+        return since_date is not None and datetime.fromisoformat(post['date']) <= since_date
+
+    @staticmethod
+    def _response_text(response):
+        try:
+            return response.text()
+        except Exception:
+            return ""
+
+    def _remember(self, post):
+        self._listed.pop(post['shortcode'], None)
+        self._listed[post['shortcode']] = (time.monotonic(), post)
+        while len(self._listed) > _LISTED_MAX_ITEMS:
+            self._listed.popitem(last=False)
+
+    def _pop_listed(self, shortcode):
+        """Post del último listado (con URLs de su media) si sigue vigente"""
+        listed_at, post = self._listed.pop(shortcode, (0, None))
+        if post is None or time.monotonic() - listed_at > _LISTED_TTL_SECS:
+            return None
+        return post
+
+    def _get_recent_posts_dom(self, limit, since_shortcode=None):
+        """
+        Lista los posts leyendo el HTML: los links del perfil y luego los
+        detalles de cada post, con detail_pages páginas cargando a la vez
+        """
+        stats = self._new_stats()
+        shortcodes = []
+
+        with self.pool.page() as page:
+            self._prepare_page(page, stats)
+            try:
+                print(f"🔍 Navegando a {self.profile_url}...")
+                page.goto(self.profile_url, wait_until='domcontentloaded', timeout=30000)
+                page.wait_for_selector('article a[href*="/p/"]', timeout=15000)
+                self._dismiss_cookies(page)
+
+                for post_link in page.locator('article a[href*="/p/"]').all()[:limit]:
+                    match = re.search(r'/p/([^/]+)/', post_link.get_attribute('href') or '')
+                    if not match:
                         continue
+                    # Alcanzamos el último post ya procesado: no hay más nuevos
+                    if match.group(1) == since_shortcode:
+                        break
+                    shortcodes.append(match.group(1))
+
+                print(f"✅ Encontrados {len(shortcodes)} posts")
 
             except Exception as e:
                 print(f"❌ Error general: {e}")
+                return []
+
+        posts_data = self._get_post_details(shortcodes, stats)
+        self._report_stats(stats)
+        return posts_data
+
+    def _get_post_details(self, shortcodes, stats):
+        """Abre los posts de a detail_pages en paralelo dentro del mismo contexto"""
+        posts_data = []
+
+        with ExitStack() as stack:
+            pages = [stack.enter_context(self.pool.page())
+                     for _ in range(min(self.detail_pages, len(shortcodes)))]
+            for page in pages:
+                self._prepare_page(page, stats)
 
-            finally:
-                browser.close()
+            for batch_start in range(0, len(shortcodes), len(pages) or 1):
+                batch = list(zip(pages, shortcodes[batch_start:batch_start + len(pages)]))
+
+                # Lanzar todas las navegaciones: goto vuelve al recibir la respuesta
+                # y el navegador sigue cargando las páginas en paralelo
+                started = {}
+                for page, shortcode in batch:
+                    started[shortcode] = time.perf_counter()
+                    try:
+                        page.goto(f"https://www.instagram.com/p/{shortcode}/", wait_until='commit', timeout=15000)
+                    except Exception as e:
+                        print(f"⚠️ Error abriendo post {shortcode}: {e}")
+                        started.pop(shortcode)
+
+                for page, shortcode in batch:
+                    if shortcode not in started:
+                        continue
+                    try:
+                        post_info = self._read_post_page(page, shortcode)
+                    except Exception as e:
+                        print(f"⚠️ Error procesando post {shortcode}: {e}")
+                        continue
+                    stats['latencies'].append(time.perf_counter() - started[shortcode])
+                    posts_data.append(post_info)
 
         return posts_data
 
-    def download_media(self, media_url, shortcode, is_video=False):
+    def _read_post_page(self, page, shortcode):
+        """Lee caption y media de la página de un post (espera a que aparezca la media)"""
+        page.wait_for_selector('article img[src*="instagram"], article video, main video', timeout=15000)
+
+        # Obtener caption
+        caption = ""
+        try:
+            caption = page.locator('h1').first.inner_text(timeout=2000)
+        except Exception:
+            pass
+
+        # Obtener URL de la imagen o video
+        is_video = page.locator('video').count() > 0
+        if is_video:
+            media_url = page.locator('video').first.get_attribute('src')
+        else:
+            media_url = page.locator('article img[src*="instagram"]').first.get_attribute('src')
+
+        return {
+            'shortcode': shortcode,
+            'url': f"https://www.instagram.com/p/{shortcode}/",
+            'caption': caption,
+            'date': datetime.now().isoformat(),
+            'is_video': is_video,
+            'media_url': media_url,
+            'typename': 'video' if is_video else 'image'
+        }
+
+    @staticmethod
+    def _new_stats():
+        return {'blocked': {}, 'bytes': 0, 'latencies': []}
+
+    def _prepare_page(self, page, stats):
+        """Bloquea los recursos pesados y cuenta los bytes recibidos"""
+        def on_response(response):
+            length = response.headers.get('content-length')
+            if length and length.isdigit():
+                stats['bytes'] += int(length)
+
+        def route(route):
+            request = route.request
+            if request.resource_type in BLOCKED_RESOURCE_TYPES or _TRACKING_URL.search(request.url):
+                stats['blocked'][request.resource_type] = stats['blocked'].get(request.resource_type, 0) + 1
+                route.abort()
+            else:
+                route.continue_()
+
+        page.on('response', on_response)
+        if self.block_resources:
+            page.route('**/*', route)
+
+    def _dismiss_cookies(self, page):
+        """
+        Rechaza las cookies si el diálogo está a la vista (sin esperar a que
+        aparezca) y guarda la decisión para las próximas ejecuciones
+        """
+        try:
+            button = page.locator('button:has-text("Decline optional cookies"), button:has-text("Decline")').first
+            if button.is_visible():
+                button.click(timeout=2000)
+                self.pool.save_state()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _report_stats(stats):
+        latencies = sorted(stats['latencies'])
+        blocked = ', '.join(f"{kind}={count}" for kind, count in sorted(stats['blocked'].items()))
+        line = f"📶 {stats['bytes'] / 1024:.0f} KB recibidos"
+        if blocked:
+            line += f", bloqueados: {blocked}"
+        if latencies:
+            line += (f" | por post: p50 {latencies[len(latencies) // 2]:.2f} s, "
+                     f"máx {latencies[-1]:.2f} s ({len(latencies)} posts)")
+        print(line)
+
+    def download_media(self, media_url, shortcode, is_video=False, index=None):
         """
         Descarga imagen o video desde URL
 
@@ -146,6 +368,7 @@ class InstagramScraperPlaywright:
             media_url: URL del archivo
             shortcode: Código del post
             is_video: Si es video o imagen
+            index: Posición en el carrusel (para no pisar archivos del mismo post)
 
         Returns:
             Ruta del archivo descargado
@@ -157,22 +380,16 @@ class InstagramScraperPlaywright:
 
             # Determinar extensión
             extension = '.mp4' if is_video else '.jpg'
-            filename = f"{shortcode}{extension}"
+            suffix = f"_{index}" if index is not None else ""
+            filename = f"{shortcode}{suffix}{extension}"
             filepath = post_folder / filename
 
             # Descargar
             print(f"📥 Descargando {filename}...")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(media_url, headers=headers, stream=True)
-            response.raise_for_status()
-
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            result = self.downloader.download(media_url, filepath)
 
-            print(f"✅ Descargado: {filepath}")
+            resumed = f", reanudado desde {result['resumed_from'] / 1024:.0f} KB" if result['resumed_from'] else ""
+            print(f"✅ Descargado: {filepath} ({result['bytes'] / 1024:.0f} KB{resumed})")
             return str(filepath)
 
         except Exception as e:
@@ -189,25 +406,30 @@ class InstagramScraperPlaywright:
         Returns:
             Dict con información y archivos descargados
         """
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=self.headless)
-            context = browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            )
-            page = context.new_page()
+        post_folder = self.download_folder / shortcode
+        manifest = read_manifest(post_folder)
+        if manifest:
+            print(f"♻️  Post {shortcode} ya descargado")
+            return manifest_to_downloaded(manifest)
+
+        # Listado desde la API: ya se conocen las URLs, no hace falta abrir el post
+        listed = self._pop_listed(shortcode)
+        if listed and listed['media']:
+            downloaded_files = self._download_listed(listed)
+            if downloaded_files:
+                return downloaded_files
 
+        with self.pool.page() as page:
+            self._prepare_page(page, self._new_stats())
             try:
                 post_url = f"https://www.instagram.com/p/{shortcode}/"
                 print(f"🌐 Abriendo post: {post_url}")
 
-                page.goto(post_url, wait_until='networkidle', timeout=30000)
-                time.sleep(3)
+                page.goto(post_url, wait_until='domcontentloaded', timeout=30000)
+                page.wait_for_selector('article img[src*="instagram"], article video, main video', timeout=15000)
 
                 # Rechazar cookies
-                try:
-                    page.locator('button:has-text("Decline")').first.click(timeout=2000)
-                except:
-                    pass
+                self._dismiss_cookies(page)
 
                 # Caption
                 caption = ""
@@ -235,26 +457,58 @@ class InstagramScraperPlaywright:
                 else:
                     # Descargar imagen(es)
                     images = page.locator('article img[src*="instagram"]').all()
-                    for img in images[:5]:  # Máximo 5 imágenes
+                    for index, img in enumerate(images[:5], 1):  # Máximo 5 imágenes
                         img_url = img.get_attribute('src')
-                        filepath = self.download_media(img_url, shortcode, is_video=False)
+                        filepath = self.download_media(img_url, shortcode, is_video=False, index=index)
                         if filepath:
                             downloaded_files['images'].append(filepath)
 
+                write_manifest(post_folder, shortcode, caption, post_url, scan_post_folder(post_folder))
+
                 return downloaded_files
 
             except Exception as e:
                 print(f"❌ Error: {e}")
                 return None
 
-            finally:
-                browser.close()
+    def _download_listed(self, post):
+        """Descarga la media de un post listado desde la API (None si falla todo)"""
+        shortcode = post['shortcode']
+        media = post['media']
+        downloaded_files = {
+            'images': [],
+            'videos': [],
+            'caption': post['caption'],
+            'url': post['url']
+        }
+
+        for index, item in enumerate(media, 1):
+            filepath = self.download_media(item['url'], shortcode, is_video=item['is_video'],
+                                           index=index if len(media) > 1 else None)
+            if filepath:
+                downloaded_files['videos' if item['is_video'] else 'images'].append(filepath)
+
+        if not downloaded_files['images'] and not downloaded_files['videos']:
+            return None
+
+        post_folder = self.download_folder / shortcode
+        write_manifest(post_folder, shortcode, post['caption'], post['url'], scan_post_folder(post_folder))
+        return downloaded_files
 
     def get_latest_post(self):
         """Obtiene el post más reciente"""
         posts = self.get_recent_posts(max_posts=1)
         return posts[0] if posts else None
 
+    def release(self):
+        """Cierra el navegador del thread actual (al terminar un thread worker)"""
+        self.pool.release()
+
+    def close(self):
+        """Cierra los navegadores del pool (de todos los threads) y la sesión de descargas"""
+        self.pool.close()
+        self.downloader.close()
+
 
 # Prueba del módulo
 if __name__ == "__main__":
@@ -280,3 +534,5 @@ if __name__ == "__main__":
             print(f"\n✅ Archivos descargados:")
             print(f"   Imágenes: {files['images']}")
             print(f"   Videos: {files['videos']}")
+
+    scraper.close()
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+Cola persistente de posts por publicar (SQLite)
+Cada post detectado se guarda como un job con su estado:
+
+    detected → downloaded → uploaded → tweeted
+                                     ↘ failed (tras JOB_MAX_ATTEMPTS errores)
+
+Cada etapa completada se confirma en la base antes de pasar a la siguiente,
+así que tras un crash el job continúa desde la última etapa terminada.
+Los jobs se reclaman en una transacción (BEGIN IMMEDIATE) con un lease:
+dos procesos nunca trabajan el mismo post a la vez, y si uno muere sus
+jobs quedan libres cuando vence el lease.
+
+Un límite de Twitter (429 o el rate limiter) no gasta intentos: el job se
+suelta en su etapa y se retoma en la próxima revisión.
+
+Antes de tuitear se marca el intento (tweet_started_at). Si el proceso
+muere entre el tweet y su registro, al reanudar se busca el tweet en la
+cuenta en lugar de publicarlo de nuevo.
+"""
+import json
+import os
+import socket
+import threading
+import time
+
+import storage
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DETECTED = 'detected'
+DOWNLOADED = 'downloaded'
+UPLOADED = 'uploaded'
+TWEETED = 'tweeted'
+FAILED = 'failed'
+
+# Estados en los que el job ya no se procesa
+FINAL_STATES = (TWEETED, FAILED)
+
+# Twitter descarta los media_ids a las 24 h: más viejos se vuelven a subir
+MEDIA_IDS_MAX_AGE_SECS = 23 * 3600
+
+
+def _pid_alive(pid):
+    """El proceso existe (si no se puede saber, se asume que sí)"""
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == 'posix':
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+    return True
+
+
+class LeaseLostError(Exception):
+    """Otro worker tomó el job (el lease de este venció)"""
+    pass
+
+
+class JobQueue:
+    def __init__(self, db_path=None, namespace='', lease_secs=600, max_attempts=3):
+        """
+        Args:
+            db_path: Ruta a la base de datos (usa data/analytics.db si no se especifica)
+            namespace: Perfil dueño de los jobs ('' en modo de un solo perfil)
+            lease_secs: Duración del lease; se renueva en cada etapa completada
+            max_attempts: Errores antes de marcar el job como failed
+        """
+        self.conn = storage.connect(db_path)
+        self.namespace = namespace
+        self.lease_secs = lease_secs
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+
+        self.host = socket.gethostname()
+        self.owner = f"{self.host}:{os.getpid()}"
+
+        # Misma idea que la columna status del modelo Post del dashboard
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS post_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                perfil TEXT NOT NULL DEFAULT '',
+                shortcode TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'detected',
+                post TEXT NOT NULL,
+                post_date TEXT NOT NULL,
+                downloaded TEXT,
+                media_files TEXT,
+                media_ids TEXT,
+                uploaded_at REAL,
+                tweet_started_at REAL,
+                tweet_id TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (perfil, shortcode)
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_post_jobs_perfil_status ON post_jobs (perfil, status, post_date)"
+        )
+
+    def enqueue(self, posts):
+        """
+        Registra posts detectados (los que ya tienen job se ignoran)
+
+        Returns:
+            Cantidad de jobs nuevos
+        """
+        now = time.time()
+        rows = [
+            (self.namespace, post['shortcode'], json.dumps(post, ensure_ascii=False), post['date'], now, now)
+            for post in posts
+        ]
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                """
+                INSERT OR IGNORE INTO post_jobs (perfil, shortcode, post, post_date, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+            return self.conn.total_changes - before
+
+    def claim(self, limit=None):
+        """
+        Toma los jobs pendientes del perfil (más viejo primero)
+
+        Solo se toman jobs sin lease, con lease vencido, o cuyo dueño era un
+        proceso de este equipo que ya no existe (reinicio del bot).
+
+        Returns:
+            Lista de jobs (dicts) con lease a nombre de este proceso
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.execute(
+                    f"""
+                    SELECT * FROM post_jobs
+                    WHERE perfil = ? AND status NOT IN ({', '.join('?' * len(FINAL_STATES))})
+                    ORDER BY post_date, id
+                    """,
+                    (self.namespace, *FINAL_STATES)
+                )
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchall()
+
+                claimed = []
+                for row in rows:
+                    job = dict(zip(columns, row))
+                    if not self._claimable(job, now):
+                        continue
+                    self.conn.execute(
+                        "UPDATE post_jobs SET lease_owner = ?, lease_expires = ? WHERE id = ?",
+                        (self.owner, now + self.lease_secs, job['id'])
+                    )
+                    claimed.append(self._decode(job))
+                    if limit and len(claimed) >= limit:
+                        break
+
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        return claimed
+
+    def _claimable(self, job, now):
+        owner = job['lease_owner']
+        if owner is None or owner == self.owner or job['lease_expires'] < now:
+            return True
+
+        # Lease de un proceso de este equipo que murió sin liberarlo
+        host, _, pid = owner.rpartition(':')
+        return host == self.host and pid.isdigit() and not _pid_alive(int(pid))
+
+    def _decode(self, job):
+        job['post'] = json.loads(job['post'])
+        for field in ('downloaded', 'media_files', 'media_ids'):
+            job[field] = json.loads(job[field]) if job[field] else None
+
+        # Media ids a punto de expirar: se repite la subida
+        if job['status'] == UPLOADED and not job['tweet_started_at']:
+            if time.time() - (job['uploaded_at'] or 0) > MEDIA_IDS_MAX_AGE_SECS:
+                job['media_ids'] = None
+        return job
+
+    def _update(self, shortcode, fields, release=False):
+        """Actualiza un job propio; LeaseLostError si otro worker lo tomó"""
+        now = time.time()
+        fields = dict(fields, updated_at=now)
+        if release:
+            fields.update(lease_owner=None, lease_expires=None)
+        else:
+            fields['lease_expires'] = now + self.lease_secs
+
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self._lock:
+            cursor = self.conn.execute(
+                f"""
+                UPDATE post_jobs SET {assignments}
+                WHERE perfil = ? AND shortcode = ? AND lease_owner = ?
+                """,
+                (*fields.values(), self.namespace, shortcode, self.owner)
+            )
+        if cursor.rowcount == 0:
+            raise LeaseLostError(f"El job {shortcode} ya no pertenece a este proceso")
+
+    def mark_downloaded(self, shortcode, downloaded, media_files):
+        self._update(shortcode, {
+            'status': DOWNLOADED,
+            'downloaded': json.dumps(downloaded, ensure_ascii=False),
+            'media_files': json.dumps(media_files, ensure_ascii=False),
+            'error': None,
+        })
+
+    def mark_uploaded(self, shortcode, media_ids):
+        self._update(shortcode, {
+            'status': UPLOADED,
+            'media_ids': json.dumps(media_ids),
+            'uploaded_at': time.time(),
+            'error': None,
+        })
+
+    def mark_tweet_started(self, shortcode):
+        """Registra el intento de tweet; lanza LeaseLostError si no se debe tuitear"""
+        self._update(shortcode, {'tweet_started_at': time.time()})
+
+    def mark_tweeted(self, shortcode, tweet_id):
+        self._update(shortcode, {'status': TWEETED, 'tweet_id': str(tweet_id), 'error': None}, release=True)
+
+    def mark_error(self, shortcode, error, tweet_failed=False):
+        """
+        Registra un error; el job se reintenta desde su última etapa
+        completada hasta max_attempts veces, después queda en failed
+
+        Args:
+            tweet_failed: El tweet se rechazó con certeza (se puede reintentar)
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT attempts FROM post_jobs WHERE perfil = ? AND shortcode = ?",
+                (self.namespace, shortcode)
+            ).fetchone()
+        attempts = (row[0] if row else 0) + 1
+
+        fields = {'error': str(error), 'attempts': attempts}
+        if tweet_failed:
+            fields['tweet_started_at'] = None
+        if attempts >= self.max_attempts:
+            fields['status'] = FAILED
+        self._update(shortcode, fields, release=True)
+
+    def mark_failed(self, shortcode, error):
+        """Deja el job en failed sin más reintentos (el post no se puede publicar)"""
+        self._update(shortcode, {'status': FAILED, 'error': str(error)}, release=True)
+
+    def mark_rate_limited(self, shortcode, error, tweet_failed=False):
+        """
+        Registra un límite de Twitter: el job se suelta sin gastar un intento
+        y se retoma desde su última etapa completada en la próxima revisión
+
+        Args:
+            tweet_failed: El límite frenó el tweet (no se publicó)
+        """
+        fields = {'error': str(error)}
+        if tweet_failed:
+            fields['tweet_started_at'] = None
+        self._update(shortcode, fields, release=True)
+
+    def release(self):
+        """Libera los leases de este proceso (jobs que quedaron a medias)"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE post_jobs SET lease_owner = NULL, lease_expires = NULL WHERE perfil = ? AND lease_owner = ?",
+                (self.namespace, self.owner)
+            )
+
+    def get(self, shortcode):
+        """Job de un post, o None"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT * FROM post_jobs WHERE perfil = ? AND shortcode = ?", (self.namespace, shortcode)
+            )
+            row = cursor.fetchone()
+            columns = [column[0] for column in cursor.description]
+        return self._decode(dict(zip(columns, row))) if row else None
+
+    def status(self, shortcode):
+        """Estado del job de un post, o None si nunca se detectó"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status FROM post_jobs WHERE perfil = ? AND shortcode = ?", (self.namespace, shortcode)
+            ).fetchone()
+        return row[0] if row else None
+
+    def counts(self):
+        """Cantidad de jobs del perfil por estado"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) FROM post_jobs WHERE perfil = ? GROUP BY status", (self.namespace,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
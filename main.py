@@ -11,47 +11,179 @@ import sys
 
 # Importar módulos
 from instagram_scraper import InstagramScraper  # Usando Instaloader (más confiable)
-from twitter_poster import TwitterPoster
+from twitter_poster import TwitterPoster, TweetFailedError
+from historial_store import open_historial
+from pipeline import PostPipeline
+from media_cache import MediaCache
+from profile_cache import ProfileIdCache
+from media_preprocess import MediaPreprocessor
+from scheduler import PollScheduler
+from rate_limiter import get_rate_limiter
+from job_queue import JobQueue, LeaseLostError, DETECTED, FAILED
+from metrics import get_metrics
 import config
 
+def create_pipeline():
+    """Crea el pipeline descarga → subida → tweet según config.py"""
+    return PostPipeline(
+        download_workers=getattr(config, 'PIPELINE_DOWNLOAD_WORKERS', 1),
+        upload_workers=getattr(config, 'PIPELINE_UPLOAD_WORKERS', 2),
+        queue_size=getattr(config, 'PIPELINE_QUEUE_SIZE', 4),
+        tweet_delay=getattr(config, 'TWEET_DELAY', 5),
+        preprocessor=create_preprocessor()
+    )
+
+
+def create_preprocessor():
+    """Crea el optimizador de imágenes según config.py (None si está desactivado)"""
+    if not getattr(config, 'IMAGE_PREPROCESS_ENABLED', True):
+        return None
+    return MediaPreprocessor(
+        cache_folder=Path(config.MEDIA_FOLDER) / '.optimizadas',
+        max_side=getattr(config, 'IMAGE_MAX_SIDE', 2048),
+        quality=getattr(config, 'IMAGE_JPEG_QUALITY', 85),
+        workers=getattr(config, 'IMAGE_PREPROCESS_WORKERS', 2)
+    )
+
+
+def create_media_cache():
+    """Crea la caché de media_ids según config.py (None si está desactivada)"""
+    if not getattr(config, 'MEDIA_CACHE_ENABLED', True):
+        return None
+    return MediaCache(getattr(config, 'HISTORIAL_DB', None))
+
+
+def create_profile_cache():
+    """Crea la caché de ids de perfiles según config.py (None si está desactivada)"""
+    ttl_hours = getattr(config, 'PROFILE_ID_CACHE_TTL_HOURS', 168)
+    if not ttl_hours:
+        return None
+    return ProfileIdCache(getattr(config, 'HISTORIAL_DB', None), ttl_secs=ttl_hours * 3600)
+
+
+def create_dashboard_writer():
+    """
+    Crea el BatchWriter que copia los posts publicados a la tabla posts del
+    dashboard (None si está desactivado o falta SQLAlchemy)
+    """
+    if not getattr(config, 'DASHBOARD_SYNC_ENABLED', True):
+        return None
+    try:
+        from dashboard.models.database import Base, DB_PATH, engine, create_sqlite_engine
+        from dashboard.services.batch_writer import BatchWriter
+    except ImportError as e:
+        print(f"⚠️ Dashboard no disponible, los posts no se copian a su base: {e}")
+        return None
+
+    # El engine de escritura del dashboard, salvo que HISTORIAL_DB apunte a otra base
+    db_path = Path(getattr(config, 'HISTORIAL_DB', None) or DB_PATH)
+    if db_path.resolve() != DB_PATH.resolve():
+        engine = create_sqlite_engine(db_path)
+        Base.metadata.create_all(engine)
+    return BatchWriter(engine)
+
+
+def setup_metrics():
+    """Activa la exportación de métricas según config.py (una vez por proceso)"""
+    get_metrics().configure(
+        jsonl_path=getattr(config, 'METRICS_JSONL', Path(__file__).parent / 'data' / 'metrics.jsonl'),
+        port=getattr(config, 'METRICS_PORT', 9108),
+        host=getattr(config, 'METRICS_HOST', '127.0.0.1')
+    )
+
+
+def create_scheduler(bots, interval_minutes):
+    """Crea el planificador de consultas según config.py"""
+    return PollScheduler(
+        bots,
+        interval_minutes=interval_minutes,
+        budget_per_hour=getattr(config, 'POLL_BUDGET_PER_HOUR', None),
+        min_minutes=getattr(config, 'MIN_POLL_MINUTES', 2),
+        max_minutes=getattr(config, 'MAX_POLL_MINUTES', 120),
+        adaptive=getattr(config, 'ADAPTIVE_POLLING', True)
+    )
+
+
 class InstagramTwitterBot:
-    def __init__(self):
-        """Inicializa el bot con la configuración"""
+    def __init__(self, instagram_username=None, ig_scraper=None, twitter=None,
+                 pipeline=None, historial_namespace='', dashboard_writer=None):
+        """
+        Inicializa el bot con la configuración
+
+        Los argumentos opcionales permiten compartir recursos entre varios
+        bots (modo multi-perfil); si no se pasan se crean desde config.py.
+
+        Args:
+            instagram_username: Perfil a monitorear (default: config.INSTAGRAM_USERNAME)
+            ig_scraper: Scraper de Instagram ya creado
+            twitter: TwitterPoster ya creado
+            pipeline: PostPipeline compartido
+            historial_namespace: Namespace del historial ('' en modo de un solo perfil)
+            dashboard_writer: BatchWriter compartido hacia la base del dashboard
+        """
         print("🤖 Inicializando bot Instagram → Twitter")
         print("=" * 50)
 
+        self.instagram_username = instagram_username or config.INSTAGRAM_USERNAME
+        self.historial_namespace = historial_namespace
+
+        # Spans por etapa → data/metrics.jsonl y endpoint Prometheus
+        self.metrics = get_metrics()
+        setup_metrics()
+
         # Inicializar scraper de Instagram
-        self.ig_scraper = InstagramScraper(
-            username=config.INSTAGRAM_USERNAME,
-            download_folder=str(config.MEDIA_FOLDER)
+        self.ig_scraper = ig_scraper or InstagramScraper(
+            username=self.instagram_username,
+            download_folder=str(config.MEDIA_FOLDER),
+            profile_cache=create_profile_cache()
         )
 
         # Inicializar poster de Twitter
-        self.twitter = TwitterPoster(
+        self.twitter = twitter or TwitterPoster(
             api_key=config.TWITTER_API_KEY,
             api_secret=config.TWITTER_API_SECRET,
             access_token=config.TWITTER_ACCESS_TOKEN,
             access_secret=config.TWITTER_ACCESS_SECRET,
-            bearer_token=config.TWITTER_BEARER_TOKEN
+            bearer_token=config.TWITTER_BEARER_TOKEN,
+            max_parallel_uploads=getattr(config, 'TWITTER_MAX_PARALLEL_UPLOADS', 4),
+            video_chunk_mb=getattr(config, 'TWITTER_VIDEO_CHUNK_MB', 4),
+            media_cache=create_media_cache(),
+            rate_limiter=get_rate_limiter(getattr(config, 'TWITTER_RATE_LIMITS', None)),
+            max_rate_limit_wait=getattr(config, 'TWITTER_MAX_RATE_LIMIT_WAIT', 60)
         )
 
+        # Pipeline descarga → subida → tweet
+        self.pipeline = pipeline or create_pipeline()
+
         # Cargar historial
         self.historial_file = config.HISTORIAL_FILE
         self.historial = self.load_historial()
 
+        # Posts publicados → tabla posts del dashboard, en lotes
+        self.dashboard_writer = dashboard_writer or create_dashboard_writer()
+
+        # Cola persistente: cada post detectado avanza por etapas registradas
+        self.jobs = JobQueue(
+            getattr(config, 'HISTORIAL_DB', None),
+            namespace=self.historial_namespace,
+            lease_secs=getattr(config, 'JOB_LEASE_SECS', 600),
+            max_attempts=getattr(config, 'JOB_MAX_ATTEMPTS', 3)
+        )
+
         print("✅ Bot inicializado correctamente\n")
 
     def load_historial(self):
         """Carga el historial de posts ya procesados"""
-        if self.historial_file.exists():
-            with open(self.historial_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+        return open_historial(
+            backend=getattr(config, 'HISTORIAL_BACKEND', 'sqlite'),
+            json_path=self.historial_file,
+            db_path=getattr(config, 'HISTORIAL_DB', None),
+            namespace=self.historial_namespace
+        )
 
     def save_historial(self):
-        """Guarda el historial de posts"""
-        with open(self.historial_file, 'w', encoding='utf-8') as f:
-            json.dump(self.historial, f, indent=2, ensure_ascii=False)
+        """Guarda el historial de posts (no-op con SQLite: cada insert ya se confirmó)"""
+        self.historial.save()
 
     def format_caption(self, caption, instagram_url):
         """
@@ -84,25 +216,216 @@ class InstagramTwitterBot:
 
         return text
 
+    def publish_post(self, job):
+        """
+        Publica en Twitter un post que ya pasó por descarga y subida
+
+        Args:
+            job: PostJob del pipeline (llamado en orden cronológico)
+        """
+        with self.metrics.bind(profile=self.instagram_username, shortcode=job.shortcode):
+            self._publish_post(job)
+
+    def _publish_post(self, job):
+        post = job.post
+        shortcode = job.shortcode
+
+        if job.error:
+            print(f"❌ {job.error}")
+            self.metrics.inc('bot_posts_total', profile=self.instagram_username, outcome='error')
+            if job.rate_limited:
+                self._job_rate_limited(shortcode, job.error)
+            elif job.rejected:
+                self._job_failed(shortcode, job.error)
+            else:
+                self._job_error(shortcode, job.error)
+            return
+
+        # Tweet registrado justo antes de un crash: solo falta cerrar el job
+        if shortcode in self.historial:
+            self._job_tweeted(shortcode, self.historial[shortcode]['tweet_id'])
+            return
+
+        # Formatear caption
+        tweet_text = self.format_caption(
+            job.downloaded['caption'],
+            post['url']
+        )
+
+        # El proceso murió tras intentar tuitear: buscar el tweet antes de repetirlo
+        if job.record and job.record['tweet_started_at']:
+            print(f"🔎 Verificando si el post {shortcode} ya se había publicado...")
+            try:
+                tweet_id = self.twitter.find_recent_tweet(tweet_text)
+            except Exception as e:
+                print(f"⚠️ No se pudo verificar ({e}); se reintenta en la próxima revisión")
+                return
+
+            if tweet_id:
+                print(f"♻️  Ya estaba publicado: https://twitter.com/i/web/status/{tweet_id}")
+                self._record_tweet(job, tweet_id)
+                return
+
+        # Publicar en Twitter
+        print(f"\n🐦 Publicando en Twitter...")
+        if job.media_files and not job.media_ids:
+            print("⚠️ No se pudo subir ningún archivo, publicando solo texto")
+
+        try:
+            self.jobs.mark_tweet_started(shortcode)
+        except LeaseLostError as e:
+            print(f"⚠️ {e}")
+            return
+
+        try:
+            tweet_id = self.twitter.create_tweet(
+                text=tweet_text,
+                media_ids=job.media_ids or None,
+                raise_errors=True
+            )
+        except TweetFailedError as e:
+            print(f"❌ Error publicando en Twitter")
+            self.metrics.inc('bot_posts_total', profile=self.instagram_username, outcome='error')
+            if not e.rejected:
+                # tweet_started_at queda marcado: el reintento busca el tweet antes de publicar
+                print("⚠️ No se sabe si el tweet se creó; se verificará antes de reintentar")
+            if e.rate_limited:
+                self._job_rate_limited(shortcode, f"Error publicando en Twitter: {e}", tweet_failed=True)
+            else:
+                self._job_error(shortcode, f"Error publicando en Twitter: {e}", tweet_failed=e.rejected)
+            return
+
+        self._record_tweet(job, tweet_id)
+        self.metrics.inc('bot_posts_total', profile=self.instagram_username, outcome='published')
+
+        print(f"\n{'='*50}")
+        print(f"✅ POST PUBLICADO EXITOSAMENTE")
+        print(f"{'='*50}")
+        print(f"Instagram: {post['url']}")
+        print(f"Twitter: https://twitter.com/i/web/status/{tweet_id}")
+        print(f"{'='*50}\n")
+
+    def _record_tweet(self, job, tweet_id):
+        """Guarda el tweet en el historial y cierra el job"""
+        post = job.post
+
+        # Primero el historial: si el proceso muere antes de cerrar el job,
+        # al retomarlo se ve que ya estaba publicado
+        self.historial[job.shortcode] = {
+            'fecha_procesado': datetime.now().isoformat(),
+            'instagram_url': post['url'],
+            'tweet_id': tweet_id,
+            'tweet_url': f"https://twitter.com/i/web/status/{tweet_id}",
+            'fecha_instagram': post['date'],
+            'caption': post['caption'][:200],
+            'tipo': 'video' if post['is_video'] else 'imagen',
+            'archivos_descargados': job.media_files
+        }
+        self.save_historial()
+        self._record_dashboard_post(job)
+        self._job_tweeted(job.shortcode, tweet_id)
+
+    def _record_dashboard_post(self, job):
+        """Encola el post para el dashboard (el BatchWriter lo escribe en su thread)"""
+        if not self.dashboard_writer:
+            return
+        post = job.post
+        try:
+            self.dashboard_writer.add_post({
+                'shortcode': job.shortcode,
+                'post_url': post['url'],
+                'caption': post['caption'][:500],
+                'post_type': 'video' if post['is_video'] else 'imagen',
+                'media_urls': json.dumps([str(path) for path in job.media_files or []]),
+                'created_at': datetime.fromisoformat(post['date']),
+                'processed_at': datetime.utcnow(),
+            })
+        except Exception as e:
+            print(f"⚠️ No se pudo encolar el post para el dashboard: {e}")
+
+    def _job_tweeted(self, shortcode, tweet_id):
+        try:
+            self.jobs.mark_tweeted(shortcode, tweet_id)
+        except LeaseLostError as e:
+            print(f"⚠️ {e}")
+
+    def _job_error(self, shortcode, error, tweet_failed=False):
+        try:
+            self.jobs.mark_error(shortcode, error, tweet_failed=tweet_failed)
+        except LeaseLostError as e:
+            print(f"⚠️ {e}")
+
+    def _job_failed(self, shortcode, error):
+        # Sin media válida no se publica (ni solo con texto) y no se reintenta
+        print(f"🚫 El post {shortcode} no se puede publicar en Twitter, queda descartado")
+        try:
+            self.jobs.mark_failed(shortcode, error)
+        except LeaseLostError as e:
+            print(f"⚠️ {e}")
+
+    def _job_rate_limited(self, shortcode, error, tweet_failed=False):
+        # Un límite de Twitter no hace inválido al post: no gasta intentos
+        print("⏳ Límite de Twitter: el post se reintenta en la próxima revisión")
+        try:
+            self.jobs.mark_rate_limited(shortcode, error, tweet_failed=tweet_failed)
+        except LeaseLostError as e:
+            print(f"⚠️ {e}")
+
+    def update_marca(self, posts):
+        """
+        Avanza la marca de agua hasta el último post (en orden cronológico)
+        tal que él y todos los anteriores están en el historial.
+        Un post que falló deja la marca antes que él para reintentarlo
+        (salvo que su job haya quedado en failed).
+
+        Args:
+            posts: Posts obtenidos en esta ejecución
+        """
+        marca = None
+
+        for post in sorted(posts, key=lambda post: post['date']):
+            # Un post fijado viejo no debe frenar la marca
+            if post.get('is_pinned'):
+                continue
+            # Un post que agotó sus reintentos tampoco
+            if post['shortcode'] not in self.historial and self.jobs.status(post['shortcode']) != FAILED:
+                break
+            marca = post
+
+        if marca:
+            self.historial.set_marca(marca['shortcode'], marca['date'])
+
     def process_new_posts(self):
         """
         Busca y procesa posts nuevos de Instagram
+
+        Returns:
+            Cantidad de posts nuevos encontrados
         """
+        with self.metrics.bind(profile=self.instagram_username):
+            with self.metrics.span('cycle') as span:
+                nuevos_posts = self._process_new_posts(span)
+                span.set(new_posts=nuevos_posts)
+                return nuevos_posts
+
+    def _process_new_posts(self, span):
         print(f"\n{'='*50}")
-        print(f"🔍 Buscando nuevos posts de @{config.INSTAGRAM_USERNAME}")
+        print(f"🔍 Buscando nuevos posts de @{self.instagram_username}")
         print(f"   Hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"{'='*50}\n")
 
         try:
-            # Obtener posts recientes
-            posts = self.ig_scraper.get_recent_posts(max_posts=config.MAX_POSTS_TO_CHECK)
-
-            if not posts:
-                print("ℹ️  No se encontraron posts nuevos")
-                return
-
-            # Procesar cada post
-            nuevos_posts = 0
+            # Obtener posts recientes (solo hasta la marca de agua si existe)
+            marca_shortcode, marca_fecha = self.historial.get_marca()
+            posts = self.ig_scraper.get_recent_posts(
+                max_posts=config.MAX_POSTS_TO_CHECK,
+                since_shortcode=marca_shortcode,
+                since_date=datetime.fromisoformat(marca_fecha) if marca_fecha else None,
+                max_lookback=getattr(config, 'MAX_POSTS_BACKFILL', 50)
+            )
+
+            # Filtrar los ya procesados
+            nuevos = []
 
             for post in posts:
                 shortcode = post['shortcode']
@@ -112,7 +435,16 @@ class InstagramTwitterBot:
                     print(f"⏭️  Post {shortcode} ya procesado anteriormente")
                     continue
 
-                nuevos_posts += 1
+                status = self.jobs.status(shortcode)
+                if status == FAILED:
+                    print(f"⏭️  Post {shortcode} descartado tras varios intentos fallidos")
+                    continue
+
+                # Los que ya tienen job se retoman abajo desde su última etapa
+                if status is None:
+                    nuevos.append(post)
+
+            for post in sorted(nuevos, key=lambda post: post['date']):
                 print(f"\n{'─'*50}")
                 print(f"📸 NUEVO POST DETECTADO")
                 print(f"{'─'*50}")
@@ -120,72 +452,54 @@ class InstagramTwitterBot:
                 print(f"Caption: {post['caption'][:100]}...")
                 print(f"Tipo: {'Video' if post['is_video'] else 'Imagen'}")
 
-                # Descargar el post
-                print(f"\n📥 Descargando contenido...")
-                downloaded = self.ig_scraper.download_post(shortcode)
-
-                if not downloaded:
-                    print(f"❌ Error descargando post {shortcode}")
-                    continue
-
-                # Preparar archivos para Twitter
-                media_files = []
-
-                if downloaded['videos']:
-                    # Si hay video, solo subir el primero
-                    media_files = [downloaded['videos'][0]]
-                elif downloaded['images']:
-                    # Si hay imágenes, máximo 4
-                    media_files = downloaded['images'][:4]
-
-                # Formatear caption
-                tweet_text = self.format_caption(
-                    downloaded['caption'],
-                    post['url']
-                )
-
-                # Publicar en Twitter
-                print(f"\n🐦 Publicando en Twitter...")
-                tweet_id = self.twitter.post_with_media(
-                    text=tweet_text,
-                    media_files=media_files
+            # Registrar los nuevos y tomar todos los pendientes del perfil,
+            # incluidos los que quedaron a medias en una ejecución anterior
+            self.jobs.enqueue(nuevos)
+            pendientes = self.jobs.claim()
+
+            self.metrics.inc('bot_posts_detected_total', len(nuevos), profile=self.instagram_username)
+            self.metrics.set_gauge('bot_jobs_pending', len(pendientes), profile=self.instagram_username)
+
+            for job in pendientes:
+                if job['status'] != DETECTED or job['attempts']:
+                    print(f"⏯️  Retomando post {job['shortcode']} (etapa: {job['status']})")
+
+            # Descarga, subida y tweet en paralelo por etapas, en orden cronológico
+            try:
+                self.pipeline.run(
+                    self.ig_scraper, self.twitter,
+                    [job['post'] for job in pendientes],
+                    self.publish_post,
+                    job_queue=self.jobs
                 )
+            finally:
+                self.jobs.release()
+                if self.dashboard_writer:
+                    self.dashboard_writer.flush(timeout=10)
+            nuevos_posts = len(nuevos)
+
+            if posts:
+                self.update_marca(posts)
+            else:
+                print("ℹ️  No se encontraron posts nuevos")
 
-                if tweet_id:
-                    # Guardar en historial
-                    self.historial[shortcode] = {
-                        'fecha_procesado': datetime.now().isoformat(),
-                        'instagram_url': post['url'],
-                        'tweet_id': tweet_id,
-                        'tweet_url': f"https://twitter.com/i/web/status/{tweet_id}",
-                        'caption': post['caption'][:200],
-                        'tipo': 'video' if post['is_video'] else 'imagen',
-                        'archivos_descargados': media_files
-                    }
-                    self.save_historial()
-
-                    print(f"\n{'='*50}")
-                    print(f"✅ POST PUBLICADO EXITOSAMENTE")
-                    print(f"{'='*50}")
-                    print(f"Instagram: {post['url']}")
-                    print(f"Twitter: https://twitter.com/i/web/status/{tweet_id}")
-                    print(f"{'='*50}\n")
-
-                else:
-                    print(f"❌ Error publicando en Twitter")
-
-                # Delay entre posts para no saturar
-                time.sleep(5)
-
-            if nuevos_posts == 0:
+            if nuevos_posts == 0 and posts:
                 print("ℹ️  No hay posts nuevos para procesar")
             else:
                 print(f"\n✨ Procesados {nuevos_posts} posts nuevos")
 
+            return nuevos_posts
+
         except Exception as e:
             print(f"\n❌ Error durante el procesamiento: {e}")
+            span.fail(e)
             import traceback
             traceback.print_exc()
+            return 0
+
+    def verify_credentials(self):
+        """Verifica las credenciales de la cuenta de Twitter"""
+        return self.twitter.verify_credentials()
 
     def run_once(self):
         """Ejecuta el bot una sola vez"""
@@ -195,24 +509,20 @@ class InstagramTwitterBot:
         """
         Ejecuta el bot en loop continuo
 
+        Con ADAPTIVE_POLLING el intervalo se ajusta a los horarios en que
+        suele publicar el perfil (más seguido en horas activas).
+
         Args:
-            interval_minutes: Intervalo en minutos (usa config si no se especifica)
+            interval_minutes: Intervalo base en minutos (usa config si no se especifica)
         """
         interval = interval_minutes or config.CHECK_INTERVAL
 
         print(f"\n🔄 Bot en modo continuo")
-        print(f"⏱️  Verificando cada {interval} minutos")
+        print(f"⏱️  Verificando cada {interval} minutos (en promedio)")
         print(f"⌨️  Presiona Ctrl+C para detener\n")
 
         try:
-            while True:
-                self.process_new_posts()
-
-                print(f"\n⏳ Esperando {interval} minutos hasta la próxima verificación...")
-                print(f"   Próxima ejecución: {self._get_next_run_time(interval)}")
-                print(f"   (Presiona Ctrl+C para detener)\n")
-
-                time.sleep(interval * 60)
+            create_scheduler([self], interval).run()
 
         except KeyboardInterrupt:
             print(f"\n\n{'='*50}")
@@ -221,12 +531,6 @@ class InstagramTwitterBot:
             print(f"Posts procesados en esta sesión: {len(self.historial)}")
             print("¡Hasta luego! 👋\n")
 
-    def _get_next_run_time(self, minutes):
-        """Calcula la hora de la próxima ejecución"""
-        from datetime import datetime, timedelta
-        next_time = datetime.now() + timedelta(minutes=minutes)
-        return next_time.strftime('%H:%M:%S')
-
     def show_stats(self):
         """Muestra estadísticas del bot"""
         print(f"\n{'='*50}")
@@ -234,9 +538,13 @@ class InstagramTwitterBot:
         print(f"{'='*50}")
         print(f"Total de posts procesados: {len(self.historial)}")
 
+        jobs = self.jobs.counts()
+        if jobs:
+            print("Jobs por estado: " + ", ".join(f"{status}={count}" for status, count in sorted(jobs.items())))
+
         if self.historial:
             print(f"\nÚltimos 5 posts:")
-            for i, (shortcode, data) in enumerate(list(self.historial.items())[-5:], 1):
+            for i, (shortcode, data) in enumerate(self.historial.ultimos(5), 1):
                 print(f"\n{i}. Post {shortcode}")
                 print(f"   Fecha: {data['fecha_procesado']}")
                 print(f"   Instagram: {data['instagram_url']}")
@@ -247,20 +555,26 @@ class InstagramTwitterBot:
 
 def main():
     """Función principal"""
+    profiles = getattr(config, 'PROFILES', [])
+
     # Verificar configuración
-    if config.INSTAGRAM_USERNAME == "tu_usuario_instagram":
+    if not profiles and config.INSTAGRAM_USERNAME == "tu_usuario_instagram":
         print("❌ ERROR: Configura tu usuario de Instagram en config.py")
         return
 
-    if config.TWITTER_API_KEY == "tu_api_key":
+    if config.TWITTER_API_KEY == "tu_api_key" and not all(p.get('twitter') for p in profiles or [{}]):
         print("❌ ERROR: Configura tus credenciales de Twitter en config.py")
         return
 
-    # Crear bot
-    bot = InstagramTwitterBot()
+    # Crear bot (uno por perfil si hay varios configurados)
+    if profiles:
+        from multi_profile import MultiProfileBot
+        bot = MultiProfileBot(profiles)
+    else:
+        bot = InstagramTwitterBot()
 
     # Verificar credenciales de Twitter
-    if not bot.twitter.verify_credentials():
+    if not bot.verify_credentials():
         print("❌ ERROR: Credenciales de Twitter inválidas")
         return
 
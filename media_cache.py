@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de media_ids de Twitter por hash de contenido
+Un media_id se puede adjuntar a varios tweets mientras no expire (24 h).
+Si se vuelve a subir el mismo archivo (reintento de un post, o varios
+perfiles publicando la misma imagen en la misma cuenta) se reutiliza el
+media_id y no se envía ni un byte.
+"""
+import hashlib
+import threading
+import time
+
+import storage
+
+# No reutilizar un media_id que expira en menos de este margen
+EXPIRY_MARGIN_SECS = 600
+
+# Twitter no siempre informa la expiración; 24 h es el valor documentado
+DEFAULT_EXPIRES_AFTER_SECS = 86400
+
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    """SHA-256 del contenido de un archivo, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class MediaCache:
+    def __init__(self, db_path=None):
+        """
+        Args:
+            db_path: Ruta a la base de datos (usa data/analytics.db si no se especifica)
+        """
+        self.conn = storage.connect(db_path)
+        self._lock = threading.Lock()
+
+        # Los media_ids son de la cuenta que los subió: la clave incluye al dueño
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS media_cache (
+                owner TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                media_id TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (owner, sha256)
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_media_cache_expires_at ON media_cache (expires_at)"
+        )
+        self.evict_expired()
+
+    def get(self, owner, sha256):
+        """
+        Busca un media_id vigente
+
+        Args:
+            owner: Cuenta de Twitter dueña del media
+            sha256: Hash del contenido del archivo
+
+        Returns:
+            Media ID, o None si no hay uno vigente
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT media_id, expires_at FROM media_cache WHERE owner = ? AND sha256 = ?",
+                (owner, sha256)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            media_id, expires_at = row
+            if expires_at - EXPIRY_MARGIN_SECS <= time.time():
+                self.conn.execute(
+                    "DELETE FROM media_cache WHERE owner = ? AND sha256 = ?", (owner, sha256)
+                )
+                return None
+
+        return int(media_id)
+
+    def put(self, owner, sha256, media_id, size, expires_after_secs=None):
+        """
+        Guarda el media_id de un archivo recién subido
+
+        Args:
+            owner: Cuenta de Twitter dueña del media
+            sha256: Hash del contenido del archivo
+            media_id: Media ID retornado por Twitter
+            size: Tamaño del archivo en bytes
+            expires_after_secs: Segundos de validez informados por Twitter
+        """
+        expires_at = time.time() + (expires_after_secs or DEFAULT_EXPIRES_AFTER_SECS)
+        with self._lock:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO media_cache (owner, sha256, media_id, size, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (owner, sha256, str(media_id), size, expires_at)
+            )
+        self.evict_expired()
+
+    def evict_expired(self):
+        """Borra las entradas expiradas; retorna cuántas se borraron"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM media_cache WHERE expires_at <= ?",
+                (time.time() + EXPIRY_MARGIN_SECS,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
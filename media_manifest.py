@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Manifest de descargas por post
+Cada post se descarga en media/<shortcode>/ junto a un manifest.json con
+las rutas, tamaños y tipos de sus archivos. Buscar los archivos de un post
+es leer un solo archivo, sin importar cuántos posts haya en MEDIA_FOLDER.
+"""
+import json
+import os
+import re
+from pathlib import Path
+
+MANIFEST_NAME = 'manifest.json'
+
+IMAGE_SUFFIXES = ['.jpg', '.jpeg', '.png', '.webp']
+VIDEO_SUFFIXES = ['.mp4', '.mov']
+
+
+def media_type(path):
+    """Retorna 'image', 'video' o None según la extensión"""
+    suffix = Path(path).suffix.lower()
+    if suffix in IMAGE_SUFFIXES:
+        return 'image'
+    if suffix in VIDEO_SUFFIXES:
+        return 'video'
+    return None
+
+
+def _natural_key(path):
+    """Ordena ..._UTC_2.jpg antes que ..._UTC_10.jpg (orden del carrusel)"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', Path(path).name)]
+
+
+def scan_post_folder(post_folder):
+    """
+    Lista los archivos de media de la carpeta de un post
+
+    Args:
+        post_folder: Carpeta media/<shortcode>
+
+    Returns:
+        Lista de dicts {'path', 'size', 'type'} en orden del carrusel
+    """
+    files = []
+    for file in sorted(Path(post_folder).iterdir(), key=_natural_key):
+        kind = media_type(file)
+        if file.is_file() and kind:
+            files.append({'path': str(file), 'size': file.stat().st_size, 'type': kind})
+    return files
+
+
+def write_manifest(post_folder, shortcode, caption, url, files):
+    """
+    Escribe el manifest del post de forma atómica
+
+    Args:
+        post_folder: Carpeta media/<shortcode>
+        shortcode: Código del post
+        caption: Caption original
+        url: URL del post en Instagram
+        files: Lista de dicts {'path', 'size', 'type'}
+    """
+    manifest_path = Path(post_folder) / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix('.tmp')
+
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'shortcode': shortcode,
+            'caption': caption,
+            'url': url,
+            'files': files
+        }, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+
+def read_manifest(post_folder):
+    """
+    Lee el manifest de un post
+
+    Returns:
+        Dict del manifest, o None si no existe o algún archivo ya no está
+        (por ejemplo, si se borró a mano)
+    """
+    manifest_path = Path(post_folder) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    for file in manifest['files']:
+        if not os.path.exists(file['path']) or os.path.getsize(file['path']) != file['size']:
+            return None
+
+    return manifest
+
+
+def manifest_to_downloaded(manifest):
+    """Convierte un manifest al dict que retorna download_post"""
+    return {
+        'images': [f['path'] for f in manifest['files'] if f['type'] == 'image'],
+        'videos': [f['path'] for f in manifest['files'] if f['type'] == 'video'],
+        'caption': manifest['caption'],
+        'url': manifest['url']
+    }
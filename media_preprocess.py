@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Preprocesamiento de imágenes antes de subirlas a Twitter
+Reduce el tamaño (lado máximo), recomprime, elimina metadatos (EXIF/XMP)
+y convierte formatos que Twitter no acepta o que pesan de más (PNG sin
+transparencia, WEBP, BMP, TIFF → JPEG). Los videos y GIFs pasan sin tocar.
+
+Decodificar y codificar imágenes es CPU puro: se hace en un
+ProcessPoolExecutor para no competir por el GIL con los threads del
+pipeline. El resultado se guarda por hash del archivo original, así un
+reintento o un post repetido no vuelve a procesar nada.
+"""
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+# Twitter acepta imágenes de hasta 5 MB
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+# Formatos que se suben tal cual si ya cumplen los límites
+TWITTER_IMAGE_FORMATS = ('JPEG', 'PNG')
+
+PROCESSABLE_SUFFIXES = ['.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff']
+
+# Calidades que se prueban si la imagen no entra en MAX_IMAGE_BYTES
+_QUALITY_STEPS = (0, -10, -20, -30)
+
+# Segmentos JPEG con metadatos: APP1 (EXIF, XMP), APP13 (IPTC) y comentarios.
+# APP2 (perfil ICC) y APP14 (Adobe) hacen falta para los colores.
+_JPEG_METADATA_MARKERS = (0xE1, 0xED, 0xFE)
+_PNG_METADATA_CHUNKS = (b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME')
+
+# Tag EXIF de orientación
+_EXIF_ORIENTATION = 0x0112
+
+
+def _digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _encode(image, out_path, fmt, quality):
+    if fmt == 'JPEG':
+        image.save(out_path, 'JPEG', quality=quality, optimize=True, progressive=True,
+                   icc_profile=image.info.get('icc_profile'))
+    else:
+        image.save(out_path, 'PNG', optimize=True, icc_profile=image.info.get('icc_profile'))
+    return os.path.getsize(out_path)
+
+
+def _strip_jpeg(data):
+    """Segmentos del JPEG sin los de metadatos (None si no es un JPEG legible)"""
+    if not data.startswith(b'\xff\xd8'):
+        return None
+
+    parts = [data[:2]]
+    pos = 2
+    while pos + 1 < len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        # Desde el inicio de los datos de imagen se copia todo
+        if marker in (0xDA, 0xD9):
+            parts.append(data[pos:])
+            break
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            parts.append(data[pos:pos + 2])
+            pos += 2
+            continue
+        end = pos + 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+        if marker not in _JPEG_METADATA_MARKERS:
+            parts.append(data[pos:end])
+        pos = end
+    return b''.join(parts)
+
+
+def _strip_png(data):
+    """Chunks del PNG sin los de metadatos (None si no es un PNG legible)"""
+    if not data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return None
+
+    parts = [data[:8]]
+    pos = 8
+    while pos + 8 <= len(data):
+        end = pos + 12 + int.from_bytes(data[pos:pos + 4], 'big')
+        if data[pos + 4:pos + 8] not in _PNG_METADATA_CHUNKS:
+            parts.append(data[pos:end])
+        pos = end
+    return b''.join(parts)
+
+
+def strip_metadata(path, out_path, fmt):
+    """
+    Copia sin pérdida de un JPEG o PNG sin EXIF, XMP, IPTC ni textos
+
+    Quita los segmentos/chunks de metadatos sin decodificar la imagen.
+
+    Returns:
+        Bytes escritos, o None si no había metadatos que quitar
+
+    Raises:
+        ValueError: Si la estructura del archivo no se pudo recorrer
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    stripped = _strip_jpeg(data) if fmt == 'JPEG' else _strip_png(data)
+    if stripped is None:
+        raise ValueError(f"No se pudo leer la estructura {fmt} de {Path(path).name}")
+    if len(stripped) == len(data):
+        return None
+
+    with open(out_path, 'wb') as f:
+        f.write(stripped)
+    return len(stripped)
+
+
+def preprocess_image(path, cache_folder, max_side=2048, quality=85, max_bytes=MAX_IMAGE_BYTES):
+    """
+    Prepara una imagen para Twitter (se ejecuta en un proceso del pool)
+
+    Args:
+        path: Imagen original
+        cache_folder: Carpeta de resultados, indexados por hash del original
+        max_side: Lado máximo en píxeles
+        quality: Calidad JPEG inicial
+        max_bytes: Tamaño máximo aceptado por Twitter
+
+    Returns:
+        Dict {'input', 'output', 'input_bytes', 'output_bytes', 'action', 'seconds'}
+        donde action es 'converted', 'stripped' (el original sin metadatos),
+        'original' o 'cached'
+    """
+    start = time.perf_counter()
+    input_bytes = os.path.getsize(path)
+    cache_folder = Path(cache_folder)
+
+    # La clave incluye los parámetros: cambiarlos invalida la caché
+    key = f"{_digest(path)}_{max_side}_{quality}"
+    keep_marker = cache_folder / f"{key}.keep"
+    result = {'input': str(path), 'input_bytes': input_bytes}
+
+    if keep_marker.exists():
+        return dict(result, output=str(path), output_bytes=input_bytes, action='cached',
+                    seconds=time.perf_counter() - start)
+    for suffix in ('.jpg', '.png'):
+        cached = cache_folder / f"{key}{suffix}"
+        if cached.exists():
+            return dict(result, output=str(cached), output_bytes=os.path.getsize(cached),
+                        action='cached', seconds=time.perf_counter() - start)
+
+    with Image.open(path) as original:
+        source_format = original.format
+        width, height = original.size
+        # Sin el EXIF se perdería la rotación: esas imágenes van recodificadas
+        rotated = original.getexif().get(_EXIF_ORIENTATION, 1) != 1
+
+        # Aplica la rotación del EXIF antes de descartarlo
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+        if max(width, height) > max_side:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        # Solo las imágenes con transparencia se quedan en PNG
+        if has_alpha:
+            fmt, suffix = 'PNG', '.png'
+            image = image.convert('RGBA')
+        else:
+            fmt, suffix = 'JPEG', '.jpg'
+            image = image.convert('RGB')
+
+        cache_folder.mkdir(parents=True, exist_ok=True)
+        out_path = cache_folder / f"{key}{suffix}"
+        tmp_path = cache_folder / f"{key}.{os.getpid()}.tmp"
+
+        output_bytes = _encode(image, tmp_path, fmt, quality)
+
+        # Si no entra en el límite: menos calidad y, si no alcanza, menos resolución
+        step = 0
+        while output_bytes > max_bytes:
+            if fmt == 'JPEG' and step + 1 < len(_QUALITY_STEPS):
+                step += 1
+            else:
+                image = image.resize((int(image.width * 0.75), int(image.height * 0.75)), Image.LANCZOS)
+            output_bytes = _encode(image, tmp_path, fmt, max(40, quality + _QUALITY_STEPS[step]))
+
+    # El original ya era válido y más liviano: se sube él, sin metadatos
+    fits = (source_format in TWITTER_IMAGE_FORMATS and input_bytes <= max_bytes
+            and max(width, height) <= max_side and not rotated)
+    if fits and output_bytes >= input_bytes:
+        strip_path = cache_folder / f"{key}.{os.getpid()}.strip.tmp"
+        try:
+            stripped_bytes = strip_metadata(path, strip_path, source_format)
+        except ValueError:
+            # Estructura rara: mejor la versión recodificada que subir el EXIF
+            stripped_bytes = False
+
+        if stripped_bytes is None:
+            os.remove(tmp_path)
+            keep_marker.touch()
+            return dict(result, output=str(path), output_bytes=input_bytes, action='original',
+                        seconds=time.perf_counter() - start)
+        if stripped_bytes:
+            os.remove(tmp_path)
+            stripped_path = cache_folder / f"{key}{'.jpg' if source_format == 'JPEG' else '.png'}"
+            os.replace(strip_path, stripped_path)
+            return dict(result, output=str(stripped_path), output_bytes=stripped_bytes, action='stripped',
+                        seconds=time.perf_counter() - start)
+
+    os.replace(tmp_path, out_path)
+    return dict(result, output=str(out_path), output_bytes=output_bytes, action='converted',
+                seconds=time.perf_counter() - start)
+
+
+def _pool_context():
+    """
+    Contexto de multiprocessing para el pool
+
+    El pool se crea desde un thread del pipeline: con fork (default en Linux)
+    el hijo copiaría un proceso con varios threads y podría quedar colgado en
+    un lock tomado por otro. forkserver arranca los workers desde un proceso
+    limpio; en Windows solo existe spawn.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class MediaPreprocessor:
+    def __init__(self, cache_folder, max_side=2048, quality=85, workers=2):
+        """
+        Inicializa el preprocesador (el pool de procesos arranca en el primer uso)
+
+        Args:
+            cache_folder: Carpeta donde se guardan las imágenes procesadas
+            max_side: Lado máximo en píxeles
+            quality: Calidad JPEG
+            workers: Procesos del pool
+        """
+        self.cache_folder = Path(cache_folder)
+        self.max_side = max_side
+        self.quality = quality
+        self.workers = max(1, workers)
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+        return self._pool
+
+    def process(self, media_files):
+        """
+        Prepara los archivos de un tweet
+
+        Args:
+            media_files: Rutas de imágenes y/o videos
+
+        Returns:
+            Lista de resultados en el mismo orden (ver preprocess_image); los
+            videos y formatos no procesables vuelven con action='skipped'
+        """
+        results = [None] * len(media_files)
+        futures = {}
+
+        for i, path in enumerate(media_files):
+            if Path(path).suffix.lower() in PROCESSABLE_SUFFIXES:
+                futures[i] = self._get_pool().submit(
+                    preprocess_image, str(path), str(self.cache_folder), self.max_side, self.quality
+                )
+            else:
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                results[i] = {'input': str(path), 'output': str(path), 'input_bytes': size,
+                              'output_bytes': size, 'action': 'skipped', 'seconds': 0.0}
+
+        for i, future in futures.items():
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                # Imagen que Pillow no puede leer: se sube la original
+                print(f"⚠️ No se pudo preprocesar {Path(media_files[i]).name}: {e}")
+                size = os.path.getsize(media_files[i])
+                results[i] = {'input': str(media_files[i]), 'output': str(media_files[i]),
+                              'input_bytes': size, 'output_bytes': size, 'action': 'error', 'seconds': 0.0}
+
+        return results
+
+    def prepare(self, media_files):
+        """Igual que process pero retorna solo las rutas a subir"""
+        results = self.process(media_files)
+
+        saved = sum(r['input_bytes'] - r['output_bytes'] for r in results)
+        if saved > 0:
+            print(f"🗜️  Imágenes optimizadas: {saved / 1024:.0f} KB menos para subir")
+
+        return [result['output'] for result in results]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas del bot: spans de tiempo por etapa, contadores y profundidad de colas
+Cada etapa (listado de Instagram, descarga, preprocesado, subida, tweet,
+ciclo completo) se mide con un span etiquetado con perfil, shortcode, tipo
+de media y bytes. Los spans se exportan de dos formas:
+
+- JSON lines (data/metrics.jsonl): un registro por span, con todas sus etiquetas
+- Endpoint HTTP local con formato de texto de Prometheus (/metrics):
+  histogramas de latencia, contadores de bytes y errores, y gauges de colas
+
+Uso:
+    metrics = get_metrics()
+    with metrics.span('twitter_upload', media_type='video') as span:
+        ...
+        span.set(bytes=size)
+    with metrics.bind(profile='nasa', shortcode='Cx1'):   # etiquetas heredadas
+        ...
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Límites (en segundos) de los buckets de los histogramas de latencia
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Etiquetas que pasan a Prometheus; el resto (shortcode, bytes...) solo va
+# al JSON lines para no multiplicar las series
+LABEL_TAGS = ('profile', 'media_type')
+
+# Etiquetas heredadas por los spans del contexto actual (thread / tarea)
+_context_tags = contextvars.ContextVar('metrics_tags', default={})
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def propagate(fn):
+    """Envuelve fn para que herede las etiquetas actuales en otro thread"""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+class Span:
+    """Medición de una etapa; se crea con Metrics.span()"""
+
+    def __init__(self, stage, tags):
+        self.stage = stage
+        self.tags = tags
+        self.error = None
+        self.start = time.perf_counter()
+
+    def set(self, **tags):
+        """Agrega etiquetas (p. ej. bytes al terminar la descarga)"""
+        self.tags.update(tags)
+
+    def fail(self, error):
+        """Marca el span como fallido aunque no se lance la excepción"""
+        self.error = str(error)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._gauge_callbacks = {}
+
+        self.jsonl_path = None
+        self.jsonl_max_bytes = 10 * 1024 * 1024
+        self._jsonl_lock = threading.Lock()
+        self._server = None
+
+    def configure(self, jsonl_path=None, port=None, host='127.0.0.1', jsonl_max_mb=10):
+        """
+        Activa las exportaciones (se puede llamar varias veces; el servidor
+        HTTP se inicia una sola vez por proceso)
+
+        Args:
+            jsonl_path: Archivo JSON lines de spans (None = no se escribe)
+            port: Puerto del endpoint Prometheus (None = desactivado)
+            host: Interfaz del endpoint (por defecto solo local)
+            jsonl_max_mb: Tamaño a partir del cual el archivo rota a .1
+        """
+        if jsonl_path:
+            self.jsonl_path = Path(jsonl_path)
+            self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+            self.jsonl_max_bytes = int(jsonl_max_mb * 1024 * 1024)
+
+        if port and self._server is None:
+            try:
+                self._server = self._start_server(host, port)
+                print(f"📈 Métricas en http://{host}:{port}/metrics")
+            except OSError as e:
+                print(f"⚠️ No se pudo abrir el endpoint de métricas en el puerto {port}: {e}")
+
+    @contextmanager
+    def bind(self, **tags):
+        """Etiquetas que heredan los spans creados dentro del bloque"""
+        token = _context_tags.set({**_context_tags.get(), **tags})
+        try:
+            yield
+        finally:
+            _context_tags.reset(token)
+
+    @contextmanager
+    def span(self, stage, **tags):
+        """
+        Mide la duración de una etapa
+
+        Args:
+            stage: Nombre de la etapa (instagram_download, twitter_upload...)
+            **tags: Etiquetas del span (se suman a las de bind())
+        """
+        span = Span(stage, {**_context_tags.get(), **tags})
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            self._record(span, time.perf_counter() - span.start)
+
+    def _record(self, span, seconds):
+        outcome = 'error' if span.error else 'ok'
+        labels = (('stage', span.stage),) + tuple(
+            (name, span.tags[name]) for name in LABEL_TAGS if span.tags.get(name)
+        )
+
+        self.observe('bot_stage_seconds', seconds, labels + (('outcome', outcome),))
+        if span.tags.get('bytes'):
+            self.inc('bot_stage_bytes_total', span.tags['bytes'], labels)
+        if span.error:
+            self.inc('bot_errors_total', 1, labels)
+
+        record = {'ts': time.time(), 'stage': span.stage, 'seconds': round(seconds, 6),
+                  'outcome': outcome, **span.tags}
+        if span.error:
+            record['error'] = span.error
+        self._write_jsonl(record)
+
+    def observe(self, name, value, labels=()):
+        """Agrega una observación a un histograma"""
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def inc(self, name, value=1, labels=(), **tags):
+        """Incrementa un contador (labels como tupla de pares o como kwargs)"""
+        labels = tuple(labels) + tuple(sorted(tags.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def set_gauge(self, name, value, **tags):
+        """Fija el valor de un gauge"""
+        with self._lock:
+            self._gauges.setdefault(name, {})[tuple(sorted(tags.items()))] = value
+
+    def gauge_callback(self, name, callback, **tags):
+        """Gauge que se lee al momento del scrape (p. ej. el tamaño de una cola)"""
+        with self._lock:
+            self._gauge_callbacks.setdefault(name, {})[tuple(sorted(tags.items()))] = callback
+
+    def render(self):
+        """Métricas en formato de texto de Prometheus"""
+        with self._lock:
+            histograms = {name: {labels: dict(h, buckets=list(h['buckets'])) for labels, h in series.items()}
+                          for name, series in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            callbacks = {name: dict(series) for name, series in self._gauge_callbacks.items()}
+
+        for name, series in callbacks.items():
+            for labels, callback in series.items():
+                try:
+                    gauges.setdefault(name, {})[labels] = callback()
+                except Exception:
+                    pass
+
+        lines = []
+        for name, series in sorted(histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                for bound, count in zip(LATENCY_BUCKETS, histogram['buckets']):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        for name, series in sorted(counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name, series in sorted(gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def _write_jsonl(self, record):
+        if self.jsonl_path is None:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._jsonl_lock:
+            try:
+                if self.jsonl_path.exists() and self.jsonl_path.stat().st_size > self.jsonl_max_bytes:
+                    os.replace(self.jsonl_path, self.jsonl_path.with_name(self.jsonl_path.name + '.1'))
+                with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"⚠️ No se pudo escribir la métrica: {e}")
+
+    def _start_server(self, host, port):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_metrics():
+    """Registro de métricas compartido por todo el proceso"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Metrics()
+        return _shared
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Inspector de videos MP4/MOV sin decodificar
+Lee solo la metadata del box `moov` (duración, resolución, codecs, fps)
+a través de mmap: el payload (`mdat`) se salta por su tamaño sin leerlo,
+así que inspeccionar un video de varios GB toma milisegundos.
+
+Sirve para rechazar antes de subir los videos que Twitter no va a aceptar
+(duración, resolución, fps, tamaño o codec fuera de los límites).
+"""
+import mmap
+import os
+import struct
+from pathlib import Path
+
+# Límites de Twitter para media_category=tweet_video
+TWITTER_MAX_DURATION_S = 140
+TWITTER_MIN_DURATION_S = 0.5
+TWITTER_MAX_WIDTH = 1920
+TWITTER_MAX_HEIGHT = 1200
+TWITTER_MAX_FPS = 60
+TWITTER_MAX_BYTES = 512 * 1024 * 1024
+TWITTER_MAX_ASPECT_RATIO = 3.0
+TWITTER_VIDEO_CODECS = ('avc1', 'avc3')
+TWITTER_AUDIO_CODECS = ('mp4a',)
+
+
+class InvalidVideoError(Exception):
+    """El archivo no es un MP4/MOV válido"""
+    pass
+
+
+def _iter_boxes(buf, start, end):
+    """Genera (tipo, inicio del contenido, fin del box) de los boxes en [start, end)"""
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', buf, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                raise InvalidVideoError("Box truncado")
+            size = struct.unpack_from('>Q', buf, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+
+        if size < header or offset + size > end:
+            raise InvalidVideoError(f"Box {box_type!r} con tamaño inválido")
+
+        yield box_type, offset + header, offset + size
+        offset += size
+
+
+def _find(buf, start, end, path):
+    """Primer box que sigue la ruta de tipos (p. ej. [b'mdia', b'mdhd'])"""
+    for box_type, body, box_end in _iter_boxes(buf, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return body, box_end
+            return _find(buf, body, box_end, path[1:])
+    return None
+
+
+def _parse_header_box(buf, body):
+    """mvhd / mdhd: (timescale, duration) según la versión del box"""
+    version = buf[body]
+    if version == 1:
+        timescale, duration = struct.unpack_from('>IQ', buf, body + 20)
+    else:
+        timescale, duration = struct.unpack_from('>II', buf, body + 12)
+    return timescale, duration
+
+
+def _parse_tkhd(buf, body, end):
+    """tkhd: ancho y alto de presentación (16.16) y rotación de la matriz"""
+    version = buf[body]
+    matrix_offset = body + (52 if version == 1 else 40)
+    if matrix_offset + 44 > end:
+        return 0, 0, 0
+
+    a, b, _, c, d = struct.unpack_from('>iiiii', buf, matrix_offset)
+    width, height = struct.unpack_from('>II', buf, matrix_offset + 36)
+
+    rotation = 0
+    if (a, b, c, d) == (0, 0x10000, -0x10000, 0):
+        rotation = 90
+    elif (a, b, c, d) == (-0x10000, 0, 0, -0x10000):
+        rotation = 180
+    elif (a, b, c, d) == (0, -0x10000, 0x10000, 0):
+        rotation = 270
+
+    return width >> 16, height >> 16, rotation
+
+
+def _parse_track(buf, body, end):
+    track = {}
+
+    tkhd = _find(buf, body, end, [b'tkhd'])
+    if tkhd:
+        track['width'], track['height'], track['rotation'] = _parse_tkhd(buf, *tkhd)
+
+    hdlr = _find(buf, body, end, [b'mdia', b'hdlr'])
+    if hdlr:
+        track['handler'] = bytes(buf[hdlr[0] + 8:hdlr[0] + 12]).decode('latin-1')
+
+    mdhd = _find(buf, body, end, [b'mdia', b'mdhd'])
+    if mdhd:
+        timescale, duration = _parse_header_box(buf, mdhd[0])
+        track['duration_s'] = duration / timescale if timescale else 0.0
+
+    stbl = _find(buf, body, end, [b'mdia', b'minf', b'stbl'])
+    if stbl:
+        stsd = _find(buf, stbl[0], stbl[1], [b'stsd'])
+        if stsd and stsd[0] + 16 <= stsd[1]:
+            # Primera sample entry: su tipo es el codec (avc1, hvc1, mp4a...)
+            track['codec'] = bytes(buf[stsd[0] + 12:stsd[0] + 16]).decode('latin-1')
+            entry = stsd[0] + 8
+            if track.get('handler') == 'vide' and entry + 36 <= stsd[1]:
+                track['coded_width'], track['coded_height'] = struct.unpack_from('>HH', buf, entry + 32)
+
+        stts = _find(buf, stbl[0], stbl[1], [b'stts'])
+        if stts:
+            entries = struct.unpack_from('>I', buf, stts[0] + 4)[0]
+            samples = sum(
+                struct.unpack_from('>I', buf, stts[0] + 8 + i * 8)[0]
+                for i in range(min(entries, (stts[1] - stts[0] - 8) // 8))
+            )
+            track['samples'] = samples
+
+    return track
+
+
+def inspect_video(file_path):
+    """
+    Lee la metadata de un MP4/MOV sin leer el contenido multimedia
+
+    Args:
+        file_path: Ruta al video
+
+    Returns:
+        Dict con duration_s, width, height, rotation, fps, video_codec,
+        audio_codec, bitrate_bps, size_bytes y faststart (moov antes que mdat)
+
+    Raises:
+        InvalidVideoError: Si no tiene moov o la estructura es inválida
+    """
+    file_path = Path(file_path)
+    size = os.path.getsize(file_path)
+    if size < 8:
+        raise InvalidVideoError(f"{file_path.name} no es un MP4/MOV")
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        moov = None
+        faststart = False
+        seen_mdat = False
+
+        # Solo se leen las cabeceras de los boxes de primer nivel
+        for box_type, body, box_end in _iter_boxes(buf, 0, size):
+            if box_type == b'mdat':
+                seen_mdat = True
+            elif box_type == b'moov':
+                moov = (body, box_end)
+                faststart = not seen_mdat
+                break
+
+        if moov is None:
+            raise InvalidVideoError(f"{file_path.name} no tiene box moov")
+
+        info = {
+            'size_bytes': size,
+            'faststart': faststart,
+            'duration_s': 0.0,
+            'width': 0,
+            'height': 0,
+            'rotation': 0,
+            'fps': 0.0,
+            'video_codec': None,
+            'audio_codec': None,
+        }
+
+        mvhd = _find(buf, *moov, [b'mvhd'])
+        if mvhd:
+            timescale, duration = _parse_header_box(buf, mvhd[0])
+            info['duration_s'] = duration / timescale if timescale else 0.0
+
+        for box_type, body, box_end in _iter_boxes(buf, *moov):
+            if box_type != b'trak':
+                continue
+            track = _parse_track(buf, body, box_end)
+
+            if track.get('handler') == 'vide' and info['video_codec'] is None:
+                info['video_codec'] = track.get('codec')
+                info['width'] = track.get('width') or track.get('coded_width', 0)
+                info['height'] = track.get('height') or track.get('coded_height', 0)
+                info['rotation'] = track.get('rotation', 0)
+                if track.get('duration_s'):
+                    info['fps'] = track.get('samples', 0) / track['duration_s']
+                    info['duration_s'] = info['duration_s'] or track['duration_s']
+            elif track.get('handler') == 'soun' and info['audio_codec'] is None:
+                info['audio_codec'] = track.get('codec')
+
+    info['bitrate_bps'] = int(size * 8 / info['duration_s']) if info['duration_s'] else 0
+    return info
+
+
+def check_twitter_limits(info):
+    """
+    Compara la metadata de un video con los límites de Twitter
+
+    Args:
+        info: Dict retornado por inspect_video
+
+    Returns:
+        Lista de problemas (vacía si el video cumple)
+    """
+    problems = []
+
+    if info['duration_s'] > TWITTER_MAX_DURATION_S:
+        problems.append(f"dura {info['duration_s']:.1f} s (máximo {TWITTER_MAX_DURATION_S} s)")
+    elif info['duration_s'] < TWITTER_MIN_DURATION_S:
+        problems.append(f"dura {info['duration_s']:.1f} s (mínimo {TWITTER_MIN_DURATION_S} s)")
+
+    if info['size_bytes'] > TWITTER_MAX_BYTES:
+        problems.append(f"pesa {info['size_bytes'] / 1024 / 1024:.0f} MB "
+                        f"(máximo {TWITTER_MAX_BYTES // 1024 // 1024} MB)")
+
+    # Vertical u horizontal: se compara el lado largo y el corto
+    width, height = info['width'], info['height']
+    long_side, short_side = max(width, height), min(width, height)
+    if long_side > TWITTER_MAX_WIDTH or short_side > TWITTER_MAX_HEIGHT:
+        problems.append(f"resolución {width}x{height} (máximo {TWITTER_MAX_WIDTH}x{TWITTER_MAX_HEIGHT})")
+    if short_side and long_side / short_side > TWITTER_MAX_ASPECT_RATIO:
+        problems.append(f"relación de aspecto {width}x{height} fuera de 1:3 a 3:1")
+
+    if info['fps'] > TWITTER_MAX_FPS + 0.5:
+        problems.append(f"{info['fps']:.0f} fps (máximo {TWITTER_MAX_FPS})")
+
+    if info['video_codec'] not in TWITTER_VIDEO_CODECS:
+        problems.append(f"codec de video {info['video_codec']} (se requiere H.264)")
+    if info['audio_codec'] and info['audio_codec'] not in TWITTER_AUDIO_CODECS:
+        problems.append(f"codec de audio {info['audio_codec']} (se requiere AAC)")
+
+    return problems
+
+
+# Prueba del módulo
+if __name__ == "__main__":
+    import sys
+    import time
+
+    for path in sys.argv[1:]:
+        start = time.perf_counter()
+        info = inspect_video(path)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"\n🎬 {path} ({elapsed_ms:.2f} ms)")
+        for key, value in info.items():
+            print(f"   {key}: {value}")
+        problems = check_twitter_limits(info)
+        print(f"   {'❌ ' + '; '.join(problems) if problems else '✅ Cumple los límites de Twitter'}")
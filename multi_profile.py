@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Modo multi-perfil: varios perfiles de Instagram → varias cuentas de Twitter
+en un solo proceso. Todos los perfiles comparten el Instaloader (y su sesión),
+la sesión HTTP de Twitter y los workers del pipeline; cada perfil tiene su
+propio namespace en el historial.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from instagram_scraper import InstagramScraper
+from twitter_poster import TwitterPoster, SharedSession
+from rate_limiter import get_rate_limiter
+from main import (InstagramTwitterBot, create_pipeline, create_media_cache, create_profile_cache, create_scheduler,
+                  create_dashboard_writer)
+import config
+
+
+class MultiProfileBot:
+    def __init__(self, profiles):
+        """
+        Inicializa un bot por perfil con recursos compartidos
+
+        Args:
+            profiles: Lista de dicts {'instagram': usuario, 'twitter': {credenciales}}.
+                Si un perfil no trae 'twitter' se usan las credenciales de config.py
+        """
+        print(f"🤖 Inicializando modo multi-perfil ({len(profiles)} perfiles)")
+        print("=" * 50)
+
+        # Recursos compartidos por todos los perfiles
+        self.loader = InstagramScraper.create_loader(config.MEDIA_FOLDER)
+        self.session = SharedSession()
+        self.pipeline = create_pipeline()
+        self.media_cache = create_media_cache()
+        self.profile_cache = create_profile_cache()
+        self.dashboard_writer = create_dashboard_writer()
+        self.posters = {}
+
+        self.bots = []
+        for profile in profiles:
+            username = profile['instagram']
+            bot = InstagramTwitterBot(
+                instagram_username=username,
+                ig_scraper=InstagramScraper(
+                    username=username,
+                    download_folder=str(config.MEDIA_FOLDER),
+                    loader=self.loader,
+                    profile_cache=self.profile_cache
+                ),
+                twitter=self._get_poster(profile.get('twitter')),
+                pipeline=self.pipeline,
+                historial_namespace=username,
+                dashboard_writer=self.dashboard_writer
+            )
+            self.bots.append(bot)
+
+        # Perfiles revisados a la vez (descargas y subidas van al pipeline compartido)
+        self.profile_workers = getattr(config, 'MULTI_PROFILE_WORKERS', 2)
+
+        print(f"✅ {len(self.bots)} perfiles listos, {len(self.posters)} cuentas de Twitter\n")
+
+    def _get_poster(self, credentials):
+        """Un TwitterPoster por cuenta, compartido por los perfiles que publican en ella"""
+        credentials = credentials or {
+            'api_key': config.TWITTER_API_KEY,
+            'api_secret': config.TWITTER_API_SECRET,
+            'access_token': config.TWITTER_ACCESS_TOKEN,
+            'access_secret': config.TWITTER_ACCESS_SECRET,
+            'bearer_token': config.TWITTER_BEARER_TOKEN,
+        }
+
+        key = (credentials['api_key'], credentials['access_token'])
+        if key not in self.posters:
+            self.posters[key] = TwitterPoster(
+                api_key=credentials['api_key'],
+                api_secret=credentials['api_secret'],
+                access_token=credentials['access_token'],
+                access_secret=credentials['access_secret'],
+                bearer_token=credentials.get('bearer_token'),
+                session=self.session,
+                max_parallel_uploads=getattr(config, 'TWITTER_MAX_PARALLEL_UPLOADS', 4),
+                video_chunk_mb=getattr(config, 'TWITTER_VIDEO_CHUNK_MB', 4),
+                media_cache=self.media_cache,
+                rate_limiter=get_rate_limiter(getattr(config, 'TWITTER_RATE_LIMITS', None)),
+                max_rate_limit_wait=getattr(config, 'TWITTER_MAX_RATE_LIMIT_WAIT', 60)
+            )
+        return self.posters[key]
+
+    def verify_credentials(self):
+        """Verifica todas las cuentas de Twitter configuradas"""
+        return all(poster.verify_credentials() for poster in self.posters.values())
+
+    def run_once(self):
+        """Revisa todos los perfiles una vez"""
+        with ThreadPoolExecutor(max_workers=self.profile_workers) as executor:
+            list(executor.map(lambda bot: bot.process_new_posts(), self.bots))
+
+    def run_loop(self, interval_minutes=None):
+        """
+        Revisa los perfiles en loop, repartidos en el intervalo para no
+        concentrar todas las consultas a Instagram. Con ADAPTIVE_POLLING
+        cada perfil se revisa más seguido en sus horarios de publicación,
+        dentro del presupuesto global POLL_BUDGET_PER_HOUR.
+
+        Args:
+            interval_minutes: Intervalo base en minutos (usa config si no se especifica)
+        """
+        interval = interval_minutes or config.CHECK_INTERVAL
+
+        print(f"\n🔄 Bot multi-perfil en modo continuo")
+        print(f"⏱️  Cada perfil se verifica cada {interval} minutos (en promedio)")
+        print(f"⌨️  Presiona Ctrl+C para detener\n")
+
+        try:
+            create_scheduler(self.bots, interval).run(workers=self.profile_workers)
+
+        except KeyboardInterrupt:
+            print(f"\n\n{'='*50}")
+            print("🛑 Bot detenido por el usuario")
+            print(f"{'='*50}")
+
+    def show_stats(self):
+        """Muestra estadísticas por perfil"""
+        print(f"\n{'='*50}")
+        print("📊 ESTADÍSTICAS POR PERFIL")
+        print(f"{'='*50}")
+        for bot in self.bots:
+            print(f"@{bot.instagram_username}: {len(bot.historial)} posts procesados")
+        print(f"{'='*50}\n")
+
+    def close(self):
+        """Detiene el pipeline, escribe lo pendiente del dashboard y cierra la sesión compartida"""
+        self.pipeline.stop()
+        if self.dashboard_writer:
+            self.dashboard_writer.close()
+        self.session.shutdown()
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline concurrente para procesar posts nuevos
+Etapas: descarga (Instagram) → subida de media (Twitter) → tweet
+Cada etapa tiene sus propios workers y las colas entre etapas son acotadas,
+así la descarga del post N+1 se solapa con la subida del post N.
+Los tweets se publican siempre en el orden en que se entregan los posts.
+Con una JobQueue cada etapa completada queda registrada, y un job retomado
+tras un crash salta las etapas que ya había terminado.
+"""
+import os
+import queue
+import threading
+import time
+
+from chunked_upload import VideoRejectedError
+from job_queue import DOWNLOADED, UPLOADED
+from metrics import get_metrics
+from rate_limiter import RateLimitedError
+
+
+def select_media_files(downloaded):
+    """
+    Elige qué archivos descargados se suben a Twitter
+
+    Args:
+        downloaded: Dict retornado por scraper.download_post
+
+    Returns:
+        Lista de rutas (1 video o máximo 4 imágenes)
+    """
+    if downloaded['videos']:
+        # Si hay video, solo subir el primero
+        return [downloaded['videos'][0]]
+    if downloaded['images']:
+        # Si hay imágenes, máximo 4
+        return downloaded['images'][:4]
+    return []
+
+
+class PostJob:
+    """Un post recorriendo el pipeline"""
+
+    def __init__(self, seq, post, scraper, poster, batch, job_queue=None):
+        self.seq = seq
+        self.post = post
+        self.scraper = scraper
+        self.poster = poster
+        self.batch = batch
+        self.job_queue = job_queue
+
+        # Resultados de cada etapa
+        self.downloaded = None
+        self.media_files = []
+        self.media_ids = []
+        self.uploaded = False
+        self.error = None
+        # El error fue un límite de Twitter (no cuenta como intento fallido)
+        self.rate_limited = False
+        # Twitter no acepta la media (reintentar no sirve)
+        self.rejected = False
+
+        # Job guardado en la JobQueue (None si no se usa)
+        self.record = None
+
+    def restore(self, record):
+        """Retoma un job guardado desde su última etapa completada"""
+        self.record = record
+        if record is None or record['status'] not in (DOWNLOADED, UPLOADED):
+            return
+
+        # Si se borraron los archivos se vuelve a descargar
+        if not record['downloaded'] or not all(os.path.exists(path) for path in record['media_files']):
+            return
+        self.downloaded = record['downloaded']
+        self.media_files = record['media_files']
+
+        if record['status'] == UPLOADED and record['media_ids'] is not None:
+            self.media_ids = record['media_ids']
+            self.uploaded = True
+
+    @property
+    def shortcode(self):
+        return self.post['shortcode']
+
+    def metrics_tags(self):
+        """Etiquetas de los spans de este post (perfil y shortcode)"""
+        return {'profile': getattr(self.scraper, 'username', None), 'shortcode': self.shortcode}
+
+
+class _Batch:
+    """Posts entregados en una misma llamada a run(); reordena los resultados"""
+
+    def __init__(self):
+        self._finished = {}
+        self._cond = threading.Condition()
+
+    def finish(self, job):
+        with self._cond:
+            self._finished[job.seq] = job
+            self._cond.notify_all()
+
+    def wait(self, seq):
+        with self._cond:
+            while seq not in self._finished:
+                self._cond.wait()
+            return self._finished.pop(seq)
+
+
+class PostPipeline:
+    def __init__(self, download_workers=1, upload_workers=2, queue_size=4, tweet_delay=5,
+                 preprocessor=None):
+        """
+        Inicializa el pipeline (los workers arrancan con start())
+
+        Args:
+            download_workers: Threads descargando de Instagram en paralelo
+            upload_workers: Threads subiendo media a Twitter en paralelo
+            queue_size: Capacidad de cada cola entre etapas
+            tweet_delay: Segundos mínimos entre tweets consecutivos
+            preprocessor: MediaPreprocessor que optimiza las imágenes antes de subirlas
+        """
+        self.download_workers = max(1, download_workers)
+        self.upload_workers = max(1, upload_workers)
+        self.tweet_delay = tweet_delay
+        self.preprocessor = preprocessor
+
+        self.download_queue = queue.Queue(maxsize=queue_size)
+        self.upload_queue = queue.Queue(maxsize=queue_size)
+
+        self._threads = []
+
+        # Posts esperando en cada cola, leídos al momento del scrape
+        metrics = get_metrics()
+        metrics.gauge_callback('bot_pipeline_queue_depth', self.download_queue.qsize, queue='download')
+        metrics.gauge_callback('bot_pipeline_queue_depth', self.upload_queue.qsize, queue='upload')
+
+        # Último tweet y lock por cuenta de Twitter: el delay aplica por cuenta
+        # aunque varios perfiles compartan el pipeline
+        self._last_tweet = {}
+        self._tweet_locks = {}
+        self._locks_guard = threading.Lock()
+
+    def start(self):
+        """Arranca los workers de descarga y subida"""
+        if self._threads:
+            return
+
+        for i in range(self.download_workers):
+            self._spawn(self._download_worker, f"descarga-{i}")
+        for i in range(self.upload_workers):
+            self._spawn(self._upload_worker, f"subida-{i}")
+
+    def stop(self):
+        """Detiene los workers (espera a que terminen el trabajo en curso)"""
+        for _ in range(self.download_workers):
+            self.download_queue.put(None)
+        for _ in range(self.upload_workers):
+            self.upload_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        if self.preprocessor:
+            self.preprocessor.close()
+
+    def run(self, scraper, poster, posts, publish, job_queue=None):
+        """
+        Procesa una tanda de posts y publica cada uno en orden
+
+        Args:
+            scraper: Scraper de Instagram con download_post(shortcode)
+            poster: TwitterPoster con upload_media_files(media_files)
+            posts: Lista de posts (dicts) en el orden de publicación deseado
+            publish: Callback publish(job) llamado en orden, en este thread
+            job_queue: JobQueue del perfil (opcional) donde se registra cada etapa
+        """
+        if not posts:
+            return
+
+        self.start()
+        batch = _Batch()
+        jobs = [PostJob(seq, post, scraper, poster, batch, job_queue) for seq, post in enumerate(posts)]
+
+        if job_queue is not None:
+            for job in jobs:
+                job.restore(job_queue.get(job.shortcode))
+
+        # El feeder se bloquea cuando la cola está llena (backpressure)
+        feeder = threading.Thread(
+            target=self._feed,
+            args=(jobs,),
+            name="pipeline-feeder",
+            daemon=True
+        )
+        feeder.start()
+
+        # Etapa de tweet: estrictamente en orden de seq
+        for seq in range(len(jobs)):
+            job = batch.wait(seq)
+
+            if job.error is not None:
+                publish(job)
+                continue
+
+            with self._tweet_lock(poster):
+                self._wait_tweet_delay(poster)
+                publish(job)
+                self._last_tweet[id(poster)] = time.monotonic()
+
+        feeder.join()
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _feed(self, jobs):
+        for job in jobs:
+            self.download_queue.put(job)
+
+    def _tweet_lock(self, poster):
+        with self._locks_guard:
+            return self._tweet_locks.setdefault(id(poster), threading.Lock())
+
+    def _wait_tweet_delay(self, poster):
+        """Respeta el delay entre tweets sin frenar las otras etapas"""
+        elapsed = time.monotonic() - self._last_tweet.get(id(poster), 0.0)
+        if elapsed < self.tweet_delay:
+            time.sleep(self.tweet_delay - elapsed)
+
+    def _download_worker(self):
+        scrapers = {}
+        try:
+            self._download_loop(scrapers)
+        finally:
+            # Recursos atados a este thread (el navegador de Playwright)
+            for scraper in scrapers.values():
+                release = getattr(scraper, 'release', None)
+                if release is not None:
+                    release()
+
+    def _download_loop(self, scrapers):
+        while True:
+            job = self.download_queue.get()
+            if job is None:
+                break
+            scrapers[id(job.scraper)] = job.scraper
+
+            try:
+                with get_metrics().bind(**job.metrics_tags()):
+                    self._download(job)
+            except Exception as e:
+                job.error = f"Error descargando post {job.shortcode}: {e}"
+
+            if job.error:
+                job.batch.finish(job)
+            else:
+                self.upload_queue.put(job)
+
+    def _download(self, job):
+        # Un job retomado puede tener la descarga hecha
+        if job.downloaded is None:
+            job.downloaded = job.scraper.download_post(job.shortcode)
+            if not job.downloaded:
+                job.error = f"Error descargando post {job.shortcode}"
+            else:
+                job.media_files = select_media_files(job.downloaded)
+                if job.job_queue is not None:
+                    job.job_queue.mark_downloaded(job.shortcode, job.downloaded, job.media_files)
+
+    def _upload_worker(self):
+        while True:
+            job = self.upload_queue.get()
+            if job is None:
+                break
+
+            try:
+                if not job.uploaded:
+                    with get_metrics().bind(**job.metrics_tags()):
+                        self._upload(job)
+            except Exception as e:
+                job.error = f"Error subiendo media de {job.shortcode}: {e}"
+                job.rate_limited = isinstance(e, RateLimitedError)
+                job.rejected = isinstance(e, VideoRejectedError)
+
+            job.batch.finish(job)
+
+    def _upload(self, job):
+        if job.media_files:
+            # Se suben las versiones optimizadas; en el job quedan las originales
+            files = job.media_files
+            if self.preprocessor:
+                with get_metrics().span('media_preprocess', files=len(files)):
+                    files = self.preprocessor.prepare(files)
+            job.media_ids = job.poster.upload_media_files(files)
+        job.uploaded = True
+        if job.job_queue is not None:
+            job.job_queue.mark_uploaded(job.shortcode, job.media_ids)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Caché persistente de usuario de Instagram → id numérico del perfil
+Profile.from_username descarga la página del perfil solo para averiguar su
+id, que no cambia. Con el id guardado el scraper arma el Profile
+directamente y cada revisión pasa derecho a listar los posts.
+
+Las entradas vencen tras un TTL (un usuario puede cambiar de nombre y otro
+tomar el anterior) y se invalidan si el listado con el id guardado falla.
+"""
+import threading
+import time
+
+import storage
+
+# Una semana: el id no cambia, el TTL solo acota el caso de un usuario renombrado
+DEFAULT_TTL_SECS = 7 * 24 * 3600
+
+
+class ProfileIdCache:
+    def __init__(self, db_path=None, ttl_secs=DEFAULT_TTL_SECS):
+        """
+        Args:
+            db_path: Ruta a la base de datos (usa data/analytics.db si no se especifica)
+            ttl_secs: Segundos que se confía en un id antes de volver a resolverlo
+        """
+        self.conn = storage.connect(db_path)
+        self.ttl_secs = ttl_secs
+        self._lock = threading.Lock()
+
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS profile_ids (
+                username TEXT PRIMARY KEY,
+                profile_id INTEGER NOT NULL,
+                resolved_at REAL NOT NULL
+            )
+        """)
+
+    def get(self, username):
+        """
+        Busca el id de un perfil
+
+        Args:
+            username: Usuario de Instagram
+
+        Returns:
+            Id numérico, o None si no está o venció
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT profile_id, resolved_at FROM profile_ids WHERE username = ?",
+                (username.lower(),)
+            ).fetchone()
+
+        if row is None or row[1] + self.ttl_secs <= time.time():
+            return None
+        return row[0]
+
+    def put(self, username, profile_id):
+        """Guarda el id recién resuelto de un perfil"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO profile_ids (username, profile_id, resolved_at) VALUES (?, ?, ?)",
+                (username.lower(), int(profile_id), time.time())
+            )
+
+    def invalidate(self, username):
+        """Olvida el id de un perfil (se vuelve a resolver en la próxima revisión)"""
+        with self._lock:
+            self.conn.execute("DELETE FROM profile_ids WHERE username = ?", (username.lower(),))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
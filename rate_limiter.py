@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Limitador de requests a la API de Twitter, compartido por todo el proceso
+Lleva un bucket por (familia de endpoint, cuenta): se descuenta un token
+antes de cada llamada y se sincroniza con los headers x-rate-limit-* de
+cada respuesta (hook de requests). Así se sabe antes de llamar si hay
+presupuesto, en lugar de que tweepy duerma a ciegas dentro del request.
+
+Uso:
+    limiter = get_rate_limiter()
+    limiter.install(session)                 # lee los headers de cada respuesta
+    limiter.acquire('tweet', account_id)     # espera (acotada) o lanza RateLimitedError
+    limiter.status('tweet', account_id)      # {'limit', 'remaining', 'reset_at'}
+    await limiter.acquire_async('media', account_id)
+"""
+import asyncio
+import re
+import threading
+import time
+from urllib.parse import unquote, urlparse
+
+# Familias de endpoints con límites independientes
+MEDIA = 'media'
+TWEET = 'tweet'
+LOOKUP = 'lookup'
+
+# Límites por ventana (requests, segundos) hasta recibir los headers reales
+DEFAULT_LIMITS = {
+    MEDIA: (400, 900),
+    TWEET: (100, 900),
+    LOOKUP: (75, 900),
+}
+
+# Si Twitter responde 429 sin x-rate-limit-reset
+DEFAULT_RETRY_AFTER_SECS = 60
+
+_OAUTH_TOKEN = re.compile(r'oauth_token="([^"]+)"')
+
+
+class RateLimitedError(Exception):
+    """No hay presupuesto para la llamada dentro del tiempo de espera permitido"""
+
+    def __init__(self, family, account, wait):
+        super().__init__(f"Límite de Twitter alcanzado ({family}): "
+                         f"faltan {wait:.0f} s para la próxima ventana")
+        self.family = family
+        self.account = account
+        self.wait = wait
+
+
+class _Bucket:
+    """Presupuesto de una ventana de Twitter: se rellena completo al reset"""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = time.time() + window
+
+    def refresh(self, now):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+
+
+def classify(method, url):
+    """Familia de endpoint de un request de la API de Twitter"""
+    parsed = urlparse(url)
+    if parsed.netloc.startswith('upload.') or '/media/' in parsed.path:
+        return MEDIA
+    if parsed.path.rstrip('/').endswith('/2/tweets') or '/statuses/update' in parsed.path:
+        return TWEET if method.upper() in ('POST', 'DELETE') else LOOKUP
+    return LOOKUP
+
+
+def account_from_request(request):
+    """
+    Cuenta (id numérico) de un request firmado con OAuth 1.0a
+
+    El access token empieza con el id de la cuenta ("123-abc"); los requests
+    con bearer token (solo app) van a la cuenta 'app'.
+    """
+    match = _OAUTH_TOKEN.search(request.headers.get('Authorization', ''))
+    if not match:
+        return 'app'
+    return unquote(match.group(1)).split('-')[0]
+
+
+class RateLimiter:
+    def __init__(self, limits=None):
+        """
+        Args:
+            limits: Dict familia → (requests, segundos por ventana) iniciales
+        """
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, family, account):
+        key = (family, str(account))
+        if key not in self._buckets:
+            self._buckets[key] = _Bucket(*self.limits.get(family, DEFAULT_LIMITS[LOOKUP]))
+        return self._buckets[key]
+
+    def reserve(self, family, account):
+        """
+        Intenta tomar un token sin esperar
+
+        Returns:
+            0 si se tomó, o los segundos hasta que haya presupuesto
+        """
+        now = time.time()
+        with self._lock:
+            bucket = self._bucket(family, account)
+            bucket.refresh(now)
+            if bucket.remaining > 0:
+                bucket.remaining -= 1
+                return 0.0
+            return max(0.0, bucket.reset_at - now)
+
+    def acquire(self, family, account, max_wait=0):
+        """
+        Toma un token, esperando hasta max_wait segundos si hace falta
+
+        Raises:
+            RateLimitedError: Si la próxima ventana empieza después de max_wait
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.reserve(family, account)
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitedError(family, account, wait)
+            print(f"⏳ Límite de Twitter ({family}), esperando {wait:.0f} s...")
+            time.sleep(wait)
+
+    async def acquire_async(self, family, account, max_wait=None):
+        """Igual que acquire pero sin bloquear el event loop (max_wait=None: sin límite)"""
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        while True:
+            wait = self.reserve(family, account)
+            if not wait:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise RateLimitedError(family, account, wait)
+            await asyncio.sleep(wait)
+
+    def status(self, family, account):
+        """Presupuesto actual: {'limit', 'remaining', 'reset_at'} (reset_at en epoch)"""
+        with self._lock:
+            bucket = self._bucket(family, account)
+            bucket.refresh(time.time())
+            return {'limit': bucket.limit, 'remaining': bucket.remaining, 'reset_at': bucket.reset_at}
+
+    def update(self, family, account, headers, status_code=200):
+        """Sincroniza el bucket con los headers de una respuesta de Twitter"""
+        limit = headers.get('x-rate-limit-limit')
+        remaining = headers.get('x-rate-limit-remaining')
+        reset = headers.get('x-rate-limit-reset')
+
+        with self._lock:
+            bucket = self._bucket(family, account)
+
+            if limit is not None:
+                bucket.limit = int(limit)
+            if remaining is not None:
+                bucket.remaining = int(remaining)
+            if reset is not None:
+                bucket.reset_at = float(reset)
+
+            # Tope diario por usuario de la API v2 (además del de 15 minutos)
+            daily_remaining = headers.get('x-user-limit-24hour-remaining')
+            daily_reset = headers.get('x-user-limit-24hour-reset')
+            if daily_remaining is not None and int(daily_remaining) <= 0 and daily_reset:
+                bucket.remaining = 0
+                bucket.reset_at = max(bucket.reset_at, float(daily_reset))
+
+            if status_code == 429:
+                bucket.remaining = 0
+                if reset is None:
+                    bucket.reset_at = time.time() + DEFAULT_RETRY_AFTER_SECS
+
+    def on_response(self, response, *args, **kwargs):
+        """Hook de requests: actualiza el bucket con cada respuesta"""
+        request = response.request
+        self.update(
+            classify(request.method, request.url),
+            account_from_request(request),
+            response.headers,
+            response.status_code
+        )
+        return response
+
+    def install(self, session):
+        """Registra el hook en una sesión de requests (una sola vez por sesión)"""
+        hooks = session.hooks.setdefault('response', [])
+        if self.on_response not in hooks:
+            hooks.append(self.on_response)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter(limits=None):
+    """Limitador compartido por todos los TwitterPoster del proceso"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RateLimiter(limits)
+        return _shared
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Planificador adaptativo de consultas a Instagram
+Aprende de qué hora del día y día de la semana suele publicar cada perfil
+(a partir del historial) y reparte un presupuesto global de consultas por
+hora: más seguido en las ventanas probables, menos en horas tranquilas.
+
+Las ejecuciones van en ticks de tasa fija (la próxima se calcula desde la
+anterior programada, no desde que terminó), así que lo que tarda cada
+ciclo no se acumula como deriva.
+"""
+import heapq
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Suavizado de Laplace para horas/días sin publicaciones observadas
+ALPHA = 1.0
+
+# Sin historial se asume un post por día
+PRIOR_POSTS_PER_WEEK = 7.0
+
+# Registros del historial usados para aprender el patrón de cada perfil
+HISTORY_WINDOW = 500
+
+
+def _parse_utc(value):
+    """Fecha ISO del historial a datetime UTC (las naive de Instagram ya son UTC)"""
+    date = datetime.fromisoformat(value)
+    if date.tzinfo is None:
+        return date.replace(tzinfo=timezone.utc)
+    return date.astimezone(timezone.utc)
+
+
+class PostingModel:
+    """Frecuencia de publicación de un perfil por hora del día y día de la semana (UTC)"""
+
+    def __init__(self, dates, now=None):
+        """
+        Args:
+            dates: Fechas (datetime UTC) de los posts conocidos del perfil
+            now: Momento actual (para calcular el período observado)
+        """
+        now = now or datetime.now(timezone.utc)
+        hours = [0.0] * 24
+        days = [0.0] * 7
+
+        for date in dates:
+            hours[date.hour] += 1
+            days[date.weekday()] += 1
+
+        # Los posts no salen siempre a la misma hora exacta: se reparte cada
+        # conteo con las horas vecinas
+        hours = [0.25 * hours[h - 1] + 0.5 * hours[h] + 0.25 * hours[(h + 1) % 24] for h in range(24)]
+
+        total = len(dates)
+        self.p_hour = [(count + ALPHA) / (total + 24 * ALPHA) for count in hours]
+        self.p_day = [(count + ALPHA) / (total + 7 * ALPHA) for count in days]
+
+        if total:
+            weeks = max(1.0, (now - min(dates)).total_seconds() / (7 * 86400))
+            self.posts_per_week = total / weeks
+        else:
+            self.posts_per_week = PRIOR_POSTS_PER_WEEK
+
+        # Promedio semanal de sqrt(intensidad), para normalizar el presupuesto
+        self.mean_sqrt_intensity = sum(
+            math.sqrt(self.posts_per_week * p_day * p_hour)
+            for p_day in self.p_day for p_hour in self.p_hour
+        ) / (7 * 24)
+
+    @classmethod
+    def from_historial(cls, historial, limit=HISTORY_WINDOW):
+        """
+        Aprende el patrón de los últimos `limit` posts del historial
+
+        Usa la fecha del post en Instagram; los registros anteriores a que se
+        guardara ese campo usan la fecha en que se procesaron.
+        """
+        dates = []
+        for _, data in historial.ultimos(limit):
+            fecha = data.get('fecha_instagram') or data.get('fecha_procesado')
+            if fecha:
+                dates.append(_parse_utc(fecha))
+        return cls(dates)
+
+    def intensity(self, when=None):
+        """Posts esperados en la hora de `when` (datetime UTC)"""
+        when = when or datetime.now(timezone.utc)
+        return self.posts_per_week * self.p_day[when.weekday()] * self.p_hour[when.hour]
+
+
+class _TokenBucket:
+    """Presupuesto global de consultas: `rate` por hora, acumulable hasta `capacity`"""
+
+    def __init__(self, rate_per_hour, capacity):
+        self.rate = rate_per_hour / 3600
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """Consume una consulta; retorna 0 si había, o los segundos hasta la próxima"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class PollScheduler:
+    def __init__(self, bots, interval_minutes, budget_per_hour=None, min_minutes=2,
+                 max_minutes=120, burst_hours=2, adaptive=True):
+        """
+        Inicializa el planificador
+
+        Args:
+            bots: InstagramTwitterBot a revisar (cada uno con su historial)
+            interval_minutes: Intervalo base (el que tendría un perfil promedio)
+            budget_per_hour: Consultas por hora entre todos los perfiles
+                (default: las mismas que con intervalo fijo)
+            min_minutes: Intervalo mínimo por perfil
+            max_minutes: Intervalo máximo por perfil
+            burst_hours: Horas de presupuesto ahorrables en horas tranquilas
+                para gastarlas en ventanas activas
+            adaptive: Si es False, cada perfil se revisa cada interval_minutes
+        """
+        self.bots = bots
+        self.interval = interval_minutes * 60
+        self.budget = budget_per_hour or len(bots) * 3600 / self.interval
+        self.min_interval = min_minutes * 60
+        self.max_interval = max(max_minutes * 60, self.min_interval)
+        self.adaptive = adaptive
+
+        self.bucket = _TokenBucket(self.budget, max(1.0, self.budget * burst_hours))
+        self.models = [PostingModel.from_historial(bot.historial) for bot in bots]
+        self.found_new = [False] * len(bots)
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._next_due = {}
+        self._schedule = []
+
+    def next_interval(self, index):
+        """
+        Segundos hasta la próxima revisión del perfil `index`
+
+        Minimizar el retraso esperado con un presupuesto fijo da consultas
+        proporcionales a la raíz de la intensidad de publicación.
+        """
+        if not self.adaptive:
+            return self.interval
+
+        # Si la última revisión trajo posts nuevos, puede venir una ráfaga
+        if self.found_new[index]:
+            return self.min_interval
+
+        now = datetime.now(timezone.utc)
+        normalizer = sum(model.mean_sqrt_intensity for model in self.models)
+        rate = self.budget * math.sqrt(self.models[index].intensity(now)) / normalizer
+
+        return min(self.max_interval, max(self.min_interval, 3600 / rate))
+
+    def run(self, workers=1):
+        """
+        Revisa los perfiles hasta Ctrl+C (la KeyboardInterrupt se propaga)
+
+        Args:
+            workers: Perfiles revisados a la vez
+        """
+        # Perfiles repartidos en el primer intervalo
+        now = time.monotonic()
+        step = self.interval / len(self.bots)
+        for index in range(len(self.bots)):
+            self._push(now + index * step, index)
+
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="poll")
+
+        try:
+            while True:
+                due, index = self._pop_due()
+
+                # Si el perfil sigue en proceso desde el ciclo anterior, se salta
+                if index in running and not running[index].done():
+                    self._push(due + self.next_interval(index), index)
+                    continue
+
+                wait = self.bucket.take()
+                if wait:
+                    self._push(time.monotonic() + wait, index)
+                    continue
+
+                future = executor.submit(self._poll, index)
+                running[index] = future
+
+                # Tick fijo desde la ejecución programada; si hubo un atraso
+                # grande (p. ej. el equipo estuvo suspendido) no se recuperan
+                # las consultas perdidas
+                next_due = max(due + self.next_interval(index), time.monotonic())
+                self._push(next_due, index)
+                self._print_next(index, next_due)
+
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self, index):
+        bot = self.bots[index]
+        nuevos = bot.process_new_posts()
+
+        # Reaprender con lo recién publicado y adelantar la próxima revisión
+        model = PostingModel.from_historial(bot.historial)
+        with self._lock:
+            self.models[index] = model
+            self.found_new[index] = bool(nuevos)
+
+        if nuevos:
+            self._push(time.monotonic() + self.min_interval, index, earlier_only=True)
+
+    def _push(self, due, index, earlier_only=False):
+        with self._lock:
+            current = self._next_due.get(index)
+            if earlier_only and current is not None and current <= due:
+                return
+            # Las entradas viejas del mismo perfil quedan en el heap y se ignoran
+            self._next_due[index] = due
+            heapq.heappush(self._schedule, (due, index))
+        self._wakeup.set()
+
+    def _pop_due(self):
+        """Espera a la próxima ejecución programada y la retorna"""
+        while True:
+            with self._lock:
+                while self._schedule and self._next_due.get(self._schedule[0][1]) != self._schedule[0][0]:
+                    heapq.heappop(self._schedule)
+                due, index = self._schedule[0]
+
+                wait = due - time.monotonic()
+                if wait <= 0:
+                    heapq.heappop(self._schedule)
+                    del self._next_due[index]
+                    return due, index
+                self._wakeup.clear()
+
+            # Se despierta antes si un perfil adelantó su revisión
+            self._wakeup.wait(wait)
+
+    def _print_next(self, index, due):
+        minutes = (due - time.monotonic()) / 60
+        next_time = datetime.fromtimestamp(time.time() + minutes * 60).strftime('%H:%M:%S')
+        print(f"⏱️  Próxima revisión de @{self.bots[index].instagram_username} "
+              f"en {minutes:.1f} min ({next_time})")
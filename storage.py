@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Conexiones SQLite compartidas por el bot
+Todas las tablas del bot viven en data/analytics.db junto a las del dashboard
+"""
+import sqlite3
+from pathlib import Path
+
+# Misma base de datos que usa dashboard/models/database.py
+DEFAULT_DB_PATH = Path(__file__).parent / 'data' / 'analytics.db'
+
+
+def connect(db_path=None, synchronous='NORMAL'):
+    """
+    Abre una conexión SQLite configurada para el bot
+
+    Args:
+        db_path: Ruta al archivo .db (usa data/analytics.db si no se especifica)
+        synchronous: Nivel de PRAGMA synchronous ('NORMAL' o 'FULL')
+
+    Returns:
+        sqlite3.Connection en modo WAL, usable desde varios threads
+    """
+    db_path = Path(db_path) if db_path else DEFAULT_DB_PATH
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # isolation_level=None: las transacciones se abren explícitamente con BEGIN
+    conn = sqlite3.connect(
+        str(db_path),
+        timeout=30,
+        isolation_level=None,
+        check_same_thread=False
+    )
+
+    # WAL: un crash a mitad de escritura nunca deja la base corrupta
+    # y los lectores (dashboard) no bloquean al bot
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
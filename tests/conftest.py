@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+
+# Agregar parent directory al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
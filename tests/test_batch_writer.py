@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+BatchWriter.add_post: los posts publicados llegan a la tabla posts del
+dashboard y un shortcode repetido no pisa al que ya está
+"""
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from sqlalchemy import text
+
+from dashboard.models.database import Base, create_sqlite_engine
+from dashboard.services.batch_writer import BatchWriter
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_sqlite_engine(tmp_path / 'analytics.db')
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_add_post_inserts_once_per_shortcode(engine):
+    writer = BatchWriter(engine, max_delay=0.01)
+    created_at = datetime(2026, 1, 17, 12, 30)
+    writer.add_post({'shortcode': 'AAA', 'post_url': 'https://www.instagram.com/p/AAA/',
+                     'post_type': 'video', 'created_at': created_at})
+    writer.add_post({'shortcode': 'BBB'})
+    writer.add_post({'shortcode': 'AAA', 'post_type': 'imagen'})
+    writer.close()
+
+    assert writer.failed == 0
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT shortcode, platform_source, platform_target, post_type, status FROM posts ORDER BY shortcode"
+        )).fetchall()
+        created = conn.execute(text("SELECT created_at FROM posts WHERE shortcode = 'AAA'")).scalar()
+    assert [tuple(row) for row in rows] == [
+        ('AAA', 'instagram', 'twitter', 'video', 'success'),
+        ('BBB', 'instagram', 'twitter', None, 'success'),
+    ]
+    assert created.startswith('2026-01-17 12:30:00')
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+BrowserPool: close() no deja procesos de navegador vivos
+(ni los de threads que terminaron sin release())
+"""
+import subprocess
+import sys
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+psutil = pytest.importorskip('psutil')
+pytest.importorskip('playwright')
+
+import browser_pool
+from browser_pool import BrowserPool
+
+# Un "driver" con un hijo, como node + Chromium
+_FAKE_DRIVER = (
+    "import subprocess, sys, time;"
+    "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']);"
+    "time.sleep(60)"
+)
+
+
+def _browser_processes():
+    """Procesos de navegador que cuelgan de este proceso"""
+    names = ('chrom', 'headless_shell')
+    found = []
+    for child in psutil.Process().children(recursive=True):
+        try:
+            if any(name in child.name().lower() for name in names):
+                found.append(child)
+        except psutil.Error:
+            continue
+    return found
+
+
+def _use_pool_in_threads(pool, threads):
+    def worker():
+        with pool.page():
+            pass
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+
+def test_close_kills_browsers_of_other_threads():
+    pool = BrowserPool()
+    drivers = []
+    children = []
+
+    def fake_launch():
+        driver = subprocess.Popen([sys.executable, '-c', _FAKE_DRIVER])
+        drivers.append(driver)
+        while not psutil.Process(driver.pid).children():
+            time.sleep(0.01)
+        children.extend(psutil.Process(driver.pid).children())
+        def stop():
+            # playwright.stop() del thread dueño cierra el navegador y el driver
+            for child in psutil.Process(driver.pid).children():
+                child.terminate()
+            driver.terminate()
+
+        playwright = mock.Mock()
+        playwright.stop.side_effect = stop
+        state = browser_pool._BrowserState(playwright, None, mock.Mock())
+        state.driver_pid = driver.pid
+        return state
+
+    with mock.patch.object(pool, '_launch', fake_launch):
+        _use_pool_in_threads(pool, 3)
+        with pool.page():
+            pass
+        pool.close()
+
+    assert len(drivers) == 4
+    for driver in drivers:
+        assert driver.wait(timeout=10) is not None
+    _, alive = psutil.wait_procs(children, timeout=10)
+    assert not alive
+    assert not pool._states
+
+
+def test_close_leaves_no_chromium_running():
+    pool = BrowserPool()
+    try:
+        with pool.page():
+            pass
+    except Exception as e:
+        pytest.skip(f"Chromium no disponible: {e}")
+
+    _use_pool_in_threads(pool, 2)
+    assert _browser_processes()
+
+    pool.close()
+
+    deadline = time.monotonic() + 10
+    while _browser_processes() and time.monotonic() < deadline:
+        time.sleep(0.2)
+    assert not _browser_processes()
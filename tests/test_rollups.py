@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Rollups de engagement con snapshots incompletos: una métrica en NULL no se
+recolectó (no vale 0) y se compara con el último valor no NULL de la serie
+"""
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from sqlalchemy import text
+
+from dashboard.models.database import Base, create_sqlite_engine
+from dashboard.services.rollups import ensure_rollups
+from dashboard.services.snapshots import record_snapshots
+
+HOUR = 3600
+START = 1_760_000_000 - 1_760_000_000 % HOUR
+
+# (post_id, platform, hora, likes, views): cada snapshot en su propia hora
+SPARSE = [
+    (1, 'twitter', 0, 10, 100),
+    (1, 'twitter', 1, None, 150),
+    (1, 'twitter', 2, 15, None),
+    (1, 'twitter', 3, None, None),
+    (1, 'twitter', 4, 18, 190),
+    (2, 'twitter', 1, None, 40),
+    (2, 'twitter', 2, 7, None),
+    (2, 'instagram', 0, 3, None),
+    (2, 'instagram', 3, None, 9),
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_sqlite_engine(tmp_path / 'analytics.db')
+    Base.metadata.create_all(engine)
+    ensure_rollups(engine)
+    yield engine
+    engine.dispose()
+
+
+def _bucket(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d %H:00')
+
+
+def _insert(engine, rows):
+    with engine.begin() as conn:
+        record_snapshots(conn, [
+            {'post_id': post_id, 'platform': platform, 'collected_at': START + hour * HOUR,
+             'likes': likes, 'views': views}
+            for post_id, platform, hour, likes, views in rows
+        ])
+
+
+def _snapshots(engine):
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT post_id, platform, collected_at, likes, views FROM metric_snapshots"
+        )).fetchall()
+
+
+def _expected(snapshots):
+    """Engagement por hora y último valor no NULL, calculados en Python"""
+    hourly = {}
+    latest = {}
+    for post_id, platform, collected_at, likes, views in sorted(snapshots):
+        series = latest.setdefault((post_id, platform), {'likes': None, 'views': None})
+        gained = hourly.setdefault((_bucket(collected_at), platform), {'likes': 0, 'views': 0})
+        for column, value in (('likes', likes), ('views', views)):
+            if value is not None:
+                gained[column] += value - (series[column] or 0)
+                series[column] = value
+    hourly = {key: values for key, values in hourly.items() if any(values.values())}
+    return hourly, latest
+
+
+def _rollups(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT bucket, platform, likes, views FROM engagement_rollup_hourly")).fetchall()
+        hourly = {(bucket, platform): {'likes': likes, 'views': views}
+                  for bucket, platform, likes, views in rows if likes or views}
+        rows = conn.execute(text("SELECT post_id, platform, likes, views FROM metric_latest")).fetchall()
+        latest = {(post_id, platform): {'likes': likes, 'views': views} for post_id, platform, likes, views in rows}
+    return hourly, latest
+
+
+def test_sparse_snapshots_use_last_non_null_value(engine):
+    _insert(engine, SPARSE)
+
+    hourly, latest = _rollups(engine)
+    assert latest[(1, 'twitter')] == {'likes': 18, 'views': 190}
+    assert latest[(2, 'instagram')] == {'likes': 3, 'views': 9}
+    # Una métrica que falta en un snapshot no se cuenta como caída a 0
+    assert hourly[(_bucket(START + HOUR), 'twitter')] == {'likes': 0, 'views': 90}
+    assert hourly[(_bucket(START + 2 * HOUR), 'twitter')] == {'likes': 12, 'views': 0}
+    assert (hourly, latest) == _expected(_snapshots(engine))
+
+
+def test_triggers_match_rebuild_in_any_order(engine):
+    rows = list(SPARSE)
+    random.Random(7).shuffle(rows)
+    for row in rows:
+        _insert(engine, [row])
+    assert _rollups(engine) == _expected(_snapshots(engine))
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM metric_snapshots WHERE post_id = 1 AND collected_at = :ts"),
+                     {'ts': START + 2 * HOUR})
+        conn.execute(text("UPDATE metric_snapshots SET views = NULL WHERE post_id = 1 AND collected_at = :ts"),
+                     {'ts': START + 4 * HOUR})
+        conn.execute(text("UPDATE metric_snapshots SET likes = 12 WHERE post_id = 1 AND collected_at = :ts"),
+                     {'ts': START + HOUR})
+    by_triggers = _rollups(engine)
+    assert by_triggers == _expected(_snapshots(engine))
+
+    ensure_rollups(engine, rebuild=True)
+    assert _rollups(engine) == by_triggers
@@ -14,11 +14,69 @@ if hasattr(sys.stdout, 'buffer') and not isinstance(sys.stdout, io.TextIOWrapper
         pass
 
 import tweepy
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import os
+import re
+import html
+import time
+
+from chunked_upload import ResumableVideoUploader, VideoRejectedError
+from media_cache import file_digest
+from metrics import get_metrics, propagate
+from mp4_inspector import inspect_video, check_twitter_limits, InvalidVideoError
+from rate_limiter import get_rate_limiter, RateLimitedError, MEDIA, TWEET, LOOKUP
+
+
+def _comparable_text(text):
+    """Texto de un tweet sin links (Twitter los reemplaza por t.co) ni entidades HTML"""
+    text = re.sub(r'https?://\S+', '', html.unescape(text))
+    return ' '.join(text.split())[:200]
+
+
+class TweetFailedError(Exception):
+    """
+    No se pudo crear el tweet
+
+    rejected es True solo si es seguro que el tweet no existe (Twitter
+    respondió 4xx o el rate limiter no dejó hacer la llamada). Con un
+    timeout, una conexión cortada o un 5xx el tweet pudo haberse creado.
+    rate_limited indica que el motivo fue un límite de Twitter (429 o el
+    rate limiter): el post es válido y se puede reintentar más tarde.
+    """
+
+    def __init__(self, message, rejected, rate_limited=False):
+        super().__init__(message)
+        self.rejected = rejected
+        self.rate_limited = rate_limited
+
+
+class SharedSession(requests.Session):
+    """
+    Sesión HTTP compartida entre varios TwitterPoster
+
+    tweepy.API cierra su sesión al terminar cada request; aquí close()
+    no hace nada para que el pool de conexiones keep-alive sobreviva.
+    Usa shutdown() para cerrarla de verdad.
+    """
+
+    def __init__(self, pool_size=10):
+        super().__init__()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount('https://', adapter)
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        super().close()
+
 
 class TwitterPoster:
-    def __init__(self, api_key, api_secret, access_token, access_secret, bearer_token=None):
+    def __init__(self, api_key, api_secret, access_token, access_secret, bearer_token=None,
+                 session=None, max_parallel_uploads=4, upload_state_folder=None, video_chunk_mb=4,
+                 media_cache=None, rate_limiter=None, max_rate_limit_wait=60):
         """
         Inicializa el cliente de Twitter
 
@@ -28,7 +86,23 @@ class TwitterPoster:
             access_token: Access Token
             access_secret: Access Token Secret
             bearer_token: Bearer Token (opcional, para API v2)
+            session: SharedSession para reutilizar conexiones entre cuentas (opcional)
+            max_parallel_uploads: Subidas simultáneas por tweet
+            upload_state_folder: Carpeta del estado de subidas de video reanudables
+            video_chunk_mb: Tamaño de cada parte al subir videos (máximo 5)
+            media_cache: MediaCache para no volver a subir archivos idénticos (opcional)
+            rate_limiter: RateLimiter (default: el compartido por todo el proceso)
+            max_rate_limit_wait: Segundos que se espera a que se libere un límite
+                antes de desistir (el post se reintenta en la próxima revisión)
         """
+        self.max_parallel_uploads = max(1, max_parallel_uploads)
+        self.media_cache = media_cache
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_rate_limit_wait = max_rate_limit_wait
+
+        # El access token empieza con el id numérico de la cuenta ("123-abc")
+        self.account_id = access_token.split('-')[0]
+
         # Cliente API v2 (para crear tweets)
         self.client = tweepy.Client(
             bearer_token=bearer_token,
@@ -36,14 +110,33 @@ class TwitterPoster:
             consumer_secret=api_secret,
             access_token=access_token,
             access_token_secret=access_secret,
-            wait_on_rate_limit=True
+            # Los límites los controla rate_limiter antes de llamar
+            wait_on_rate_limit=False
         )
 
         # API v1.1 (necesaria para subir media)
         auth = tweepy.OAuth1UserHandler(
             api_key, api_secret, access_token, access_secret
         )
-        self.api_v1 = tweepy.API(auth, wait_on_rate_limit=True)
+        self.api_v1 = tweepy.API(auth, wait_on_rate_limit=False)
+
+        # La autenticación OAuth va en cada request, así que varias cuentas
+        # pueden compartir la misma sesión HTTP
+        if session is not None:
+            self.client.session = session
+            self.api_v1.session = session
+
+        # Cada respuesta actualiza el presupuesto con sus headers x-rate-limit-*
+        self.rate_limiter.install(self.client.session)
+        self.rate_limiter.install(self.api_v1.session)
+
+        # Subida de videos por partes con estado persistente
+        self.video_uploader = ResumableVideoUploader(
+            api=self.api_v1,
+            state_folder=upload_state_folder or Path(__file__).parent / 'data' / 'uploads',
+            chunk_size=int(video_chunk_mb * 1024 * 1024),
+            on_chunk=self._print_chunk_progress
+        )
 
         print("[OK] Cliente de Twitter inicializado")
 
@@ -58,50 +151,148 @@ class TwitterPoster:
             Media ID de Twitter
         """
         try:
-            file_path = Path(file_path)
+            return self._upload_media(file_path)
 
-            if not file_path.exists():
-                print(f"❌ Archivo no encontrado: {file_path}")
-                return None
+        except Exception as e:
+            print(f"❌ Error subiendo media: {e}")
+            return None
 
-            # Determinar si es video o imagen
-            is_video = file_path.suffix.lower() in ['.mp4', '.mov', '.avi']
+    def _upload_media(self, file_path):
+        """Igual que upload_media pero lanza la excepción en caso de error"""
+        file_path = Path(file_path)
 
-            print(f"📤 Subiendo {'video' if is_video else 'imagen'}: {file_path.name}...")
+        if not file_path.exists():
+            raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
 
-            if is_video:
-                # Para videos, especificar categoría
-                media = self.api_v1.media_upload(
-                    filename=str(file_path),
-                    media_category='tweet_video'
-                )
-            else:
-                # Para imágenes
-                media = self.api_v1.media_upload(filename=str(file_path))
+        # Determinar si es video o imagen
+        is_video = file_path.suffix.lower() in ['.mp4', '.mov', '.avi']
 
-            print(f"✅ Media subido con ID: {media.media_id}")
-            return media.media_id
+        with get_metrics().span('twitter_upload', media_type='video' if is_video else 'image',
+                                account=self.account_id, file=file_path.name) as span:
+            return self._upload_file(file_path, is_video, span)
 
-        except Exception as e:
-            print(f"❌ Error subiendo media: {e}")
-            return None
+    def _upload_file(self, file_path, is_video, span):
+        # Mismo contenido ya subido por esta cuenta y aún vigente: 0 bytes
+        digest = None
+        if self.media_cache:
+            digest = file_digest(file_path)
+            media_id = self.media_cache.get(self.account_id, digest)
+            if media_id:
+                print(f"♻️  Media reutilizado (ya subido): {file_path.name} → {media_id}")
+                span.set(cached=True)
+                return media_id
+
+        # Rechazar antes de enviar un byte lo que Twitter no va a aceptar
+        if is_video and file_path.suffix.lower() in ['.mp4', '.mov']:
+            self._check_video(file_path)
+
+        self.rate_limiter.acquire(MEDIA, self.account_id, self.max_rate_limit_wait)
+
+        print(f"📤 Subiendo {'video' if is_video else 'imagen'}: {file_path.name}...")
+
+        if is_video:
+            # Videos por partes: si falla, el próximo intento reanuda
+            media = self.video_uploader.upload(file_path, media_category='tweet_video')
+            summary = self.video_uploader.summary()
+            print(f"   {summary['chunks']} partes, {summary['mb_per_s']:.2f} MB/s, "
+                  f"latencia media {summary['avg_latency_s'] * 1000:.0f} ms")
+        else:
+            # Para imágenes
+            media = self.api_v1.media_upload(filename=str(file_path))
+
+        if self.media_cache:
+            self.media_cache.put(
+                self.account_id, digest, media.media_id,
+                size=file_path.stat().st_size,
+                expires_after_secs=getattr(media, 'expires_after_secs', None)
+            )
+
+        span.set(bytes=file_path.stat().st_size)
+        print(f"✅ Media subido con ID: {media.media_id}")
+        return media.media_id
+
+    def _check_video(self, file_path):
+        """Valida duración, resolución, fps, tamaño y codecs leyendo solo la metadata"""
+        try:
+            info = inspect_video(file_path)
+        except InvalidVideoError as e:
+            raise VideoRejectedError(f"Video inválido: {e}")
+
+        problems = check_twitter_limits(info)
+        if problems:
+            raise VideoRejectedError(f"Twitter no acepta {file_path.name}: {'; '.join(problems)}")
+
+        print(f"🎬 {file_path.name}: {info['duration_s']:.1f} s, {info['width']}x{info['height']}, "
+              f"{info['fps']:.0f} fps, {info['bitrate_bps'] / 1e6:.1f} Mbps")
+
+    def _print_chunk_progress(self, stats):
+        print(f"   📦 Parte {stats['segment'] + 1}/{stats['segments']}: "
+              f"{stats['bytes'] / 1024:.0f} KB en {stats['seconds']:.2f} s "
+              f"({stats['mb_per_s']:.2f} MB/s)")
+
+    def upload_media_batch(self, media_files):
+        """
+        Sube varios archivos en paralelo (máximo max_parallel_uploads a la vez)
+
+        Args:
+            media_files: Lista de rutas de archivos
 
-    def create_tweet(self, text, media_ids=None):
+        Returns:
+            Lista de dicts {'file', 'media_id', 'error', 'rate_limited', 'rejected'}
+            en el mismo orden que media_files (rejected: video que Twitter no acepta)
+        """
+        def upload(file_path):
+            try:
+                return {'file': str(file_path), 'media_id': self._upload_media(file_path),
+                        'error': None, 'rate_limited': False, 'rejected': False}
+            except Exception as e:
+                rate_limited = isinstance(e, (RateLimitedError, tweepy.TooManyRequests))
+                return {'file': str(file_path), 'media_id': None, 'error': str(e),
+                        'rate_limited': rate_limited, 'rejected': isinstance(e, VideoRejectedError)}
+
+        if len(media_files) <= 1:
+            return [upload(file_path) for file_path in media_files]
+
+        workers = min(self.max_parallel_uploads, len(media_files))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="media-upload") as executor:
+            # map conserva el orden de entrada aunque terminen en otro orden;
+            # propagate mantiene las etiquetas de métricas (perfil, shortcode)
+            return list(executor.map(propagate(upload), media_files))
+
+    def create_tweet(self, text, media_ids=None, raise_errors=False):
         """
         Crea un tweet
 
         Args:
             text: Texto del tweet
             media_ids: Lista de media IDs (opcional)
+            raise_errors: Lanzar TweetFailedError en lugar de devolver None
 
         Returns:
-            ID del tweet creado
+            ID del tweet creado (None si falló y raise_errors es False)
         """
+        with get_metrics().span('twitter_tweet', account=self.account_id,
+                                media=len(media_ids or [])) as span:
+            try:
+                return self._create_tweet(text, media_ids)
+            except TweetFailedError as e:
+                print(f"❌ Error creando tweet: {e}")
+                span.fail(e)
+                if raise_errors:
+                    raise
+                return None
+
+    def _create_tweet(self, text, media_ids):
+        # Asegurar que el texto no exceda 280 caracteres
+        if len(text) > 280:
+            text = text[:277] + "..."
+
         try:
-            # Asegurar que el texto no exceda 280 caracteres
-            if len(text) > 280:
-                text = text[:277] + "..."
+            self.rate_limiter.acquire(TWEET, self.account_id, self.max_rate_limit_wait)
+        except RateLimitedError as e:
+            raise TweetFailedError(str(e), rejected=True, rate_limited=True) from e
 
+        try:
             print(f"🐦 Creando tweet...")
             print(f"   Texto: {text[:100]}...")
 
@@ -117,9 +308,48 @@ class TwitterPoster:
             print(f"✅ Tweet publicado: {tweet_url}")
             return tweet_id
 
+        except tweepy.HTTPException as e:
+            # 4xx: Twitter procesó el pedido y no creó el tweet
+            status = getattr(e.response, 'status_code', None) or 0
+            raise TweetFailedError(str(e), rejected=400 <= status < 500,
+                                   rate_limited=isinstance(e, tweepy.TooManyRequests)) from e
         except Exception as e:
-            print(f"❌ Error creando tweet: {e}")
-            return None
+            # Timeout, conexión cortada, respuesta ilegible: pudo haberse creado
+            raise TweetFailedError(str(e), rejected=False) from e
+
+    def upload_media_files(self, media_files):
+        """
+        Sube los archivos de un tweet en paralelo
+
+        Args:
+            media_files: Lista de rutas de archivos (máximo 4 imágenes o 1 video)
+
+        Returns:
+            Lista de media IDs de los archivos subidos con éxito, en el orden original
+
+        Raises:
+            RateLimitedError: Si algún archivo no se subió por límite de Twitter
+                (mejor reintentar el post completo que publicarlo sin esa media)
+            VideoRejectedError: Si un video no cumple los límites de Twitter (no
+                se puede procesar acá; el post no se publica solo con texto)
+        """
+        # Twitter permite máximo 4 imágenes o 1 video
+        results = self.upload_media_batch(media_files[:4])
+
+        for result in results:
+            if result['error']:
+                print(f"❌ Error subiendo {Path(result['file']).name}: {result['error']}")
+
+        for result in results:
+            if result['rate_limited']:
+                status = self.rate_limiter.status(MEDIA, self.account_id)
+                raise RateLimitedError(MEDIA, self.account_id, max(0.0, status['reset_at'] - time.time()))
+
+        for result in results:
+            if result['rejected']:
+                raise VideoRejectedError(result['error'])
+
+        return [result['media_id'] for result in results if result['media_id'] is not None]
 
     def post_with_media(self, text, media_files):
         """
@@ -137,16 +367,11 @@ class TwitterPoster:
             return self.create_tweet(text)
 
         # Subir todos los archivos media
-        media_ids = []
-
-        for file_path in media_files:
-            media_id = self.upload_media(file_path)
-            if media_id:
-                media_ids.append(media_id)
-
-                # Twitter permite máximo 4 imágenes o 1 video
-                if len(media_ids) >= 4:
-                    break
+        try:
+            media_ids = self.upload_media_files(media_files)
+        except (RateLimitedError, VideoRejectedError) as e:
+            print(f"❌ {e}")
+            return None
 
         if not media_ids:
             print("⚠️ No se pudo subir ningún archivo, publicando solo texto")
@@ -155,6 +380,32 @@ class TwitterPoster:
         # Crear tweet con media
         return self.create_tweet(text, media_ids=media_ids)
 
+    def find_recent_tweet(self, text, max_results=20):
+        """
+        Busca entre los últimos tweets de la cuenta uno con este texto
+
+        Se usa al retomar un post cuyo tweet pudo haberse publicado justo
+        antes de un crash, para no publicarlo dos veces.
+
+        Args:
+            text: Texto con el que se creó el tweet
+            max_results: Tweets recientes a revisar (5-100)
+
+        Returns:
+            ID del tweet encontrado, o None
+        """
+        self.rate_limiter.acquire(LOOKUP, self.account_id, self.max_rate_limit_wait)
+        me = self.client.get_me(user_auth=True)
+
+        self.rate_limiter.acquire(LOOKUP, self.account_id, self.max_rate_limit_wait)
+        response = self.client.get_users_tweets(me.data.id, max_results=max_results, user_auth=True)
+
+        wanted = _comparable_text(text)
+        for tweet in response.data or []:
+            if _comparable_text(tweet.text) == wanted:
+                return str(tweet.id)
+        return None
+
     def verify_credentials(self):
         """
         Verifica que las credenciales sean válidas
@@ -163,6 +414,7 @@ class TwitterPoster:
             True si son válidas, False si no
         """
         try:
+            self.rate_limiter.acquire(LOOKUP, self.account_id, self.max_rate_limit_wait)
             user = self.api_v1.verify_credentials()
             print(f"✅ Autenticado como: @{user.screen_name}")
             return True